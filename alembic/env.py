@@ -5,6 +5,7 @@ from sqlalchemy import pool
 from alembic import context
 from models import Base
 from config import settings
+from database import create_db_engine
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -105,11 +106,21 @@ def run_migrations_online() -> None:
             configuration["sqlalchemy.pool_timeout"] = "30"
             configuration["sqlalchemy.pool_recycle"] = "3600"
 
-    connectable = engine_from_config(
-        configuration,
-        prefix="sqlalchemy.",
-        poolclass=pool.NullPool,
-    )
+    url = configuration.get("sqlalchemy.url", "")
+    if url.startswith("sqlite"):
+        # Mesmo engine/PRAGMAs do aplicativo; chaves estrangeiras desligadas
+        # porque o modo batch recria tabelas referenciadas
+        connectable = create_db_engine(
+            url,
+            pragmas={"foreign_keys": "OFF"},
+            poolclass=pool.NullPool,
+        )
+    else:
+        connectable = engine_from_config(
+            configuration,
+            prefix="sqlalchemy.",
+            poolclass=pool.NullPool,
+        )
 
     with connectable.connect() as connection:
         context.configure(
@@ -0,0 +1,37 @@
+"""add hot path indexes
+
+Revision ID: 3b8e2f1c9a4d
+Revises: 7960c45348f1
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '3b8e2f1c9a4d'
+down_revision = '7960c45348f1'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Limite diário (COUNT por data) e listagem do admin ordenada por data/hora
+    op.create_index('ix_appointments_date_time', 'appointments', ['date', 'time'])
+
+    # Histórico do cliente: filtro por user_id ordenado por data/hora
+    op.create_index('ix_appointments_user_date_time', 'appointments', ['user_id', 'date', 'time'])
+
+    # Revogação dos tokens de um usuário e limpeza de tokens expirados
+    # (a validação filtra por `token`, que já tem índice único)
+    op.create_index('ix_auth_tokens_user_id', 'auth_tokens', ['user_id'])
+    op.create_index('ix_auth_tokens_expires_at', 'auth_tokens', ['expires_at'])
+
+    # Serviços ativos (consultados em quase todas as páginas)
+    op.create_index('ix_services_active', 'services', ['active'])
+
+def downgrade():
+    op.drop_index('ix_services_active', table_name='services')
+    op.drop_index('ix_auth_tokens_expires_at', table_name='auth_tokens')
+    op.drop_index('ix_auth_tokens_user_id', table_name='auth_tokens')
+    op.drop_index('ix_appointments_user_date_time', table_name='appointments')
+    op.drop_index('ix_appointments_date_time', table_name='appointments')
@@ -0,0 +1,60 @@
+"""auth token expiry as integer epoch
+
+Revision ID: 5c1d7e9a2b3f
+Revises: 3b8e2f1c9a4d
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '5c1d7e9a2b3f'
+down_revision = '3b8e2f1c9a4d'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Nova coluna inteira (segundos desde epoch) ao lado da antiga em ISO
+    with op.batch_alter_table('auth_tokens') as batch_op:
+        batch_op.add_column(sa.Column('expires_at_epoch', sa.Integer(), nullable=True))
+
+    # Converter os valores existentes
+    conn = op.get_bind()
+    rows = conn.execute(sa.text("SELECT id, expires_at FROM auth_tokens")).fetchall()
+    for token_id, expires_at in rows:
+        epoch = int(datetime.fromisoformat(expires_at).timestamp())
+        conn.execute(
+            sa.text("UPDATE auth_tokens SET expires_at_epoch = :epoch WHERE id = :id"),
+            {"epoch": epoch, "id": token_id}
+        )
+
+    # Substituir a coluna antiga e recriar o índice sobre a inteira
+    op.drop_index('ix_auth_tokens_expires_at', table_name='auth_tokens')
+    with op.batch_alter_table('auth_tokens') as batch_op:
+        batch_op.drop_column('expires_at')
+    with op.batch_alter_table('auth_tokens') as batch_op:
+        batch_op.alter_column('expires_at_epoch', new_column_name='expires_at',
+                              existing_type=sa.Integer(), nullable=False)
+    op.create_index('ix_auth_tokens_expires_at', 'auth_tokens', ['expires_at'])
+
+def downgrade():
+    with op.batch_alter_table('auth_tokens') as batch_op:
+        batch_op.add_column(sa.Column('expires_at_iso', sa.String(), nullable=True))
+
+    conn = op.get_bind()
+    rows = conn.execute(sa.text("SELECT id, expires_at FROM auth_tokens")).fetchall()
+    for token_id, expires_at in rows:
+        conn.execute(
+            sa.text("UPDATE auth_tokens SET expires_at_iso = :iso WHERE id = :id"),
+            {"iso": datetime.fromtimestamp(expires_at).isoformat(), "id": token_id}
+        )
+
+    op.drop_index('ix_auth_tokens_expires_at', table_name='auth_tokens')
+    with op.batch_alter_table('auth_tokens') as batch_op:
+        batch_op.drop_column('expires_at')
+    with op.batch_alter_table('auth_tokens') as batch_op:
+        batch_op.alter_column('expires_at_iso', new_column_name='expires_at',
+                              existing_type=sa.String(), nullable=False)
+    op.create_index('ix_auth_tokens_expires_at', 'auth_tokens', ['expires_at'])
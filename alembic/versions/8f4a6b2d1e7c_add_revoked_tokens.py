@@ -0,0 +1,29 @@
+"""add revoked tokens
+
+Revision ID: 8f4a6b2d1e7c
+Revises: 5c1d7e9a2b3f
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '8f4a6b2d1e7c'
+down_revision = '5c1d7e9a2b3f'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Lista de revogação dos tokens assinados (recarregada na inicialização)
+    op.create_table('revoked_tokens',
+        sa.Column('token_digest', sa.String(length=64), nullable=False),
+        sa.Column('expires_at', sa.Integer(), nullable=False),
+        sa.Column('revoked_at', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('token_digest')
+    )
+    op.create_index('ix_revoked_tokens_expires_at', 'revoked_tokens', ['expires_at'])
+
+def downgrade():
+    op.drop_index('ix_revoked_tokens_expires_at', table_name='revoked_tokens')
+    op.drop_table('revoked_tokens')
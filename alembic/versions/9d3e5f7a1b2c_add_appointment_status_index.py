@@ -0,0 +1,23 @@
+"""add appointment status index
+
+Revision ID: 9d3e5f7a1b2c
+Revises: 8f4a6b2d1e7c
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '9d3e5f7a1b2c'
+down_revision = '8f4a6b2d1e7c'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Listagem do admin filtrada por status (paginação por data/hora/id)
+    # e totais por status
+    op.create_index('ix_appointments_status_date_time', 'appointments', ['status', 'date', 'time'])
+
+def downgrade():
+    op.drop_index('ix_appointments_status_date_time', table_name='appointments')
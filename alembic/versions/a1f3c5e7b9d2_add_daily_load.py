@@ -0,0 +1,68 @@
+"""add daily load
+
+Revision ID: a1f3c5e7b9d2
+Revises: 9d3e5f7a1b2c
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'a1f3c5e7b9d2'
+down_revision = '9d3e5f7a1b2c'
+branch_labels = None
+depends_on = None
+
+# Cópia de models.DAILY_LOAD_TRIGGERS no momento desta migração
+TRIGGERS = {
+    'trg_daily_load_insert': """
+    CREATE TRIGGER trg_daily_load_insert AFTER INSERT ON appointments
+    WHEN COALESCE(NEW.status, '') <> 'rejeitado'
+    BEGIN
+        INSERT INTO daily_load (date, booked) VALUES (NEW.date, 1)
+        ON CONFLICT(date) DO UPDATE SET booked = booked + 1;
+    END
+    """,
+    'trg_daily_load_delete': """
+    CREATE TRIGGER trg_daily_load_delete AFTER DELETE ON appointments
+    WHEN COALESCE(OLD.status, '') <> 'rejeitado'
+    BEGIN
+        UPDATE daily_load SET booked = booked - 1 WHERE date = OLD.date;
+    END
+    """,
+    'trg_daily_load_update': """
+    CREATE TRIGGER trg_daily_load_update AFTER UPDATE OF date, status ON appointments
+    BEGIN
+        UPDATE daily_load SET booked = booked - 1
+        WHERE date = OLD.date AND COALESCE(OLD.status, '') <> 'rejeitado';
+        INSERT INTO daily_load (date, booked)
+        SELECT NEW.date, 1 WHERE COALESCE(NEW.status, '') <> 'rejeitado'
+        ON CONFLICT(date) DO UPDATE SET booked = booked + 1;
+    END
+    """,
+}
+
+def upgrade():
+    # Contagem de agendamentos por dia para a checagem de capacidade
+    op.create_table('daily_load',
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('booked', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('date')
+    )
+
+    # Preencher com os agendamentos existentes
+    op.execute("""
+        INSERT INTO daily_load (date, booked)
+        SELECT date, COUNT(*) FROM appointments
+        WHERE COALESCE(status, '') <> 'rejeitado'
+        GROUP BY date
+    """)
+
+    for sql in TRIGGERS.values():
+        op.execute(sql)
+
+def downgrade():
+    for name in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {name}")
+    op.drop_table('daily_load')
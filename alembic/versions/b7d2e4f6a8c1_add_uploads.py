@@ -0,0 +1,31 @@
+"""add uploads
+
+Revision ID: b7d2e4f6a8c1
+Revises: a1f3c5e7b9d2
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'b7d2e4f6a8c1'
+down_revision = 'a1f3c5e7b9d2'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Arquivos enviados, endereçados pelo SHA-256 do conteúdo, com contagem
+    # de referências (agendamentos e galeria)
+    op.create_table('uploads',
+        sa.Column('digest', sa.String(length=64), nullable=False),
+        sa.Column('path', sa.String(), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('refcount', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('digest'),
+        sa.UniqueConstraint('path')
+    )
+
+def downgrade():
+    op.drop_table('uploads')
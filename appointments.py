@@ -0,0 +1,264 @@
+"""
+Consultas de agendamentos usadas pelas telas de listagem e de agendamento.
+
+A listagem é paginada por chave (keyset) sobre (date, time, id): cada página
+começa depois da última linha da anterior, então o custo de uma página não
+depende de quantos agendamentos existem antes dela. A ocupação por dia vem
+da tabela `daily_load`, mantida por triggers.
+"""
+from collections import namedtuple
+from datetime import timedelta
+
+from sqlalchemy import delete, func, insert, literal, or_, select, tuple_, update
+from sqlalchemy.orm import contains_eager
+
+from models import Appointment, Config, DailyLoad, Service, User
+from upload_store import UploadStore
+from write_queue import commit_with_retry
+
+STATUS_OPTIONS = ["novo", "pendente", "confirmado", "feito", "não feito", "rejeitado"]
+
+# Filtros da listagem do admin (None = sem filtro)
+AppointmentFilters = namedtuple(
+    "AppointmentFilters", ["date_from", "date_to", "status", "customer"],
+    defaults=[None, None, None, None]
+)
+
+# Uma página da listagem: linhas (Appointment, User, Service) e o cursor da próxima
+Page = namedtuple("Page", ["rows", "next_cursor"])
+
+
+class DayAvailability(namedtuple("DayAvailability", ["date", "booked", "capacity"])):
+    """Ocupação de um dia; capacity 0/None = sem limite."""
+    __slots__ = ()
+
+    @property
+    def is_full(self):
+        return bool(self.capacity) and self.booked >= self.capacity
+
+    @property
+    def remaining(self):
+        return max(self.capacity - self.booked, 0) if self.capacity else None
+
+
+def page_cursor(appointment):
+    """Cursor de paginação de um agendamento: (date, time, id)."""
+    return (appointment.date, appointment.time, appointment.id)
+
+
+def _apply_filters(query, filters, with_status=True):
+    if filters.date_from:
+        query = query.filter(Appointment.date >= filters.date_from)
+    if filters.date_to:
+        query = query.filter(Appointment.date <= filters.date_to)
+    if with_status and filters.status:
+        query = query.filter(Appointment.status == filters.status)
+    if filters.customer:
+        pattern = f"%{filters.customer.strip()}%"
+        customer_ids = select(User.id).where(
+            or_(User.name.ilike(pattern), User.email.ilike(pattern), User.phone.ilike(pattern))
+        )
+        query = query.filter(Appointment.user_id.in_(customer_ids))
+    return query
+
+
+def list_appointments(session, filters=None, after=None, page_size=20):
+    """
+    Retorna uma página de agendamentos ordenada por data, horário e id.
+
+    Args:
+        session: Sessão do banco de dados
+        filters: AppointmentFilters (opcional)
+        after: Cursor (date, time, id) da última linha da página anterior
+        page_size: Quantidade de linhas por página
+
+    Returns:
+        Page: linhas da página e cursor da próxima (None se for a última)
+    """
+    filters = filters or AppointmentFilters()
+    query = (
+        session.query(Appointment, User, Service)
+        .join(User, Appointment.user_id == User.id)
+        .join(Service, Appointment.service_id == Service.id)
+    )
+    query = _apply_filters(query, filters)
+    if after is not None:
+        query = query.filter(
+            tuple_(Appointment.date, Appointment.time, Appointment.id) > tuple_(*after)
+        )
+
+    # Uma linha a mais indica se existe próxima página
+    rows = (
+        query.order_by(Appointment.date, Appointment.time, Appointment.id)
+        .limit(page_size + 1)
+        .all()
+    )
+    next_cursor = page_cursor(rows[page_size - 1][0]) if len(rows) > page_size else None
+    return Page(rows[:page_size], next_cursor)
+
+
+def count_by_status(session, filters=None):
+    """
+    Totais de agendamentos por status, respeitando data e cliente.
+
+    O filtro de status é ignorado para que todos os totais continuem visíveis.
+
+    Returns:
+        dict: {status: quantidade}
+    """
+    filters = filters or AppointmentFilters()
+    query = session.query(Appointment.status, func.count(Appointment.id))
+    query = _apply_filters(query, filters, with_status=False)
+    return dict(query.group_by(Appointment.status).all())
+
+
+def list_user_appointments(session, user_id, before=None, page_size=20):
+    """
+    Histórico de um cliente, do mais recente para o mais antigo.
+
+    Serviço e usuário vêm carregados na mesma consulta (sem uma consulta por
+    card), então os objetos podem ser usados depois de fechar a sessão.
+
+    Args:
+        session: Sessão do banco de dados
+        user_id: ID do cliente
+        before: Cursor (date, time, id) da última linha da página anterior
+        page_size: Quantidade de linhas por página
+
+    Returns:
+        Page: agendamentos da página e cursor da próxima (None se for a última)
+    """
+    query = (
+        session.query(Appointment)
+        .join(Appointment.service)
+        .join(Appointment.user)
+        .options(contains_eager(Appointment.service), contains_eager(Appointment.user))
+        .filter(Appointment.user_id == user_id)
+    )
+    if before is not None:
+        query = query.filter(
+            tuple_(Appointment.date, Appointment.time, Appointment.id) < tuple_(*before)
+        )
+
+    rows = (
+        query.order_by(Appointment.date.desc(), Appointment.time.desc(), Appointment.id.desc())
+        .limit(page_size + 1)
+        .all()
+    )
+    next_cursor = page_cursor(rows[page_size - 1]) if len(rows) > page_size else None
+    return Page(rows[:page_size], next_cursor)
+
+
+def _capacities(session):
+    """Limite por dia da semana (0 ou ausente = sem limite)."""
+    return {weekday: limit for weekday, limit in session.query(Config.weekday, Config.max_appointments)}
+
+
+def day_availability(session, day):
+    """Ocupação de um único dia: duas buscas por chave primária."""
+    booked = session.query(DailyLoad.booked).filter(DailyLoad.date == day).scalar() or 0
+    capacity = session.query(Config.max_appointments).filter(Config.weekday == day.weekday()).scalar()
+    return DayAvailability(day, booked, capacity)
+
+
+def availability(session, start, days=60):
+    """
+    Ocupação dos próximos `days` dias a partir de `start`.
+
+    A contagem vem de uma única consulta por intervalo em `daily_load`
+    (mais os 7 limites de `config`), sem contar agendamentos.
+
+    Returns:
+        list[DayAvailability]: um item por dia, em ordem
+    """
+    end = start + timedelta(days=days - 1)
+    booked = dict(
+        session.query(DailyLoad.date, DailyLoad.booked)
+        .filter(DailyLoad.date.between(start, end))
+    )
+    capacities = _capacities(session)
+    return [
+        DayAvailability(day, booked.get(day, 0), capacities.get(day.weekday()))
+        for day in (start + timedelta(days=i) for i in range(days))
+    ]
+
+
+def reservation(**fields):
+    """
+    Escrita que cria um agendamento somente se o dia ainda tiver vaga.
+
+    A checagem de capacidade e o INSERT são um único comando
+    (INSERT ... SELECT ... WHERE), então o SQLite faz os dois sob o mesmo
+    lock de escrita: dois clientes enviando ao mesmo tempo não conseguem
+    ocupar a última vaga duas vezes.
+
+    Args:
+        **fields: Colunas do Appointment (date é obrigatório)
+
+    Returns:
+        função `fn(session)` que retorna o ID criado ou None se o dia estiver
+        cheio (sem commit; ver reserve_appointment e write_queue.run_write)
+    """
+    day = fields["date"]
+    columns = [Appointment.__table__.c[name] for name in fields]
+    values = [literal(value, type_=column.type) for column, value in zip(columns, fields.values())]
+
+    capacity = (
+        select(Config.max_appointments)
+        .where(Config.weekday == day.weekday())
+        .scalar_subquery()
+    )
+    booked = (
+        select(DailyLoad.booked)
+        .where(DailyLoad.date == day)
+        .scalar_subquery()
+    )
+    stmt = insert(Appointment).from_select(
+        columns,
+        select(*values).where(
+            or_(func.coalesce(capacity, 0) == 0, func.coalesce(booked, 0) < capacity)
+        )
+    )
+
+    def reserve(session):
+        result = session.execute(stmt)
+        if not result.rowcount:
+            return None
+        UploadStore.acquire(session, fields.get("image_path"))
+        return result.lastrowid
+    return reserve
+
+
+def reserve_appointment(session, retries=5, **fields):
+    """
+    Cria um agendamento somente se o dia ainda tiver vaga e faz commit.
+
+    O lock de escrita dura só o INSERT e o commit. Se o banco estiver
+    ocupado além do busy_timeout, tenta de novo com espera crescente.
+
+    Args:
+        session: Sessão do banco de dados (é commitada)
+        retries: Tentativas extras quando o banco está bloqueado
+        **fields: Colunas do Appointment (date é obrigatório)
+
+    Returns:
+        int or None: ID do agendamento criado, None se o dia estiver cheio
+    """
+    return commit_with_retry(session, reservation(**fields), retries)
+
+
+def status_change(appointment_id, status):
+    """Escrita que muda o status de um agendamento (ver write_queue.run_write)."""
+    stmt = update(Appointment).where(Appointment.id == appointment_id).values(status=status)
+    return lambda session: session.execute(stmt).rowcount
+
+
+def removal(appointment_id):
+    """Escrita que remove um agendamento e libera sua foto (ver write_queue.run_write)."""
+    def remove(session):
+        image_path = session.query(Appointment.image_path).filter(Appointment.id == appointment_id).scalar()
+        removed = session.execute(delete(Appointment).where(Appointment.id == appointment_id)).rowcount
+        if removed:
+            UploadStore.release(session, image_path)
+        return removed
+    return remove
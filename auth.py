@@ -0,0 +1,525 @@
+import secrets
+import json
+import hmac
+import hashlib
+import base64
+import math
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, delete
+
+from config import settings
+from database import Session
+from models import AuthToken, RevokedToken, User
+
+# Resultado de uma autenticação: o que as páginas precisam saber do usuário
+AuthEntry = namedtuple('AuthEntry', ['user_id', 'username', 'is_admin', 'expires_at', 'token'])
+
+
+class TokenCache:
+    """
+    Cache em processo de cookies já validados, compartilhado entre sessões.
+
+    As chaves são o digest SHA-256 do cookie e os valores `AuthEntry`. Cada
+    entrada vale por no máximo `ttl` segundos e nunca além do `expires_at` do
+    token. Quando cheio, descarta a entrada usada há mais tempo (LRU).
+    """
+
+    def __init__(self, maxsize=1024, ttl=300, clock=time.time):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Retorna a entrada válida para a chave ou None."""
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            entry, valid_until = item
+            if self._clock() >= valid_until:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        valid_until = min(self._clock() + self.ttl, entry.expires_at)
+        with self._lock:
+            self._entries[key] = (entry, valid_until)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_token(self, token):
+        """Remove as entradas de um token (logout)."""
+        self._invalidate_where(lambda entry: entry.token == token)
+
+    def invalidate_user(self, user_id):
+        """Remove as entradas de um usuário (ex.: mudança de permissão ou exclusão)."""
+        self._invalidate_where(lambda entry: entry.user_id == user_id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _invalidate_where(self, predicate):
+        with self._lock:
+            for key in [k for k, (entry, _) in self._entries.items() if predicate(entry)]:
+                del self._entries[key]
+
+
+# Cache global de tokens validados
+token_cache = TokenCache(maxsize=settings.AUTH_CACHE_SIZE, ttl=settings.AUTH_CACHE_TTL)
+
+
+def cookie_digest(cookie_value):
+    """Chave de cache de um cookie (o cookie em si não fica na memória)."""
+    return hashlib.sha256(cookie_value.encode()).hexdigest()
+
+
+def token_digest(token):
+    """Identificador de um token na lista de revogação."""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class BloomFilter:
+    """Filtro de Bloom compacto: sem falsos negativos, falsos positivos raros."""
+
+    def __init__(self, capacity=10000, error_rate=0.01):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.sha256(key.encode()).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:16], "big") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self._bits[pos // 8] |= 1 << (pos % 8)
+
+    def __contains__(self, key):
+        return all(self._bits[pos // 8] & (1 << (pos % 8)) for pos in self._positions(key))
+
+
+class RevocationList:
+    """
+    Lista de tokens revogados antes de expirar.
+
+    Fica em memória como filtro de Bloom e é persistida na tabela
+    `revoked_tokens`, recarregada na inicialização do processo. Como o filtro
+    pode dar falso positivo, um acerto é confirmado na tabela `auth_tokens`.
+    """
+
+    def __init__(self, capacity=10000):
+        self.capacity = capacity
+        self._filter = BloomFilter(capacity)
+        self._count = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def load(self):
+        """(Re)carrega as revogações ainda válidas do banco."""
+        session = Session()
+        try:
+            digests = [
+                digest for (digest,) in session.query(RevokedToken.token_digest)
+                .filter(RevokedToken.expires_at >= int(time.time()))
+            ]
+        finally:
+            session.close()
+
+        bloom = BloomFilter(max(self.capacity, 2 * len(digests)))
+        for digest in digests:
+            bloom.add(digest)
+        with self._lock:
+            self._filter = bloom
+            self._count = len(digests)
+            self._loaded = True
+        return len(digests)
+
+    def might_contain(self, token):
+        if not self._loaded:
+            self.load()
+        return token_digest(token) in self._filter
+
+    def revoke(self, token, expires_at):
+        """Revoga um token até `expires_at` (memória e banco)."""
+        digest = token_digest(token)
+        session = Session()
+        try:
+            session.merge(RevokedToken(
+                token_digest=digest,
+                expires_at=int(expires_at),
+                revoked_at=int(time.time())
+            ))
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            raise e
+        finally:
+            session.close()
+
+        with self._lock:
+            self._filter.add(digest)
+            self._count += 1
+            grow = self._count > self.capacity
+        if grow:
+            # Filtro saturado: reconstruir com mais capacidade
+            self.capacity *= 2
+            self.load()
+
+
+# Lista de revogação global
+revocation_list = RevocationList(capacity=settings.REVOCATION_CAPACITY)
+
+# ---------- FUNÇÕES DE GERENCIAMENTO DE TOKENS ----------
+def generate_token():
+    """Gera um token aleatório seguro."""
+    return secrets.token_hex(32)
+
+def create_auth_token(user_id, expiry_hours=10, is_admin=None, username=None):
+    """
+    Cria um novo token de autenticação para o usuário.
+
+    O cookie retornado carrega expiração, nome e permissão assinados, então a
+    validação não precisa consultar o banco.
+
+    Args:
+        user_id: ID do usuário
+        expiry_hours: Horas até a expiração do token
+        is_admin: Se o usuário é administrador (consultado se omitido)
+        username: Nome de usuário (consultado se omitido)
+
+    Returns:
+        str: Token gerado
+    """
+    session = Session()
+    try:
+        if is_admin is None or username is None:
+            user = session.query(User).filter_by(id=user_id).first()
+            is_admin, username = user.is_admin, user.username
+
+        # Gerar novo token (tokens expirados são removidos pelo job cleanup_tokens.py)
+        token = generate_token()
+        now = datetime.now()
+        expires_at = int((now + timedelta(hours=expiry_hours)).timestamp())
+
+        # Salvar no banco de dados
+        auth_token = AuthToken(
+            user_id=user_id,
+            token=token,
+            created_at=now.isoformat(),
+            expires_at=expires_at
+        )
+        session.add(auth_token)
+        session.commit()
+
+        # Criar cookie seguro
+        cookie_value = create_secure_cookie(
+            user_id, token,
+            exp=expires_at, is_admin=bool(is_admin), username=username
+        )
+        return cookie_value
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+def authenticate(cookie_value):
+    """
+    Valida um cookie de autenticação.
+
+    Cookies assinados com expiração são verificados só com CPU (HMAC,
+    expiração e lista de revogação); o banco só é consultado quando o token
+    aparece na lista de revogação. Cookies no formato antigo passam pelo
+    cache de tokens e, na primeira vez, por uma única consulta ao banco.
+
+    Args:
+        cookie_value: Valor do cookie
+
+    Returns:
+        AuthEntry or None: dados do usuário se válido, None caso contrário
+    """
+    if not cookie_value:
+        return None
+
+    payload = decode_cookie_payload(cookie_value)
+    if not payload:
+        return None
+    if "exp" in payload:
+        return _authenticate_signed(payload)
+
+    key = cookie_digest(cookie_value)
+    entry = token_cache.get(key)
+    if entry is not None:
+        return entry
+
+    try:
+        user_id, token = payload["user_id"], payload["token"]
+        if not user_id or not token:
+            return None
+
+        # Verificar no banco de dados
+        session = Session()
+        try:
+            row = (
+                session.query(AuthToken.expires_at, User.username, User.is_admin)
+                .join(User, AuthToken.user_id == User.id)
+                .filter(AuthToken.user_id == user_id, AuthToken.token == token)
+                .first()
+            )
+        finally:
+            session.close()
+
+        if not row:
+            return None
+
+        # Verificar expiração
+        if time.time() > row.expires_at:
+            # Token expirado, remover
+            delete_auth_token(user_id, token)
+            return None
+
+        entry = AuthEntry(user_id, row.username, bool(row.is_admin), row.expires_at, token)
+        token_cache.put(key, entry)
+        return entry
+    except Exception:
+        return None
+
+def _authenticate_signed(payload):
+    """Valida o payload de um cookie assinado com expiração."""
+    try:
+        user_id, token, expires_at = payload["user_id"], payload["token"], payload["exp"]
+        if not user_id or not token or time.time() > expires_at:
+            return None
+
+        if revocation_list.might_contain(token) and not _token_active(user_id, token):
+            return None
+
+        return AuthEntry(user_id, payload.get("username"), bool(payload.get("is_admin")), expires_at, token)
+    except Exception:
+        return None
+
+def _token_active(user_id, token):
+    """Confirma no banco se um token ainda existe (usado só em acertos da lista de revogação)."""
+    session = Session()
+    try:
+        return session.query(AuthToken.id).filter(
+            AuthToken.user_id == user_id,
+            AuthToken.token == token,
+            AuthToken.expires_at >= int(time.time())
+        ).first() is not None
+    finally:
+        session.close()
+
+def validate_auth_token(cookie_value):
+    """
+    Valida um token de autenticação.
+
+    Args:
+        cookie_value: Valor do cookie
+
+    Returns:
+        int or None: ID do usuário se válido, None caso contrário
+    """
+    entry = authenticate(cookie_value)
+    return entry.user_id if entry else None
+
+def delete_auth_token(user_id, token):
+    """Revoga e remove um token específico do banco de dados."""
+    token_cache.invalidate_token(token)
+    session = Session()
+    try:
+        auth_token = session.query(AuthToken).filter_by(
+            user_id=user_id,
+            token=token
+        ).first()
+        if auth_token:
+            revocation_list.revoke(token, auth_token.expires_at)
+            session.delete(auth_token)
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+def revoke_user_tokens(user_id):
+    """
+    Revoga todos os tokens de um usuário.
+
+    Necessário quando a permissão ou a existência do usuário muda, já que os
+    cookies assinados carregam `is_admin` até expirar.
+    """
+    token_cache.invalidate_user(user_id)
+    session = Session()
+    try:
+        tokens = session.query(AuthToken.token).filter_by(user_id=user_id).all()
+    finally:
+        session.close()
+    for (token,) in tokens:
+        delete_auth_token(user_id, token)
+
+def cleanup_expired_tokens(batch_size=None):
+    """
+    Remove os tokens expirados (e revogações vencidas) do banco em lotes.
+
+    Cada lote apaga no máximo `batch_size` linhas numa transação curta, para
+    não segurar o lock de escrita enquanto a tabela é varrida.
+
+    Args:
+        batch_size: Linhas por lote (padrão: settings.TOKEN_CLEANUP_BATCH_SIZE)
+
+    Returns:
+        int: Quantidade de tokens removidos
+    """
+    if batch_size is None:
+        batch_size = settings.TOKEN_CLEANUP_BATCH_SIZE
+    now = int(time.time())
+    removed = _delete_in_batches(AuthToken, AuthToken.id, AuthToken.expires_at < now, batch_size)
+    _delete_in_batches(RevokedToken, RevokedToken.token_digest, RevokedToken.expires_at < now, batch_size)
+    return removed
+
+def _delete_in_batches(model, key_column, condition, batch_size):
+    expired_keys = select(key_column).where(condition).limit(batch_size).scalar_subquery()
+
+    total = 0
+    while True:
+        session = Session()
+        try:
+            result = session.execute(delete(model).where(key_column.in_(expired_keys)))
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            raise e
+        finally:
+            session.close()
+
+        total += result.rowcount
+        if result.rowcount < batch_size:
+            return total
+
+def logout_user(cookie_value):
+    """
+    Realiza o logout do usuário removendo o token.
+
+    Args:
+        cookie_value: Valor do cookie
+
+    Returns:
+        bool: True se logout bem-sucedido, False caso contrário
+    """
+    try:
+        token_cache.invalidate(cookie_digest(cookie_value))
+        user_id, token = decode_secure_cookie(cookie_value)
+        if user_id and token:
+            delete_auth_token(user_id, token)
+            return True
+        return False
+    except Exception:
+        return False
+
+def create_secure_cookie(user_id, token, secret_key=None, exp=None, is_admin=None, username=None):
+    """
+    Cria um cookie seguro com HMAC para verificação de integridade.
+
+    Args:
+        user_id: ID do usuário
+        token: Token de autenticação
+        secret_key: Chave secreta para assinatura (opcional)
+        exp: Expiração em segundos desde epoch (opcional; torna o cookie
+            verificável sem consulta ao banco)
+        is_admin: Permissão de administrador assinada junto (opcional)
+        username: Nome de usuário assinado junto (opcional)
+
+    Returns:
+        str: Valor codificado do cookie
+    """
+    if secret_key is None:
+        secret_key = settings.ADMIN_SECRET
+
+    data = {"user_id": user_id, "token": token}
+    if exp is not None:
+        data.update({"exp": int(exp), "is_admin": bool(is_admin), "username": username})
+    payload = json.dumps(data)
+    payload_b64 = base64.b64encode(payload.encode()).decode()
+
+    # Criar assinatura HMAC
+    signature = hmac.new(
+        secret_key.encode(),
+        payload_b64.encode(),
+        hashlib.sha256
+    ).hexdigest()
+
+    # Combinar payload e assinatura
+    return f"{payload_b64}.{signature}"
+
+def decode_cookie_payload(cookie_value, secret_key=None):
+    """
+    Verifica a assinatura de um cookie e retorna o payload completo.
+
+    Args:
+        cookie_value: Valor do cookie
+        secret_key: Chave secreta para verificação (opcional)
+
+    Returns:
+        dict or None: payload se a assinatura for válida
+    """
+    if secret_key is None:
+        secret_key = settings.ADMIN_SECRET
+
+    try:
+        # Separar payload e assinatura
+        payload_b64, signature = cookie_value.split(".")
+
+        # Verificar assinatura
+        expected_signature = hmac.new(
+            secret_key.encode(),
+            payload_b64.encode(),
+            hashlib.sha256
+        ).hexdigest()
+
+        if not hmac.compare_digest(signature, expected_signature):
+            return None
+
+        # Decodificar payload
+        return json.loads(base64.b64decode(payload_b64).decode())
+    except Exception:
+        return None
+
+def decode_secure_cookie(cookie_value, secret_key=None):
+    """
+    Decodifica e verifica um cookie seguro.
+
+    Args:
+        cookie_value: Valor do cookie
+        secret_key: Chave secreta para verificação (opcional)
+
+    Returns:
+        tuple: (user_id, token) se válido, (None, None) caso contrário
+    """
+    payload = decode_cookie_payload(cookie_value, secret_key)
+    if not payload:
+        return None, None
+    try:
+        return payload["user_id"], payload["token"]
+    except KeyError:
+        return None, None
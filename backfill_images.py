@@ -0,0 +1,32 @@
+import logging
+import sys
+from images import backfill_variants
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler('backfill_images.log'),
+        logging.StreamHandler()
+    ]
+)
+
+# Pastas com fotos enviadas
+IMAGE_DIRS = ['uploads', 'gallery']
+
+def main():
+    """Gera as variantes (thumb, medium, webp) das imagens já existentes"""
+    limit = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    try:
+        stats = backfill_variants(IMAGE_DIRS, limit=limit)
+        logging.info(
+            f"Variantes geradas: {stats['created']}, já existentes: {stats['skipped']}, "
+            f"erros: {stats['failed']}"
+        )
+    except Exception as e:
+        logging.error(f'Erro ao gerar variantes: {str(e)}')
+        raise
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,15 @@
 import os
-import sqlite3
-import shutil
+import json
 import boto3
-from datetime import datetime
 import logging
 from dotenv import load_dotenv
 
+from backup_store import BackupStore
+from backup_verify import verify_snapshot
+from db_restore import prepared_path, restore_database
+from s3_upload import S3Uploader
+from config import settings
+
 # Configurar logging
 logging.basicConfig(
     level=logging.INFO,
@@ -24,89 +28,170 @@ DB_PATH = os.getenv('DB_PATH', 'data/database_production.db')
 BACKUP_DIR = 'backups'
 S3_BUCKET = os.getenv('S3_BUCKET')
 S3_PREFIX = 'db_backups'
-RETENTION_DAYS = 7  # Manter backups dos últimos 7 dias
+RETENTION_DAYS = 7  # Manter os snapshots dos últimos 7 dias
+STANDBY_PATH = DB_PATH + '.standby'
+
+def get_store():
+    """Repositório de snapshots incrementais em BACKUP_DIR"""
+    return BackupStore(BACKUP_DIR, chunk_size=settings.BACKUP_CHUNK_SIZE)
 
 def create_backup():
-    """Cria um backup do banco de dados"""
+    """Cria um snapshot incremental do banco de dados (ver backup_store)"""
     try:
-        # Criar diretório de backups se não existir
-        os.makedirs(BACKUP_DIR, exist_ok=True)
-
-        # Nome do arquivo de backup com timestamp
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        backup_file = f'{BACKUP_DIR}/db_backup_{timestamp}.db'
+        result = get_store().snapshot(
+            DB_PATH,
+            pages=settings.BACKUP_PAGES_PER_STEP,
+            sleep=settings.BACKUP_STEP_SLEEP / 1000,
+            progress=progress_logger()
+        )
+
+        if result.unchanged:
+            logging.info(f'Banco sem alterações desde o snapshot {result.id}, nenhum snapshot novo')
+        else:
+            logging.info(
+                f'Snapshot criado com sucesso: {result.id} '
+                f'({len(result.new_chunks)} de {result.chunks} blocos novos, '
+                f'{result.stored_bytes / 1024 ** 2:.1f} MB gravados)'
+            )
+        return result
 
-        # Criar conexão com o banco de dados
-        conn = sqlite3.connect(DB_PATH)
-
-        # Criar backup
-        backup_conn = sqlite3.connect(backup_file)
-        conn.backup(backup_conn)
+    except Exception as e:
+        logging.error(f'Erro ao criar backup: {str(e)}')
+        raise
 
-        # Fechar conexões
-        backup_conn.close()
-        conn.close()
+def verify_backup(snapshot):
+    """
+    Restaura o snapshot num arquivo temporário e confere o conteúdo (ver backup_verify).
 
-        logging.info(f'Backup criado com sucesso: {backup_file}')
-        return backup_file
+    Com BACKUP_STANDBY, o banco restaurado e conferido vira a cópia de prontidão.
+    """
+    try:
+        keep = STANDBY_PATH if settings.BACKUP_STANDBY else None
+        result = verify_snapshot(get_store(), snapshot.id, keep=keep)
+        if not result['ok']:
+            raise RuntimeError(f'Snapshot {snapshot.id} não passou na verificação: {result}')
+        if keep:
+            with open(STANDBY_PATH + '.json', 'w') as f:
+                json.dump({'snapshot': snapshot.id}, f)
+            logging.info(f'Cópia de prontidão atualizada: {snapshot.id}')
+        return result
 
     except Exception as e:
-        logging.error(f'Erro ao criar backup: {str(e)}')
+        logging.error(f'Erro ao verificar backup: {str(e)}')
         raise
 
-def upload_to_s3(backup_file):
-    """Upload do backup para o S3"""
+def is_verified(snapshot):
+    """Se o snapshot já passou na verificação (ver verify_backup)"""
+    return get_store().load_manifest(snapshot.id).get('verification', {}).get('ok', False)
+
+def progress_logger(every=10):
+    """Função de progresso que registra o backup a cada `every`%"""
+    logged = {'percent': -every}
+
+    def log_progress(done, total):
+        percent = done * 100 // total if total else 100
+        if percent - logged['percent'] >= every or (percent == 100 and logged['percent'] != 100):
+            logged['percent'] = percent
+            logging.info(f'Backup: {percent}% ({done}/{total} páginas)')
+
+    return log_progress
+
+def s3_key(path):
+    """Chave no S3 de um arquivo do repositório de backups"""
+    relative = os.path.relpath(path, BACKUP_DIR).replace(os.sep, '/')
+    return f'{S3_PREFIX}/{relative}'
+
+def get_uploader():
+    """Envio para o S3 com retomada (estado em BACKUP_DIR)"""
+    return S3Uploader(
+        boto3.client('s3'),
+        S3_BUCKET,
+        os.path.join(BACKUP_DIR, 's3_upload_state.json'),
+        part_size=settings.S3_PART_SIZE,
+        concurrency=settings.S3_CONCURRENCY
+    )
+
+def upload_to_s3(snapshot):
+    """
+    Envia para o S3 os blocos novos e o manifesto de um snapshot.
+
+    O que ficou pendente de uma execução anterior (falha no envio) vai junto.
+    Sem snapshot (`None`), só o que estava pendente é enviado.
+    """
     if not S3_BUCKET:
         logging.warning('Bucket S3 não configurado, pulando upload')
         return
 
     try:
-        s3 = boto3.client('s3')
-        s3_key = f'{S3_PREFIX}/{os.path.basename(backup_file)}'
-
-        s3.upload_file(backup_file, S3_BUCKET, s3_key)
-        logging.info(f'Backup enviado para S3: {s3_key}')
+        uploader = get_uploader()
+        if snapshot is not None:
+            uploader.enqueue((path, s3_key(path)) for path in snapshot.new_chunks + [snapshot.manifest_path])
+
+        # Blocos antes dos manifestos: um manifesto no S3 sempre tem seus blocos
+        pending = uploader.pending()
+        manifest_prefix = f'{S3_PREFIX}/manifests/'
+        uploader.upload_files([item for item in pending if not item[1].startswith(manifest_prefix)])
+        uploader.upload_files([item for item in pending if item[1].startswith(manifest_prefix)])
+        if snapshot is not None:
+            logging.info(f'Snapshot {snapshot.id} enviado para S3 ({len(pending)} arquivos)')
+        elif pending:
+            logging.info(f'{len(pending)} arquivos pendentes enviados para S3')
 
     except Exception as e:
         logging.error(f'Erro ao enviar backup para S3: {str(e)}')
         raise
 
+def delete_from_s3(paths):
+    """Apaga do S3 os arquivos removidos localmente pela retenção"""
+    if not S3_BUCKET or not paths:
+        return
+
+    s3 = boto3.client('s3')
+    keys = [{'Key': s3_key(path)} for path in paths]
+    for i in range(0, len(keys), 1000):
+        s3.delete_objects(Bucket=S3_BUCKET, Delete={'Objects': keys[i:i + 1000], 'Quiet': True})
+    logging.info(f'{len(keys)} arquivos antigos removidos do S3')
+
 def cleanup_old_backups():
-    """Remove backups antigos"""
+    """Mantém os RETENTION_DAYS snapshots mais recentes e apaga os blocos sem referência"""
     try:
-        # Listar arquivos de backup
-        backup_files = [f for f in os.listdir(BACKUP_DIR) if f.startswith('db_backup_')]
-
-        # Ordenar por data (mais recente primeiro)
-        backup_files.sort(reverse=True)
+        store = get_store()
+        removed_snapshots = store.prune(RETENTION_DAYS)
+        removed_chunks = store.gc()
 
-        # Manter apenas os backups dos últimos RETENTION_DAYS dias
-        for old_file in backup_files[RETENTION_DAYS:]:
-            file_path = os.path.join(BACKUP_DIR, old_file)
-            os.remove(file_path)
-            logging.info(f'Backup antigo removido: {old_file}')
+        delete_from_s3([store.manifest_path(snapshot_id) for snapshot_id in removed_snapshots] + removed_chunks)
 
     except Exception as e:
         logging.error(f'Erro ao limpar backups antigos: {str(e)}')
         raise
 
-def restore_backup(backup_file):
-    """Restaura um backup do banco de dados"""
+def standby_snapshot():
+    """ID do snapshot da cópia de prontidão, ou None"""
     try:
-        # Criar backup do banco atual antes de restaurar
-        current_backup = create_backup()
-        logging.info(f'Backup do banco atual criado: {current_backup}')
-
-        # Restaurar backup
-        conn = sqlite3.connect(DB_PATH)
-        backup_conn = sqlite3.connect(backup_file)
-        backup_conn.backup(conn)
-
-        # Fechar conexões
-        backup_conn.close()
-        conn.close()
+        with open(STANDBY_PATH + '.json') as f:
+            snapshot_id = json.load(f)['snapshot']
+    except (FileNotFoundError, ValueError, KeyError):
+        return None
+    return snapshot_id if os.path.exists(STANDBY_PATH) else None
+
+def restore_backup(snapshot_id):
+    """
+    Restaura o banco de dados a partir de um snapshot (ver db_restore).
+
+    O snapshot é remontado e conferido ao lado do banco e trocado de uma vez;
+    o banco atual fica em <DB_PATH>.previous. Se a cópia de prontidão for
+    desse snapshot, ela é usada no lugar da remontagem dos blocos.
+    Recusa a troca se o app estiver com o banco aberto.
+    """
+    try:
+        if standby_snapshot() == snapshot_id:
+            source = STANDBY_PATH
+        else:
+            source = get_store().restore(snapshot_id, prepared_path(DB_PATH))
 
-        logging.info(f'Backup restaurado com sucesso: {backup_file}')
+        result = restore_database(source, DB_PATH)
+        logging.info(f'Backup restaurado com sucesso: {snapshot_id} ({result.duration:.1f} s)')
+        return result
 
     except Exception as e:
         logging.error(f'Erro ao restaurar backup: {str(e)}')
@@ -115,11 +200,16 @@ def restore_backup(backup_file):
 def main():
     """Função principal de backup"""
     try:
-        # Criar backup
-        backup_file = create_backup()
-
-        # Upload para S3
-        upload_to_s3(backup_file)
+        # Criar snapshot e conferir que ele restaura
+        snapshot = create_backup()
+        if snapshot.unchanged and is_verified(snapshot):
+            # Nada mudou: o snapshot anterior continua valendo e já foi conferido e enviado
+            upload_to_s3(None)
+        else:
+            verify_backup(snapshot)
+
+            # Upload para S3
+            upload_to_s3(snapshot)
 
         # Limpar backups antigos
         cleanup_old_backups()
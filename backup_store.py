@@ -0,0 +1,384 @@
+"""
+Backups incrementais do banco SQLite: blocos comprimidos e deduplicados.
+
+Cada snapshot é um backup online (sqlite_backup) dividido em blocos de
+tamanho fixo. Cada bloco é guardado uma única vez, comprimido e endereçado
+pelo SHA-256 do conteúdo original; o manifesto do snapshot lista os blocos
+em ordem. Entre um dia e outro só as partes do banco que mudaram geram
+blocos novos.
+
+    <raiz>/manifests/<id>.json
+    <raiz>/chunks/<ab>/<sha256>.zst   (ou .gz)
+
+A compressão é zstd se o pacote `zstandard` estiver instalado, senão gzip.
+A restauração remonta o arquivo e confere tamanho e SHA-256 com o manifesto;
+o manifesto também guarda contagem e checksum de cada tabela, usados pela
+verificação (backup_verify).
+`prune` apaga os manifestos antigos e `gc` os blocos sem referência.
+
+Banco sem alterações não gera snapshot novo: o último manifesto só ganha a
+data da conferência (`unchanged_at`). Primeiro compara-se tamanho e mtime do
+banco e do -wal com os do último snapshot (sem ler o banco); se mudaram, a
+cópia online é dividida em blocos e a lista de blocos é comparada.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from backup_verify import table_stats
+from sqlite_backup import backup_database
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Blocos pequenos deduplicam melhor: um dia de uso muda páginas espalhadas
+# pelo arquivo (índices), e cada página alterada invalida o bloco inteiro
+CHUNK_SIZE = 64 * 1024
+
+# Blocos recém-gravados ainda sem manifesto não são apagados antes disso,
+# para não disputar com um snapshot em andamento
+GC_GRACE_SECONDS = 3600
+
+EXTENSIONS = {"zstd": ".zst", "gzip": ".gz"}
+
+SNAPSHOT_ID_FORMAT = "%Y%m%d_%H%M%S_%f"
+
+SnapshotResult = namedtuple(
+    "SnapshotResult",
+    ["id", "manifest_path", "size", "chunks", "new_chunks", "stored_bytes", "duration", "unchanged"]
+)
+
+logger = logging.getLogger(__name__)
+
+
+def snapshot_id_for(moment):
+    """ID de um snapshot capturado em `moment` (ordenável como texto)."""
+    return moment.strftime(SNAPSHOT_ID_FORMAT)
+
+
+def source_fingerprint(db_path):
+    """Tamanho e mtime (ns) do banco e do -wal: mudam a cada escrita."""
+    fingerprint = {}
+    for name, path in (("db", db_path), ("wal", db_path + "-wal")):
+        try:
+            stat = os.stat(path)
+            fingerprint[name] = [stat.st_size, stat.st_mtime_ns]
+        except FileNotFoundError:
+            fingerprint[name] = None
+    return fingerprint
+
+
+class BackupCorrupted(Exception):
+    """O arquivo restaurado não confere com o manifesto."""
+
+
+class BackupStore:
+    def __init__(self, root, chunk_size=CHUNK_SIZE, compression=None, level=None):
+        if compression is None:
+            compression = "zstd" if zstandard else "gzip"
+        if compression == "zstd" and zstandard is None:
+            raise ValueError("Compressão zstd requer o pacote zstandard")
+        if compression not in EXTENSIONS:
+            raise ValueError(f"Compressão desconhecida: {compression}")
+        self.root = root
+        self.chunk_size = chunk_size
+        self.compression = compression
+        self.level = level
+        self.manifest_dir = os.path.join(root, "manifests")
+        self.chunk_dir = os.path.join(root, "chunks")
+
+    # ---------- Blocos ----------
+    def chunk_path(self, digest, compression=None):
+        extension = EXTENSIONS[compression or self.compression]
+        return os.path.join(self.chunk_dir, digest[:2], digest + extension)
+
+    def find_chunk(self, digest):
+        """Caminho do bloco já guardado (em qualquer compressão), ou None."""
+        for compression in EXTENSIONS:
+            path = self.chunk_path(digest, compression)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _compress(self, data):
+        if self.compression == "zstd":
+            return zstandard.ZstdCompressor(level=self.level or 3).compress(data)
+        return gzip.compress(data, compresslevel=self.level or 6)
+
+    @staticmethod
+    def _decompress(path, data):
+        if path.endswith(EXTENSIONS["zstd"]):
+            if zstandard is None:
+                raise BackupCorrupted(f"{path} é zstd, mas o pacote zstandard não está instalado")
+            return zstandard.ZstdDecompressor().decompress(data)
+        return gzip.decompress(data)
+
+    def _store_chunk(self, digest, data):
+        """Grava um bloco se ainda não existir. Retorna (caminho, bytes gravados)."""
+        existing = self.find_chunk(digest)
+        if existing:
+            # Renovar o mtime protege o bloco do gc até o manifesto ser gravado
+            os.utime(existing)
+            return existing, 0
+
+        path = self.chunk_path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        compressed = self._compress(data)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(compressed)
+        os.replace(tmp_path, path)
+        return path, len(compressed)
+
+    # ---------- Snapshots ----------
+    def snapshot(self, db_path, with_stats=True, extra=None, skip_unchanged=True, **backup_options):
+        """
+        Cria um snapshot do banco em uso.
+
+        O ID do snapshot é o instante em que a cópia começou: o conteúdo é o
+        do banco nesse momento (a cópia online mantém uma leitura consistente).
+
+        Args:
+            db_path: Caminho do banco SQLite
+            with_stats: Guardar contagem e checksum das tabelas (ver `snapshot_file`)
+            extra: Campos adicionais do manifesto
+            skip_unchanged: Banco igual ao do último snapshot não gera snapshot novo
+            **backup_options: Repassados para `backup_database` (pages, sleep, progress)
+
+        Returns:
+            SnapshotResult (`unchanged=True` e o ID do último snapshot se nada mudou)
+        """
+        start = time.perf_counter()
+        os.makedirs(self.root, exist_ok=True)
+        captured_at = datetime.now()
+        # Antes da cópia: escritas durante a cópia mudam o mtime de novo
+        fingerprint = source_fingerprint(db_path)
+        latest = self._unchanged_base() if skip_unchanged else None
+        if latest and latest["source"] == db_path and latest.get("source_stat") == fingerprint:
+            return self._record_unchanged(latest, captured_at, start)
+
+        fd, copy_path = tempfile.mkstemp(dir=self.root, suffix=".db")
+        os.close(fd)
+        try:
+            backup_database(db_path, copy_path, **backup_options)
+            return self.snapshot_file(copy_path, source=db_path, with_stats=with_stats,
+                                      captured_at=captured_at, extra=extra,
+                                      skip_unchanged=skip_unchanged, source_stat=fingerprint)
+        finally:
+            os.remove(copy_path)
+
+    def snapshot_file(self, path, source=None, with_stats=True, captured_at=None, extra=None,
+                      skip_unchanged=True, source_stat=None):
+        """
+        Divide em blocos um arquivo que não está sendo alterado (ex.: cópia do backup).
+
+        Com `with_stats`, a contagem e o checksum de cada tabela (usados na
+        verificação) são calculados ao mesmo tempo e guardados no manifesto.
+        `captured_at` (padrão: agora) dá o ID do snapshot. Com `skip_unchanged`,
+        um arquivo com os mesmos blocos do último snapshot não gera snapshot novo.
+        """
+        start = time.perf_counter()
+        captured_at = captured_at or datetime.now()
+        snapshot_id = snapshot_id_for(captured_at)
+        latest = self._unchanged_base() if skip_unchanged else None
+        whole = hashlib.sha256()
+        chunks, new_chunks = [], []
+        size = stored_bytes = 0
+
+        previous = latest["chunks"] if latest and latest["chunk_size"] == self.chunk_size else None
+        stats = None
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            with open(path, "rb") as f:
+                for data in iter(lambda: f.read(self.chunk_size), b""):
+                    whole.update(data)
+                    size += len(data)
+                    digest = hashlib.sha256(data).hexdigest()
+                    # As estatísticas só começam no primeiro bloco diferente do último
+                    # snapshot (normalmente o primeiro: o cabeçalho muda a cada commit)
+                    if with_stats and stats is None and (
+                        previous is None or len(chunks) >= len(previous) or previous[len(chunks)] != digest
+                    ):
+                        stats = pool.submit(table_stats, path)
+                    chunk_path, written = self._store_chunk(digest, data)
+                    if written:
+                        new_chunks.append(chunk_path)
+                        stored_bytes += written
+                    chunks.append(digest)
+
+            if previous == chunks:
+                return self._record_unchanged(latest, captured_at, start, source_stat)
+            if with_stats and stats is None:
+                # Arquivo igual ao início do último snapshot, só mais curto
+                stats = pool.submit(table_stats, path)
+            tables = stats.result() if stats else None
+
+        manifest = {
+            "id": snapshot_id,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "captured_at": captured_at.isoformat(),
+            "source": source or path,
+            "size": size,
+            "sha256": whole.hexdigest(),
+            "chunk_size": self.chunk_size,
+            "chunks": chunks,
+        }
+        if source_stat is not None:
+            manifest["source_stat"] = source_stat
+        if tables is not None:
+            manifest["tables"] = tables
+        manifest.update(extra or {})
+        manifest_path = self._write_manifest(manifest)
+
+        result = SnapshotResult(snapshot_id, manifest_path, size, len(chunks), new_chunks,
+                                stored_bytes, time.perf_counter() - start, False)
+        logger.info(
+            "Snapshot %s: %s blocos, %s novos, %.1f MB gravados de %.1f MB (%.1f s)",
+            snapshot_id, len(chunks), len(new_chunks), stored_bytes / 1024 ** 2, size / 1024 ** 2,
+            result.duration
+        )
+        return result
+
+    def _unchanged_base(self):
+        """Último manifesto, se ele puder valer por um snapshot novo (não falhou na verificação)."""
+        latest = self.latest_manifest()
+        if latest and latest.get("verification", {}).get("ok", True):
+            return latest
+        return None
+
+    def _record_unchanged(self, manifest, captured_at, start, source_stat=None):
+        """Anota no último manifesto uma conferência sem alterações."""
+        manifest.setdefault("unchanged_at", []).append(captured_at.isoformat())
+        if source_stat is not None:
+            manifest["source_stat"] = source_stat
+        manifest_path = self._write_manifest(manifest)
+
+        result = SnapshotResult(manifest["id"], manifest_path, manifest["size"], len(manifest["chunks"]),
+                                [], 0, time.perf_counter() - start, True)
+        logger.info("Banco sem alterações desde o snapshot %s (%.2f s)", manifest["id"], result.duration)
+        return result
+
+    # ---------- Manifestos ----------
+    def manifest_path(self, snapshot_id):
+        return os.path.join(self.manifest_dir, f"{snapshot_id}.json")
+
+    def _write_manifest(self, manifest):
+        os.makedirs(self.manifest_dir, exist_ok=True)
+        path = self.manifest_path(manifest["id"])
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, path)
+        return path
+
+    def update_manifest(self, snapshot_id, **fields):
+        """Acrescenta campos ao manifesto (ex.: resultado da verificação)."""
+        manifest = self.load_manifest(snapshot_id)
+        manifest.update(fields)
+        return self._write_manifest(manifest)
+
+    def snapshots(self):
+        """IDs dos snapshots, do mais antigo para o mais recente."""
+        if not os.path.isdir(self.manifest_dir):
+            return []
+        return sorted(f[:-5] for f in os.listdir(self.manifest_dir) if f.endswith(".json"))
+
+    def load_manifest(self, snapshot_id):
+        with open(self.manifest_path(snapshot_id)) as f:
+            return json.load(f)
+
+    def latest_manifest(self):
+        """Manifesto do snapshot mais recente, ou None."""
+        snapshots = self.snapshots()
+        return self.load_manifest(snapshots[-1]) if snapshots else None
+
+    # ---------- Restauração ----------
+    def restore(self, snapshot_id, destination):
+        """
+        Remonta o banco de um snapshot em `destination`.
+
+        Raises:
+            BackupCorrupted: bloco faltando ou arquivo diferente do manifesto
+        """
+        manifest = self.load_manifest(snapshot_id)
+        tmp_path = destination + ".part"
+        whole = hashlib.sha256()
+        size = 0
+        try:
+            with open(tmp_path, "wb") as out:
+                for digest in manifest["chunks"]:
+                    path = self.find_chunk(digest)
+                    if path is None:
+                        raise BackupCorrupted(f"Bloco {digest} do snapshot {snapshot_id} não encontrado")
+                    with open(path, "rb") as f:
+                        data = self._decompress(path, f.read())
+                    whole.update(data)
+                    size += len(data)
+                    out.write(data)
+            if size != manifest["size"] or whole.hexdigest() != manifest["sha256"]:
+                raise BackupCorrupted(f"Snapshot {snapshot_id} restaurado não confere com o manifesto")
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        os.replace(tmp_path, destination)
+        return destination
+
+    # ---------- Retenção ----------
+    def prune(self, keep=None, before=None):
+        """
+        Apaga os manifestos além dos `keep` mais recentes e/ou os capturados
+        antes de `before` (datetime). O mais recente nunca é apagado, nem o
+        último capturado até `before`: sem mudanças no banco não há snapshot
+        novo, então ele ainda descreve o banco a partir de `before`.
+
+        Returns:
+            list: IDs apagados
+        """
+        snapshots = self.snapshots()
+        removed = set(snapshots[:-keep] if keep else [])
+        if before is not None:
+            cutoff = snapshot_id_for(before)
+            older = [snapshot_id for snapshot_id in snapshots if snapshot_id < cutoff]
+            removed.update(older[:-1])
+        removed = sorted(removed)
+        for snapshot_id in removed:
+            os.remove(self.manifest_path(snapshot_id))
+            logger.info("Snapshot antigo removido: %s", snapshot_id)
+        return removed
+
+    def gc(self, grace_seconds=GC_GRACE_SECONDS):
+        """
+        Apaga os blocos que nenhum manifesto referencia.
+
+        Returns:
+            list: Caminhos dos blocos apagados
+        """
+        referenced = set()
+        for snapshot_id in self.snapshots():
+            referenced.update(self.load_manifest(snapshot_id)["chunks"])
+
+        cutoff = time.time() - grace_seconds
+        removed = []
+        if not os.path.isdir(self.chunk_dir):
+            return removed
+        for directory, _, files in os.walk(self.chunk_dir):
+            for filename in files:
+                path = os.path.join(directory, filename)
+                digest = filename.split(".")[0]
+                in_use = digest in referenced and not filename.endswith(".tmp")
+                if in_use or os.path.getmtime(path) > cutoff:
+                    continue
+                os.remove(path)
+                removed.append(path)
+        if removed:
+            logger.info("%s blocos sem referência removidos", len(removed))
+        return removed
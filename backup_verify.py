@@ -0,0 +1,168 @@
+"""
+Verificação dos backups: restaurar e conferir o conteúdo.
+
+No snapshot, cada tabela da cópia consistente do banco ganha uma contagem
+de linhas e um checksum (SHA-256 das linhas em ordem de rowid), guardados no
+manifesto. A verificação remonta o snapshot num arquivo temporário, roda
+`PRAGMA quick_check` (ou `integrity_check` completo, com `full=True`) e
+`PRAGMA foreign_key_check` e recalcula contagem e checksum de cada tabela
+para comparar com o manifesto. O resultado também
+vai para o manifesto (`verification`).
+
+As tabelas são lidas em paralelo, cada uma numa conexão própria: o SQLite
+e o hashlib (em blocos grandes) liberam o GIL enquanto trabalham.
+"""
+import hashlib
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+WORKERS = 4
+BATCH_ROWS = 1000
+
+logger = logging.getLogger(__name__)
+
+
+def list_tables(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+        )]
+    finally:
+        conn.close()
+
+
+def table_checksum(db_path, table):
+    """Contagem de linhas e SHA-256 das linhas de uma tabela, em ordem de rowid."""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        quoted = '"' + table.replace('"', '""') + '"'
+        try:
+            cursor = conn.execute(f"SELECT * FROM {quoted} ORDER BY rowid")
+        except sqlite3.OperationalError:
+            # Tabela WITHOUT ROWID: ordenar pela chave primária (primeiras colunas)
+            cursor = conn.execute(f"SELECT * FROM {quoted} ORDER BY 1")
+        digest = hashlib.sha256()
+        rows = 0
+        while True:
+            batch = cursor.fetchmany(BATCH_ROWS)
+            if not batch:
+                break
+            rows += len(batch)
+            digest.update("\n".join(map(repr, batch)).encode())
+        return {"rows": rows, "checksum": digest.hexdigest()}
+    finally:
+        conn.close()
+
+
+def table_stats(db_path, workers=WORKERS):
+    """Contagem e checksum de todas as tabelas, lidas em paralelo."""
+    tables = list_tables(db_path)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(lambda table: table_checksum(db_path, table), tables)
+        return dict(zip(tables, results))
+
+
+def integrity_check(db_path, full=False):
+    """
+    `PRAGMA quick_check` por padrão: confere páginas e registros como o
+    `integrity_check`, mas sem cruzar índices com tabelas (bem mais rápido).
+    """
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        pragma = "integrity_check" if full else "quick_check"
+        return [row[0] for row in conn.execute(f"PRAGMA {pragma}")]
+    finally:
+        conn.close()
+
+
+def foreign_key_violations(db_path):
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        return len(conn.execute("PRAGMA foreign_key_check").fetchall())
+    finally:
+        conn.close()
+
+
+def verify_database(db_path, expected_tables, workers=WORKERS, full=False):
+    """
+    Confere um banco restaurado contra as estatísticas do snapshot.
+
+    Integridade, chaves estrangeiras e cada tabela rodam em paralelo.
+
+    Returns:
+        dict: resultado (`ok`, `integrity`, `foreign_key_violations`, `mismatches`...)
+    """
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        integrity = pool.submit(integrity_check, db_path, full)
+        violations = pool.submit(foreign_key_violations, db_path)
+        tables = list_tables(db_path)
+        checksums = dict(zip(tables, pool.map(lambda table: table_checksum(db_path, table), tables)))
+        integrity, violations = integrity.result(), violations.result()
+
+    mismatches = sorted(
+        table for table in set(expected_tables) | set(checksums)
+        if expected_tables.get(table) != checksums.get(table)
+    )
+    return {
+        "verified_at": datetime.now().isoformat(timespec="seconds"),
+        "ok": integrity == ["ok"] and violations == 0 and not mismatches,
+        "integrity_check": "integrity_check" if full else "quick_check",
+        "integrity": integrity[:10],
+        "foreign_key_violations": violations,
+        "tables": len(checksums),
+        "rows": sum(stats["rows"] for stats in checksums.values()),
+        "mismatches": mismatches,
+        "duration": round(time.perf_counter() - start, 3),
+    }
+
+
+def verify_snapshot(store, snapshot_id, workers=WORKERS, full=False, keep=None):
+    """
+    Restaura um snapshot num arquivo temporário, confere e grava o resultado no manifesto.
+
+    Args:
+        store: BackupStore do snapshot
+        snapshot_id: ID do snapshot
+        full: `integrity_check` completo em vez do `quick_check`
+        keep: Se a verificação passar, guardar aqui o banco restaurado
+            (cópia de prontidão para uma restauração rápida)
+
+    Returns:
+        dict: resultado da verificação (ver `verify_database`)
+    """
+    start = time.perf_counter()
+    manifest = store.load_manifest(snapshot_id)
+    fd, restored = tempfile.mkstemp(dir=store.root, suffix=".verify.db")
+    os.close(fd)
+    try:
+        store.restore(snapshot_id, restored)
+        restore_seconds = time.perf_counter() - start
+        result = verify_database(restored, manifest.get("tables", {}), workers, full)
+        if "tables" not in manifest:
+            # Snapshot sem estatísticas: só integridade e chaves estrangeiras
+            result["mismatches"] = []
+            result["ok"] = result["integrity"] == ["ok"] and result["foreign_key_violations"] == 0
+        if keep and result["ok"]:
+            shutil.move(restored, keep)
+    finally:
+        if os.path.exists(restored):
+            os.remove(restored)
+
+    result["restore_duration"] = round(restore_seconds, 3)
+    store.update_manifest(snapshot_id, verification=result)
+
+    log = logger.info if result["ok"] else logger.error
+    log("Verificação do snapshot %s: %s (integridade %s, %s violações de FK, tabelas divergentes: %s, "
+        "restauração %.2f s, conferência %.2f s)",
+        snapshot_id, "ok" if result["ok"] else "FALHOU", result["integrity"][0] if result["integrity"] else "-",
+        result["foreign_key_violations"], result["mismatches"] or "nenhuma",
+        result["restore_duration"], result["duration"])
+    return result
@@ -0,0 +1,24 @@
+import logging
+from auth import cleanup_expired_tokens
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler('cleanup_tokens.log'),
+        logging.StreamHandler()
+    ]
+)
+
+def main():
+    """Remove os tokens de autenticação expirados em lotes"""
+    try:
+        removed = cleanup_expired_tokens()
+        logging.info(f'Tokens expirados removidos: {removed}')
+    except Exception as e:
+        logging.error(f'Erro ao remover tokens expirados: {str(e)}')
+        raise
+
+if __name__ == '__main__':
+    main()
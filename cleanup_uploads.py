@@ -0,0 +1,29 @@
+import logging
+from config import settings
+from database import Session
+from upload_store import UploadStore
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler('cleanup_uploads.log'),
+        logging.StreamHandler()
+    ]
+)
+
+def main():
+    """Apaga as fotos enviadas que não são mais usadas por nenhum registro"""
+    session = Session()
+    try:
+        removed = UploadStore(settings.UPLOAD_DIR, settings.UPLOAD_MAX_BYTES).sweep(session)
+        logging.info(f'Arquivos sem referência removidos: {removed}')
+    except Exception as e:
+        logging.error(f'Erro ao remover arquivos sem referência: {str(e)}')
+        raise
+    finally:
+        session.close()
+
+if __name__ == '__main__':
+    main()
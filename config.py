@@ -26,6 +26,62 @@ class Settings:
         self.WEATHER_API_KEY = os.getenv("WEATHER_API_KEY", "")
         self.WHATSAPP_LINK = os.getenv("WHATSAPP_LINK", "")
 
+        # Cache da previsão do tempo
+        self.WEATHER_API_URL = os.getenv("WEATHER_API_URL", "http://api.openweathermap.org/data/2.5")
+        self.WEATHER_CACHE_TTL = int(os.getenv("WEATHER_CACHE_TTL", "600"))
+        self.WEATHER_TIMEOUT = float(os.getenv("WEATHER_TIMEOUT", "5"))
+
+        # Ajustes do SQLite e do pool de conexões
+        self.SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+        self.SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+        self.SQLITE_BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000"))  # ms
+        self.SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-16000"))  # negativo = KiB
+        self.SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(128 * 1024 * 1024)))
+        self.SQLITE_FOREIGN_KEYS = os.getenv("SQLITE_FOREIGN_KEYS", "true").lower() in ("1", "true", "on")
+        self.DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+        self.DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+        self.DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+        # Cache de tokens de autenticação validados
+        self.AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "1024"))
+        self.AUTH_CACHE_TTL = int(os.getenv("AUTH_CACHE_TTL", "300"))
+        self.TOKEN_CLEANUP_BATCH_SIZE = int(os.getenv("TOKEN_CLEANUP_BATCH_SIZE", "500"))
+        self.TOKEN_CLEANUP_INTERVAL = int(os.getenv("TOKEN_CLEANUP_INTERVAL", "15"))  # minutos
+        self.REVOCATION_CAPACITY = int(os.getenv("REVOCATION_CAPACITY", "10000"))
+
+        # Fila de escritas com commit em grupo (opcional)
+        self.WRITE_QUEUE_ENABLED = os.getenv("WRITE_QUEUE_ENABLED", "false").lower() in ("1", "true", "on")
+        self.WRITE_QUEUE_MAX_BATCH = int(os.getenv("WRITE_QUEUE_MAX_BATCH", "32"))
+        self.WRITE_QUEUE_MAX_WAIT = float(os.getenv("WRITE_QUEUE_MAX_WAIT", "5"))  # ms
+
+        # Armazenamento de fotos enviadas
+        self.UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
+        self.UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(15 * 1024 * 1024)))
+
+        # Processamento de imagens em segundo plano
+        self.JOB_WORKERS = int(os.getenv("JOB_WORKERS", str(min(4, os.cpu_count() or 1))))
+        self.JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+        # Backup online em etapas (páginas por etapa e pausa entre etapas)
+        self.BACKUP_PAGES_PER_STEP = int(os.getenv("BACKUP_PAGES_PER_STEP", "1024"))
+        self.BACKUP_STEP_SLEEP = float(os.getenv("BACKUP_STEP_SLEEP", "5"))  # ms
+        self.BACKUP_CHUNK_SIZE = int(os.getenv("BACKUP_CHUNK_SIZE", str(64 * 1024)))  # bytes
+        # Cópia de prontidão: o último backup verificado fica pronto ao lado do banco
+        self.BACKUP_STANDBY = os.getenv("BACKUP_STANDBY", "false").lower() in ("1", "true", "on")
+
+        # Envio dos backups para o S3 (tamanho das partes e envios simultâneos)
+        self.S3_PART_SIZE = int(os.getenv("S3_PART_SIZE", str(8 * 1024 * 1024)))  # bytes
+        self.S3_CONCURRENCY = int(os.getenv("S3_CONCURRENCY", "4"))
+
+        # Recuperação para um instante: pontos incrementais a cada PITR_INTERVAL minutos
+        self.PITR_DIR = os.getenv("PITR_DIR", os.path.join("backups", "pitr"))
+        self.PITR_INTERVAL = int(os.getenv("PITR_INTERVAL", "5"))  # minutos
+        self.PITR_RETENTION_DAYS = int(os.getenv("PITR_RETENTION_DAYS", "7"))
+
+        # Logs do monitor: dias mantidos após a rotação e processos da varredura
+        self.LOG_RETENTION_DAYS = int(os.getenv("LOG_RETENTION_DAYS", "7"))
+        self.LOG_SCAN_WORKERS = int(os.getenv("LOG_SCAN_WORKERS", str(min(4, os.cpu_count() or 1))))
+
         # Tentar carregar variáveis de ambiente do arquivo .env
         self.load_env()
 
@@ -37,6 +93,41 @@ class Settings:
         self.ADMIN_SECRET = os.getenv("ADMIN_SECRET", self.ADMIN_SECRET)
         self.WEATHER_API_KEY = os.getenv("WEATHER_API_KEY", self.WEATHER_API_KEY)
         self.WHATSAPP_LINK = os.getenv("WHATSAPP_LINK", self.WHATSAPP_LINK)
+        self.WEATHER_API_URL = os.getenv("WEATHER_API_URL", self.WEATHER_API_URL)
+        self.WEATHER_CACHE_TTL = int(os.getenv("WEATHER_CACHE_TTL", self.WEATHER_CACHE_TTL))
+        self.WEATHER_TIMEOUT = float(os.getenv("WEATHER_TIMEOUT", self.WEATHER_TIMEOUT))
+        self.SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", self.SQLITE_JOURNAL_MODE)
+        self.SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", self.SQLITE_SYNCHRONOUS)
+        self.SQLITE_BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", self.SQLITE_BUSY_TIMEOUT))
+        self.SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", self.SQLITE_CACHE_SIZE))
+        self.SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", self.SQLITE_MMAP_SIZE))
+        self.SQLITE_FOREIGN_KEYS = str(os.getenv("SQLITE_FOREIGN_KEYS", self.SQLITE_FOREIGN_KEYS)).lower() in ("1", "true", "on")
+        self.DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", self.DB_POOL_SIZE))
+        self.DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", self.DB_MAX_OVERFLOW))
+        self.DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", self.DB_POOL_TIMEOUT))
+        self.AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", self.AUTH_CACHE_SIZE))
+        self.AUTH_CACHE_TTL = int(os.getenv("AUTH_CACHE_TTL", self.AUTH_CACHE_TTL))
+        self.TOKEN_CLEANUP_BATCH_SIZE = int(os.getenv("TOKEN_CLEANUP_BATCH_SIZE", self.TOKEN_CLEANUP_BATCH_SIZE))
+        self.TOKEN_CLEANUP_INTERVAL = int(os.getenv("TOKEN_CLEANUP_INTERVAL", self.TOKEN_CLEANUP_INTERVAL))
+        self.REVOCATION_CAPACITY = int(os.getenv("REVOCATION_CAPACITY", self.REVOCATION_CAPACITY))
+        self.WRITE_QUEUE_ENABLED = str(os.getenv("WRITE_QUEUE_ENABLED", self.WRITE_QUEUE_ENABLED)).lower() in ("1", "true", "on")
+        self.WRITE_QUEUE_MAX_BATCH = int(os.getenv("WRITE_QUEUE_MAX_BATCH", self.WRITE_QUEUE_MAX_BATCH))
+        self.WRITE_QUEUE_MAX_WAIT = float(os.getenv("WRITE_QUEUE_MAX_WAIT", self.WRITE_QUEUE_MAX_WAIT))
+        self.UPLOAD_DIR = os.getenv("UPLOAD_DIR", self.UPLOAD_DIR)
+        self.UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", self.UPLOAD_MAX_BYTES))
+        self.JOB_WORKERS = int(os.getenv("JOB_WORKERS", self.JOB_WORKERS))
+        self.JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", self.JOB_MAX_ATTEMPTS))
+        self.BACKUP_PAGES_PER_STEP = int(os.getenv("BACKUP_PAGES_PER_STEP", self.BACKUP_PAGES_PER_STEP))
+        self.BACKUP_STEP_SLEEP = float(os.getenv("BACKUP_STEP_SLEEP", self.BACKUP_STEP_SLEEP))
+        self.BACKUP_CHUNK_SIZE = int(os.getenv("BACKUP_CHUNK_SIZE", self.BACKUP_CHUNK_SIZE))
+        self.BACKUP_STANDBY = str(os.getenv("BACKUP_STANDBY", self.BACKUP_STANDBY)).lower() in ("1", "true", "on")
+        self.S3_PART_SIZE = int(os.getenv("S3_PART_SIZE", self.S3_PART_SIZE))
+        self.S3_CONCURRENCY = int(os.getenv("S3_CONCURRENCY", self.S3_CONCURRENCY))
+        self.PITR_DIR = os.getenv("PITR_DIR", self.PITR_DIR)
+        self.PITR_INTERVAL = int(os.getenv("PITR_INTERVAL", self.PITR_INTERVAL))
+        self.PITR_RETENTION_DAYS = int(os.getenv("PITR_RETENTION_DAYS", self.PITR_RETENTION_DAYS))
+        self.LOG_RETENTION_DAYS = int(os.getenv("LOG_RETENTION_DAYS", self.LOG_RETENTION_DAYS))
+        self.LOG_SCAN_WORKERS = int(os.getenv("LOG_SCAN_WORKERS", self.LOG_SCAN_WORKERS))
 
         # Tentar carregar configurações do Streamlit apenas se não estiver em um ambiente de migração
         if not os.environ.get("ALEMBIC_MIGRATION"):
@@ -46,7 +137,15 @@ class Settings:
                     os.environ[key] = str(val)
                     # Atualizar configurações com valores do Streamlit
                     if hasattr(self, key.upper()):
-                        setattr(self, key.upper(), str(val))
+                        # Manter o tipo das configurações numéricas
+                        current = getattr(self, key.upper())
+                        if isinstance(current, bool):
+                            val = str(val).lower() in ("1", "true", "on")
+                        elif isinstance(current, (int, float)):
+                            val = type(current)(val)
+                        else:
+                            val = str(val)
+                        setattr(self, key.upper(), val)
             except (ImportError, FileNotFoundError):
                 # Ignorar erros do Streamlit durante migrações
                 pass
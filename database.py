@@ -0,0 +1,166 @@
+"""
+Engine e sessões do banco de dados compartilhados pelo app, scripts e Alembic.
+
+Todas as conexões SQLite recebem os PRAGMAs de desempenho configurados em
+`config.Settings` (WAL, synchronous, busy_timeout, cache_size, mmap_size e
+foreign_keys) no momento em que são abertas pelo pool.
+
+`PoolGate` pausa o pool para trocar o arquivo do banco (restauração) sem
+reiniciar o processo.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import DisconnectionError
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+from config import settings
+
+
+def sqlite_url(db_path):
+    """Monta a URL SQLAlchemy para um arquivo SQLite."""
+    return f"sqlite:///{db_path}"
+
+
+def default_pragmas():
+    """PRAGMAs aplicados a cada nova conexão, a partir das configurações."""
+    return {
+        "journal_mode": settings.SQLITE_JOURNAL_MODE,
+        "synchronous": settings.SQLITE_SYNCHRONOUS,
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT,
+        "cache_size": settings.SQLITE_CACHE_SIZE,
+        "mmap_size": settings.SQLITE_MMAP_SIZE,
+        "foreign_keys": "ON" if settings.SQLITE_FOREIGN_KEYS else "OFF",
+    }
+
+
+def _pragma_listener(pragmas):
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+    return set_sqlite_pragmas
+
+
+def create_db_engine(url=None, pragmas=None, **kwargs):
+    """
+    Cria um engine com as configurações padrão do projeto.
+
+    Args:
+        url: URL do banco (padrão: settings.DB_PATH)
+        pragmas: PRAGMAs que sobrescrevem os padrões (apenas SQLite)
+        **kwargs: argumentos extras para `create_engine` (ex.: poolclass)
+
+    Returns:
+        Engine: engine configurado
+    """
+    if url is None:
+        url = sqlite_url(settings.DB_PATH)
+
+    if not url.startswith("sqlite"):
+        return create_engine(url, **kwargs)
+
+    connect_args = kwargs.pop("connect_args", {})
+    # As sessões do Streamlit rodam em threads diferentes
+    connect_args.setdefault("check_same_thread", False)
+    connect_args.setdefault("timeout", settings.SQLITE_BUSY_TIMEOUT / 1000)
+
+    kwargs.setdefault("poolclass", QueuePool)
+    if kwargs["poolclass"] is QueuePool:
+        kwargs.setdefault("pool_size", settings.DB_POOL_SIZE)
+        kwargs.setdefault("max_overflow", settings.DB_MAX_OVERFLOW)
+        kwargs.setdefault("pool_timeout", settings.DB_POOL_TIMEOUT)
+
+    engine = create_engine(url, connect_args=connect_args, **kwargs)
+
+    effective = default_pragmas()
+    if ":memory:" in url or url.rstrip("/") == "sqlite:":
+        # Bancos em memória não suportam WAL
+        effective.pop("journal_mode")
+    effective.update(pragmas or {})
+    event.listen(engine, "connect", _pragma_listener(effective))
+    return engine
+
+
+def _file_id(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_dev, stat.st_ino
+
+
+class PoolGate:
+    """
+    Controla a saída de conexões do pool de um engine SQLite.
+
+    - `pause()` segura novos pedidos de conexão, espera as emprestadas
+      voltarem e fecha o pool; ao sair, o pool reabre com conexões novas.
+    - Uma conexão aberta para um arquivo que foi substituído depois (outro
+      inode, ex.: restauração feita por outro processo) é descartada quando
+      sai do pool, e o pool abre outra no arquivo atual.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        database = engine.url.database
+        self.db_path = database if database and database != ":memory:" else None
+        self._open = threading.Event()
+        self._open.set()
+        self._idle = threading.Condition()
+        self._checked_out = 0
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        if self.db_path:
+            connection_record.info["file_id"] = _file_id(self.db_path)
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self._open.wait()
+        if self.db_path and connection_record.info.get("file_id") != _file_id(self.db_path):
+            # O pool descarta esta conexão e tenta de novo com uma nova
+            raise DisconnectionError("arquivo do banco substituído")
+        with self._idle:
+            self._checked_out += 1
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        with self._idle:
+            self._checked_out -= 1
+            self._idle.notify_all()
+
+    @contextmanager
+    def pause(self, timeout=30):
+        """
+        Pausa o pool: ninguém recebe conexão até o bloco terminar.
+
+        Raises:
+            TimeoutError: conexões emprestadas não voltaram em `timeout` segundos
+        """
+        self._open.clear()
+        try:
+            deadline = time.monotonic() + timeout
+            with self._idle:
+                while self._checked_out > 0:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError(f"{self._checked_out} conexões do banco ainda em uso")
+                    self._idle.wait(remaining)
+            self.engine.dispose()
+            yield
+        finally:
+            self.engine.dispose()
+            self._open.set()
+
+
+# Engine e fábrica de sessões padrão do aplicativo
+engine = create_db_engine()
+Session = sessionmaker(bind=engine)
+pool_gate = PoolGate(engine)
@@ -0,0 +1,142 @@
+"""
+Restauração do banco SQLite com troca atômica do arquivo.
+
+1. O banco a restaurar é preparado ao lado do atual (`<banco>.restore`, no
+   mesmo diretório, para a troca ser um rename) e conferido: `quick_check`
+   e chaves estrangeiras. Nada toca o banco em uso até aqui.
+2. O banco atual é travado (locking_mode EXCLUSIVE) e o WAL é esvaziado no
+   arquivo. Se outra conexão ou processo estiver com o banco aberto, a
+   restauração é recusada em vez de trocar o arquivo debaixo dela.
+3. O arquivo atual ganha um hard link `<banco>.previous` (voltar atrás é
+   outra troca) e o preparado entra no lugar com `os.replace`.
+
+No app, `database.PoolGate.pause` fecha o pool durante a troca e o reabre
+em seguida, sem reiniciar o processo.
+"""
+import logging
+import os
+import shutil
+import sqlite3
+import time
+from collections import namedtuple
+from contextlib import nullcontext
+
+from backup_verify import foreign_key_violations, integrity_check
+from sqlite_backup import backup_database, journal_mode
+
+PREPARED_SUFFIX = ".restore"
+PREVIOUS_SUFFIX = ".previous"
+
+RestoreResult = namedtuple("RestoreResult", ["path", "previous", "duration", "swap_duration"])
+
+logger = logging.getLogger(__name__)
+
+
+class RestoreError(Exception):
+    """O banco preparado não passou na conferência ou o banco atual está em uso."""
+
+
+def prepared_path(db_path):
+    """Onde o banco restaurado é preparado antes da troca."""
+    return db_path + PREPARED_SUFFIX
+
+
+def verify_file(path):
+    """Confere um banco preparado (quick_check e chaves estrangeiras)."""
+    integrity = integrity_check(path)
+    if integrity != ["ok"]:
+        raise RestoreError(f"{path} não passou no quick_check: {integrity[:3]}")
+    violations = foreign_key_violations(path)
+    if violations:
+        raise RestoreError(f"{path} tem {violations} violações de chave estrangeira")
+
+
+def _fsync(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def swap_database(prepared, db_path, timeout=5):
+    """
+    Troca o arquivo do banco pelo preparado, com o banco atual travado.
+
+    Returns:
+        str: caminho do banco anterior (`<banco>.previous`) ou None se não havia
+
+    Raises:
+        RestoreError: o banco está aberto por outra conexão ou processo
+    """
+    previous = None
+    conn = None
+    if os.path.exists(db_path):
+        conn = sqlite3.connect(db_path, timeout=timeout, isolation_level=None)
+        try:
+            # Com locking_mode EXCLUSIVE o lock fica com esta conexão até ela fechar
+            conn.execute("PRAGMA locking_mode=EXCLUSIVE")
+            conn.execute("BEGIN EXCLUSIVE")
+            conn.execute("SELECT count(*) FROM sqlite_master").fetchone()
+            conn.execute("COMMIT")
+            if journal_mode(conn) == "wal":
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+        except sqlite3.OperationalError as e:
+            conn.close()
+            raise RestoreError(f"Banco em uso por outra conexão ou processo: {e}") from e
+
+    try:
+        _fsync(prepared)
+        if conn is not None:
+            previous = db_path + PREVIOUS_SUFFIX
+            if os.path.exists(previous):
+                os.remove(previous)
+            try:
+                os.link(db_path, previous)
+            except OSError:
+                shutil.copy2(db_path, previous)
+        os.replace(prepared, db_path)
+        _fsync(os.path.dirname(os.path.abspath(db_path)))
+    finally:
+        if conn is not None:
+            conn.close()
+    return previous
+
+
+def restore_database(source, db_path, gate=None, verify=True, timeout=30, lock_timeout=5):
+    """
+    Restaura `db_path` a partir do banco `source`.
+
+    Args:
+        source: Banco a restaurar. Se for `prepared_path(db_path)` (ex.: já
+            remontado de um snapshot), é usado direto; senão é copiado para lá.
+        db_path: Banco em uso
+        gate: `PoolGate` do engine do app, pausado durante a troca
+        verify: Conferir o banco preparado antes da troca
+        timeout: Espera máxima pelas conexões emprestadas do pool (segundos)
+        lock_timeout: Espera máxima pelo lock exclusivo do banco atual (segundos)
+
+    Returns:
+        RestoreResult
+    """
+    start = time.perf_counter()
+    prepared = prepared_path(db_path)
+    try:
+        if os.path.abspath(source) != os.path.abspath(prepared):
+            backup_database(source, prepared, pages=-1, sleep=0)
+        if verify:
+            verify_file(prepared)
+
+        with gate.pause(timeout) if gate else nullcontext():
+            swap_start = time.perf_counter()
+            previous = swap_database(prepared, db_path, lock_timeout)
+            swap_duration = time.perf_counter() - swap_start
+    except BaseException:
+        if os.path.exists(prepared):
+            os.remove(prepared)
+        raise
+
+    result = RestoreResult(db_path, previous, time.perf_counter() - start, swap_duration)
+    logger.info("Banco %s restaurado de %s em %.2f s (troca: %.1f ms, anterior em %s)",
+                db_path, source, result.duration, swap_duration * 1000, previous)
+    return result
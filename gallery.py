@@ -0,0 +1,37 @@
+"""
+Consulta paginada da galeria Antes & Depois da página inicial.
+
+As páginas seguem o id (keyset): cada uma começa depois do último item da
+anterior. Os itens são tuplas simples (sem sessão), então podem ser
+guardados no cache do Streamlit e compartilhados entre as sessões.
+"""
+from collections import namedtuple
+
+from models import Gallery
+
+GalleryItem = namedtuple("GalleryItem", ["id", "before_path", "after_path", "caption"])
+
+# Uma página da galeria: itens e o cursor (id) da próxima, ou None
+GalleryPage = namedtuple("GalleryPage", ["items", "next_cursor"])
+
+
+def list_gallery(session, after=None, page_size=6):
+    """
+    Uma página da galeria, na ordem em que os itens foram adicionados.
+
+    Args:
+        session: Sessão do banco de dados
+        after: Cursor devolvido pela página anterior (None = primeira página)
+        page_size: Quantidade de pares por página
+
+    Returns:
+        GalleryPage
+    """
+    query = session.query(Gallery.id, Gallery.before_path, Gallery.after_path, Gallery.caption)
+    if after is not None:
+        query = query.filter(Gallery.id > after)
+    rows = query.order_by(Gallery.id).limit(page_size + 1).all()
+
+    items = [GalleryItem(*row) for row in rows[:page_size]]
+    next_cursor = items[-1].id if len(rows) > page_size else None
+    return GalleryPage(items, next_cursor)
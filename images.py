@@ -0,0 +1,142 @@
+"""
+Variantes redimensionadas das fotos enviadas (agendamentos e galeria).
+
+Para cada imagem original são geradas, ao lado dela em `variants/`:
+- thumb: JPEG de até 320px, usado nas listagens
+- medium: JPEG de até 1280px
+- webp: WebP de até 1280px, usado na página inicial
+
+A orientação EXIF é aplicada antes de redimensionar (fotos de celular não
+ficam deitadas). Os arquivos são gravados com nome temporário e renomeados
+no fim, então uma variante existente está sempre completa.
+"""
+import logging
+import os
+
+from PIL import Image, ImageOps
+
+# nome: (lado máximo em px, formato, extensão, opções do Pillow)
+VARIANTS = {
+    "thumb": (320, "JPEG", "jpg", {"quality": 80, "optimize": True, "progressive": True}),
+    "medium": (1280, "JPEG", "jpg", {"quality": 85, "optimize": True, "progressive": True}),
+    "webp": (1280, "WEBP", "webp", {"quality": 80, "method": 4}),
+}
+
+VARIANTS_DIR = "variants"
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+
+logger = logging.getLogger(__name__)
+
+
+def variant_path(original, variant):
+    """Caminho de uma variante: <pasta>/variants/<nome>_<variante>.<ext>."""
+    directory, filename = os.path.split(original)
+    stem = os.path.splitext(filename)[0]
+    extension = VARIANTS[variant][2]
+    return os.path.join(directory, VARIANTS_DIR, f"{stem}_{variant}.{extension}")
+
+
+def has_variants(original):
+    """True se todas as variantes existem e são mais novas que o original."""
+    try:
+        original_mtime = os.path.getmtime(original)
+        return all(
+            os.path.getmtime(variant_path(original, variant)) >= original_mtime
+            for variant in VARIANTS
+        )
+    except OSError:
+        return False
+
+
+def _flatten(image):
+    """Converte para RGB (JPEG não tem transparência; fundo branco)."""
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def create_variants(original, overwrite=False):
+    """
+    Gera as variantes de uma imagem.
+
+    Args:
+        original: Caminho da imagem original
+        overwrite: Regerar mesmo se as variantes já existirem
+
+    Returns:
+        dict: {variante: caminho}
+    """
+    paths = {variant: variant_path(original, variant) for variant in VARIANTS}
+    if not overwrite and has_variants(original):
+        return paths
+
+    os.makedirs(os.path.dirname(paths["thumb"]), exist_ok=True)
+    largest = max(size for size, _, _, _ in VARIANTS.values())
+    with Image.open(original) as source:
+        # JPEG: decodificar já em escala reduzida (bem mais rápido e leve)
+        source.draft("RGB", (largest, largest))
+        image = _flatten(ImageOps.exif_transpose(source))
+
+    # Da maior para a menor, reaproveitando a imagem já reduzida
+    for variant in sorted(VARIANTS, key=lambda v: -VARIANTS[v][0]):
+        size, image_format, _, options = VARIANTS[variant]
+        image = image.copy()
+        image.thumbnail((size, size), Image.LANCZOS)
+        tmp_path = paths[variant] + ".tmp"
+        image.save(tmp_path, image_format, **options)
+        os.replace(tmp_path, paths[variant])
+    return paths
+
+
+def display_path(original, variant="thumb"):
+    """Variante para exibição, ou o original se ela ainda não foi gerada."""
+    if not original:
+        return original
+    path = variant_path(original, variant)
+    return path if os.path.exists(path) else original
+
+
+def iter_originals(directories):
+    """Imagens originais (fora de `variants/`) nas pastas informadas, em ordem."""
+    for directory in directories:
+        if not os.path.isdir(directory):
+            continue
+        for root, dirs, files in os.walk(directory):
+            dirs[:] = sorted(d for d in dirs if d != VARIANTS_DIR)
+            for filename in sorted(files):
+                if filename.lower().endswith(IMAGE_EXTENSIONS):
+                    yield os.path.join(root, filename)
+
+
+def backfill_variants(directories, limit=None):
+    """
+    Gera as variantes que faltam para as imagens já existentes.
+
+    Pode ser interrompido e executado de novo: imagens com variantes
+    completas são puladas, e uma variante só aparece depois de gravada.
+
+    Args:
+        directories: Pastas a percorrer (ex.: ["uploads", "gallery"])
+        limit: Máximo de imagens a processar nesta execução
+
+    Returns:
+        dict: quantidades de imagens processadas, puladas e com erro
+    """
+    stats = {"created": 0, "skipped": 0, "failed": 0}
+    for original in iter_originals(directories):
+        if has_variants(original):
+            stats["skipped"] += 1
+            continue
+        if limit is not None and stats["created"] >= limit:
+            break
+        try:
+            create_variants(original)
+            stats["created"] += 1
+        except Exception as e:
+            stats["failed"] += 1
+            logger.warning("Erro ao gerar variantes de %s: %s", original, e)
+    return stats
@@ -0,0 +1,191 @@
+"""
+Tarefas em segundo plano executadas num pool de processos.
+
+Cada tarefa é gravada na tabela `jobs` antes de ser enviada ao
+`ProcessPoolExecutor`, então nada se perde se o processo do Streamlit
+reiniciar: `resume()` reenvia as tarefas pendentes ou interrompidas. O
+trabalho pesado (decodificar, redimensionar e recodificar imagens) roda
+nos processos do pool, fora da thread da sessão e sem disputar o GIL.
+"""
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import types
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+
+from sqlalchemy import func, update
+
+import images
+from models import Job
+
+logger = logging.getLogger(__name__)
+
+# Tipos de tarefa: função de nível de módulo (serializável para o pool)
+HANDLERS = {
+    "image_variants": images.create_variants,
+}
+
+_main_lock = threading.Lock()
+
+
+@contextmanager
+def _plain_main():
+    """
+    Troca o `__main__` por um módulo vazio enquanto workers são criados.
+
+    Com spawn, cada worker importa o `__main__` do processo pai. Sob o
+    Streamlit ele é o script do app, que não pode rodar de novo em cada worker.
+    """
+    with _main_lock:
+        saved = sys.modules.get("__main__")
+        sys.modules["__main__"] = types.ModuleType("__main__")
+        try:
+            yield
+        finally:
+            sys.modules["__main__"] = saved
+
+
+def _ready():
+    return os.getpid()
+
+
+class JobQueue:
+    def __init__(self, session_factory, max_workers=2, max_attempts=3):
+        self._session_factory = session_factory
+        self.max_workers = max_workers
+        self.max_attempts = max_attempts
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._executor = self._start_pool()
+
+    def _start_pool(self):
+        # spawn: os workers não herdam as threads e conexões do Streamlit.
+        # Todos os workers sobem já aqui, então nenhum é criado depois.
+        executor = ProcessPoolExecutor(
+            max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+        with _plain_main():
+            warm_up = [executor.submit(_ready) for _ in range(self.max_workers)]
+        for future in warm_up:
+            future.result()
+        return executor
+
+    def enqueue(self, kind, **payload):
+        """
+        Grava uma tarefa e a envia ao pool.
+
+        Args:
+            kind: Tipo da tarefa (chave de HANDLERS)
+            **payload: Argumentos do handler (serializáveis em JSON)
+
+        Returns:
+            int: ID da tarefa
+        """
+        if kind not in HANDLERS:
+            raise ValueError(f"Tipo de tarefa desconhecido: {kind}")
+        now = int(time.time())
+        session = self._session_factory()
+        try:
+            job = Job(kind=kind, payload=json.dumps(payload), status="pending",
+                      attempts=0, created_at=now, updated_at=now)
+            session.add(job)
+            session.commit()
+            job_id = job.id
+        finally:
+            session.close()
+        self._dispatch(job_id, kind, payload)
+        return job_id
+
+    def resume(self):
+        """Reenvia as tarefas pendentes ou interrompidas (ex.: após reinício)."""
+        session = self._session_factory()
+        try:
+            jobs = (
+                session.query(Job.id, Job.kind, Job.payload)
+                .filter(Job.status.in_(["pending", "running"]))
+                .order_by(Job.id)
+                .all()
+            )
+        finally:
+            session.close()
+        for job_id, kind, payload in jobs:
+            self._dispatch(job_id, kind, json.loads(payload))
+        return len(jobs)
+
+    def wait(self, timeout=None):
+        """Espera as tarefas enviadas por este processo terminarem."""
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._pending, timeout)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+    def counts(self):
+        """Quantidade de tarefas por status."""
+        session = self._session_factory()
+        try:
+            return dict(session.query(Job.status, func.count(Job.id)).group_by(Job.status).all())
+        finally:
+            session.close()
+
+    def _dispatch(self, job_id, kind, payload):
+        self._update(job_id, status="running", attempts=Job.attempts + 1)
+        with self._lock:
+            self._pending.add(job_id)
+        try:
+            with _plain_main():
+                future = self._executor.submit(HANDLERS[kind], **payload)
+        except BrokenProcessPool:
+            # Um worker morreu (ex.: falta de memória): recriar o pool
+            logger.warning("Pool de processos quebrado; recriando")
+            self._executor = self._start_pool()
+            with _plain_main():
+                future = self._executor.submit(HANDLERS[kind], **payload)
+        future.add_done_callback(lambda f: self._finished(job_id, kind, payload, f))
+
+    def _finished(self, job_id, kind, payload, future):
+        error = future.exception()
+        retried = False
+        try:
+            if error is None:
+                self._update(job_id, status="done", error=None)
+            else:
+                attempts = self._attempts(job_id)
+                logger.warning("Tarefa %s (%s) falhou na tentativa %s: %s", job_id, kind, attempts, error)
+                if attempts < self.max_attempts:
+                    self._dispatch(job_id, kind, payload)
+                    retried = True
+                else:
+                    self._update(job_id, status="failed", error=str(error))
+        except Exception as e:
+            # A tarefa fica como "running" e volta com resume()
+            logger.error("Erro ao atualizar a tarefa %s: %s", job_id, e)
+        finally:
+            if not retried:
+                with self._idle:
+                    self._pending.discard(job_id)
+                    self._idle.notify_all()
+
+    def _update(self, job_id, **values):
+        session = self._session_factory()
+        try:
+            session.execute(
+                update(Job).where(Job.id == job_id).values(updated_at=int(time.time()), **values)
+            )
+            session.commit()
+        finally:
+            session.close()
+
+    def _attempts(self, job_id):
+        session = self._session_factory()
+        try:
+            return session.query(Job.attempts).filter(Job.id == job_id).scalar()
+        finally:
+            session.close()
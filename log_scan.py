@@ -0,0 +1,414 @@
+"""
+Leitura incremental de arquivos de log, atuais e rotacionados.
+
+Rotação: `rotate` copia o log comprimido para `<nome>.<instante>.gz` (o
+instante da rotação) e o trunca; `prune_archives` apaga os rotacionados mais
+antigos que a retenção. Rotacionados sem compressão (`<nome>.<instante>`,
+do esquema anterior, que renomeava o log) também são lidos.
+
+Cada log tem um cursor (arquivo, dispositivo, inode e offset em bytes)
+guardado entre uma execução e outra, então cada verificação lê só o que foi
+escrito depois da anterior:
+
+- O arquivo do cursor é terminado a partir do offset, mesmo que tenha sido
+  rotacionado depois: o conteúdo dele é o primeiro rotacionado depois da
+  leitura (pelo instante no nome; o offset vale para o conteúdo
+  descomprimido). Os rotacionados depois dele e o atual são lidos inteiros.
+- Truncamento: arquivo menor que o offset é relido do início.
+- Sem cursor (ou com cursor parado há mais tempo que o limite), são lidos os
+  rotacionados depois do limite e o atual, a partir da primeira linha com
+  timestamp >= limite. Nos arquivos sem compressão ela é achada por busca
+  binária nos timestamps das linhas (os logs são gravados em ordem).
+
+`scan_logs` varre cada arquivo num processo do pool; um arquivo que não
+pode ser lido é registrado no log e pulado, sem afetar os outros. Em vez de olhar linha
+a linha, uma única expressão regular com todos os padrões percorre o
+conteúdo (via `mmap` nos arquivos grandes, em blocos nos comprimidos) e só
+as linhas encontradas são extraídas. Os resultados são intercalados pelo
+timestamp das linhas; linhas sem timestamp (ex.: o traceback de um erro)
+herdam o da linha com timestamp anterior.
+
+Só linhas completas (terminadas em `\\n`) são consumidas: uma linha sendo
+escrita durante a leitura fica para a próxima vez.
+"""
+import gzip
+import heapq
+import json
+import logging
+import mmap
+import os
+import re
+import shutil
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from functools import partial
+
+TIMESTAMP = re.compile(rb"(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})")
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+ARCHIVE_FORMAT = "%Y%m%d_%H%M%S_%f"
+# Arquivos rotacionados antes dos microssegundos no nome
+ARCHIVE_FORMATS = (ARCHIVE_FORMAT, "%Y%m%d_%H%M%S")
+BLOCK_SIZE = 4 * 1024 * 1024
+MMAP_MIN_BYTES = 16 * 1024 * 1024      # menores que isso são lidos de uma vez
+PARALLEL_MIN_BYTES = 32 * 1024 * 1024  # com menos a ler, o pool não compensa
+LOOKBACK_LINES = 1000                  # busca do timestamp de uma linha sem timestamp
+
+Archive = namedtuple("Archive", ["rotated_at", "path"])
+ScanResult = namedtuple("ScanResult", ["path", "dev", "ino", "offset", "matches"])
+Match = namedtuple("Match", ["stamp", "file", "line"])
+
+logger = logging.getLogger(__name__)
+
+
+def line_time(line):
+    """Timestamp no início da linha (bytes), ou None."""
+    match = TIMESTAMP.match(line)
+    if not match:
+        return None
+    return datetime.strptime(match.group(1).decode(), TIMESTAMP_FORMAT)
+
+
+def _next_stamp(f, pos, end):
+    """Início e timestamp da primeira linha com timestamp que começa em `pos` ou depois."""
+    if pos > 0:
+        f.seek(pos - 1)
+        f.readline()  # completa a linha em que `pos` caiu
+    else:
+        f.seek(0)
+    while f.tell() < end:
+        start = f.tell()
+        line = f.readline()
+        stamp = line_time(line)
+        if stamp is not None:
+            return start, stamp
+    return end, None
+
+
+def find_cutoff(f, start, end, cutoff):
+    """
+    Offset da primeira linha com timestamp >= `cutoff` entre `start` e `end`.
+
+    Busca binária: lê só algumas linhas em cada um dos ~log2(tamanho) passos.
+    """
+    lo, hi = start, end
+    while lo < hi:
+        mid = (lo + hi) // 2
+        line_start, stamp = _next_stamp(f, mid, end)
+        if stamp is None or stamp >= cutoff:
+            hi = mid
+        else:
+            lo = line_start + 1
+    return max(start, _next_stamp(f, lo, end)[0])
+
+
+def archive_name(path, moment):
+    """Nome de `path` rotacionado em `moment`."""
+    return f"{path}.{moment.strftime(ARCHIVE_FORMAT)}"
+
+
+def _rotated_at(suffix):
+    for fmt in ARCHIVE_FORMATS:
+        try:
+            return datetime.strptime(suffix, fmt)
+        except ValueError:
+            pass
+    return None
+
+
+def rotated_files(path):
+    """Arquivos rotacionados de `path` (`<nome>.<instante>[.gz]`), do mais antigo ao mais novo."""
+    directory = os.path.dirname(path) or "."
+    prefix = os.path.basename(path) + "."
+    archives = []
+    for filename in os.listdir(directory):
+        if not filename.startswith(prefix):
+            continue
+        suffix = filename[len(prefix):]
+        rotated_at = _rotated_at(suffix[:-3] if suffix.endswith(".gz") else suffix)
+        if rotated_at is not None:
+            archives.append(Archive(rotated_at, os.path.join(directory, filename)))
+    return sorted(archives)
+
+
+def rotate(path, interval):
+    """
+    Copia `path` comprimido para `<nome>.<instante>.gz` e o trunca, se a
+    última rotação tem mais de `interval`.
+
+    Copiar e truncar, em vez de renomear: quem escreve no log (o app, um
+    redirecionamento `>>`) o mantém aberto em modo append e continua
+    escrevendo no mesmo caminho, que volta a crescer do início. Renomeado,
+    o arquivo continuaria recebendo as linhas depois de arquivado. O que
+    chega durante a compressão é acrescentado ao arquivo rotacionado; só o
+    escrito entre a última leitura e o truncamento (microssegundos) se perde.
+
+    Returns:
+        str: caminho do arquivo rotacionado, ou None se não era hora
+    """
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return None
+    now = datetime.now()
+    archives = rotated_files(path)
+    if archives and archives[-1].rotated_at > now - interval:
+        return None
+    rotated = archive_name(path, now) + ".gz"
+    tmp_path = rotated + ".tmp"
+    with open(path, "rb") as src:
+        with gzip.open(tmp_path, "wb", compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, BLOCK_SIZE)
+        os.replace(tmp_path, rotated)
+        tail = src.read()
+        os.truncate(path, 0)
+    if tail:
+        # Outro membro gzip: a leitura do .gz emenda os dois
+        with gzip.open(rotated, "ab") as dst:
+            dst.write(tail)
+    return rotated
+
+
+def prune_archives(path, retention_days):
+    """Apaga os rotacionados de `path` há mais de `retention_days` dias."""
+    limit = datetime.now() - timedelta(days=retention_days)
+    removed = []
+    for archive in rotated_files(path):
+        if archive.rotated_at < limit:
+            os.remove(archive.path)
+            removed.append(archive.path)
+    return removed
+
+
+def _identity(path):
+    stat = os.stat(path)
+    return stat.st_dev, stat.st_ino
+
+
+def _cursor_index(path, cursor, files, archives, since):
+    """Posição em `files` do arquivo em que o cursor parou, ou None se ele não existe mais."""
+    name = cursor.get("file", os.path.basename(path))
+    if name != os.path.basename(path):
+        # O cursor parou num arquivo já rotacionado
+        for index, archive in enumerate(archives):
+            if os.path.basename(archive.path) in (name, name + ".gz"):
+                return index
+        return None
+
+    # O arquivo atual da última leitura é o primeiro rotacionado depois dela
+    for index, archive in enumerate(archives):
+        if archive.rotated_at >= since:
+            return index
+    # Não houve rotação: o atual, se ainda for o mesmo arquivo (inode)
+    current = len(archives)
+    if current < len(files) and _identity(files[current]) == (cursor["dev"], cursor["ino"]):
+        return current
+    return None
+
+
+def plan(path, cursor, cutoff):
+    """
+    Arquivos a ler do log `path`, do mais antigo ao atual.
+
+    Returns:
+        list[tuple]: (caminho, offset inicial); offset None = a partir de `cutoff`
+    """
+    archives = rotated_files(path)
+    files = [archive.path for archive in archives]
+    if os.path.exists(path):
+        files.append(path)
+
+    saved_at = cursor.get("saved_at", "")
+    if "ino" not in cursor or saved_at < cutoff.isoformat():
+        recent = [archive.path for archive in archives if archive.rotated_at >= cutoff]
+        return [(file_path, None) for file_path in recent + files[len(archives):]]
+
+    since = datetime.fromisoformat(saved_at)
+    index = _cursor_index(path, cursor, files, archives, since)
+    if index is None:
+        recent = [archive.path for archive in archives if archive.rotated_at >= since]
+        return [(file_path, 0) for file_path in recent + files[len(archives):]]
+    return [(files[index], cursor["offset"])] + [(file_path, 0) for file_path in files[index + 1:]]
+
+
+def _stamp_at(buffer, start, line_start):
+    """Timestamp da linha que começa em `line_start` ou da anterior mais próxima que tenha um."""
+    for _ in range(LOOKBACK_LINES):
+        match = TIMESTAMP.match(buffer, line_start)
+        if match:
+            return match.group(1)
+        if line_start <= start:
+            return None
+        line_start = buffer.rfind(b"\n", start, line_start - 1) + 1 or start
+    return None
+
+
+def _match_lines(buffer, start, end, regex, since=None, stamp=None):
+    """
+    Linhas completas de buffer[start:end] em que `regex` aparece.
+
+    Args:
+        since: timestamp (bytes); linhas anteriores são descartadas
+        stamp: timestamp herdado do bloco anterior
+
+    Returns:
+        tuple: (fim da última linha completa, [(timestamp, linha)], último timestamp visto)
+    """
+    end = buffer.rfind(b"\n", start, end) + 1
+    if end <= start:
+        return start, [], stamp
+    matches = []
+    position = start
+    while True:
+        found = regex.search(buffer, position, end)
+        if not found:
+            break
+        line_start = buffer.rfind(b"\n", position, found.start()) + 1 or position
+        line_end = buffer.find(b"\n", found.start(), end)
+        line_stamp = _stamp_at(buffer, start, line_start) or stamp
+        if since is None or line_stamp is None or line_stamp >= since:
+            matches.append((line_stamp and line_stamp.decode(),
+                            buffer[line_start:line_end].decode("utf-8", "replace")))
+        position = line_end + 1
+    return end, matches, _stamp_at(buffer, start, end) or stamp
+
+
+def _scan_gzip(path, start, since, regex):
+    stat = os.stat(path)
+    matches = []
+    stamp = None
+    with gzip.open(path, "rb") as f:
+        if start:
+            f.seek(start)
+        offset = f.tell()
+        tail = b""
+        while True:
+            block = f.read(BLOCK_SIZE)
+            if not block:
+                break
+            buffer = tail + block
+            end, found, stamp = _match_lines(buffer, 0, len(buffer), regex, since, stamp)
+            matches.extend(found)
+            offset += end
+            tail = buffer[end:]
+    return ScanResult(path, stat.st_dev, stat.st_ino, offset, matches)
+
+
+def scan_file(path, start, cutoff, patterns):
+    """
+    Linhas de `path` que contêm algum dos `patterns`.
+
+    Args:
+        path: Arquivo de log (`.gz` é lido descomprimindo em blocos)
+        start: Offset inicial; None = a partir da primeira linha >= `cutoff`
+        cutoff: datetime
+        patterns: Textos procurados
+
+    Returns:
+        ScanResult: `offset` é o fim da última linha completa (no conteúdo
+        descomprimido, para `.gz`); `matches` são (timestamp, linha)
+    """
+    regex = re.compile(b"|".join(re.escape(pattern.encode()) for pattern in patterns))
+    if path.endswith(".gz"):
+        since = cutoff.strftime(TIMESTAMP_FORMAT).encode() if start is None else None
+        return _scan_gzip(path, start, since, regex)
+
+    with open(path, "rb") as f:
+        stat = os.fstat(f.fileno())
+        size = stat.st_size
+        if start is not None and start > size:
+            start = 0  # truncado
+        if start is None:
+            start = find_cutoff(f, 0, size, cutoff)
+        if size - start >= MMAP_MIN_BYTES:
+            with mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) as buffer:
+                offset, matches, _ = _match_lines(buffer, start, size, regex)
+        else:
+            f.seek(start)
+            offset, matches, _ = _match_lines(f.read(size - start), 0, size - start, regex)
+            offset += start
+    return ScanResult(path, stat.st_dev, stat.st_ino, offset, matches)
+
+
+def _pending_bytes(path, start):
+    """Estimativa do que falta ler (o tamanho comprimido, para `.gz`)."""
+    try:
+        return max(os.path.getsize(path) - (start or 0), 0)
+    except FileNotFoundError:
+        return 0
+
+
+def _collect(scan, path):
+    """Resultado da varredura de `path`, ou None se ele não pôde ser lido."""
+    try:
+        return scan()
+    except Exception as e:
+        logger.error("Erro ao ler arquivo de log %s: %s", path, e)
+        return None
+
+
+def scan_logs(logs, cursors, cutoff, patterns, workers=1):
+    """
+    Varre os logs, atuais e rotacionados, e intercala as linhas encontradas pelo timestamp.
+
+    Args:
+        logs: Caminhos dos logs atuais
+        cursors: dict nome do log -> cursor (vazio na primeira vez);
+            atualizado no lugar quando a varredura termina
+        cutoff: datetime; linhas anteriores são ignoradas na primeira leitura
+            ou se o cursor parou antes disso
+        patterns: Textos procurados nas linhas
+        workers: Processos do pool; com pouco a ler, tudo roda neste processo
+
+    Returns:
+        list[Match]: em ordem de timestamp
+    """
+    tasks = []
+    planned = []
+    for path in logs:
+        cursor = cursors.setdefault(os.path.basename(path), {})
+        try:
+            tasks.extend((path, file_path, start) for file_path, start in plan(path, cursor, cutoff))
+        except OSError as e:
+            # O cursor deste log não avança: tudo é lido na próxima vez
+            logger.error("Erro ao listar os arquivos do log %s: %s", path, e)
+            continue
+        planned.append(path)
+
+    arguments = [(file_path, start, cutoff, patterns) for _, file_path, start in tasks]
+    pending = sum(_pending_bytes(file_path, start) for _, file_path, start in tasks)
+    if workers > 1 and len(tasks) > 1 and pending >= PARALLEL_MIN_BYTES:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            futures = [pool.submit(scan_file, *args) for args in arguments]
+            results = [_collect(future.result, args[0]) for future, args in zip(futures, arguments)]
+    else:
+        results = [_collect(partial(scan_file, *args), args[0]) for args in arguments]
+
+    # Arquivos que não puderam ser lidos ficam de fora (o erro já foi registrado)
+    results = [(path, result) for (path, _, _), result in zip(tasks, results) if result is not None]
+    saved_at = datetime.now().isoformat()
+    last = dict(results)
+    for path in planned:
+        cursor = cursors[os.path.basename(path)]
+        if path in last:
+            result = last[path]
+            cursor.update(file=os.path.basename(result.path), dev=result.dev,
+                          ino=result.ino, offset=result.offset)
+        cursor["saved_at"] = saved_at
+
+    per_file = ([Match(stamp, os.path.basename(result.path), line) for stamp, line in result.matches]
+                for _, result in results)
+    return list(heapq.merge(*per_file, key=lambda match: match.stamp or ""))
+
+
+def load_cursors(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_cursors(path, cursors):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(cursors, f)
+    os.replace(tmp_path, path)
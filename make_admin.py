@@ -1,12 +1,7 @@
 from models import User
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
-from config import settings
+from database import Session
 
 def make_admin(username):
-    # Configuração da conexão com o banco de dados
-    engine = create_engine(f"sqlite:///{settings.DB_PATH}")
-    Session = sessionmaker(bind=engine)
     session = Session()
 
     try:
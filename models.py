@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, Time, Text, ForeignKey, DECIMAL, Float, Boolean, DateTime
+from sqlalchemy import Column, Integer, String, Date, Time, Text, ForeignKey, DECIMAL, Float, Boolean, DateTime, Index, DDL, event
 from sqlalchemy.orm import declarative_base, relationship
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime, timedelta
@@ -25,7 +25,7 @@ class User(Base):
 
     def generate_auth_token(self):
         """Gera um novo token de autenticação para o usuário"""
-        from streamlit_app import generate_token, create_secure_cookie
+        from auth import generate_token, create_secure_cookie
 
         # Gerar token
         token = generate_token()
@@ -35,16 +35,15 @@ class User(Base):
 
         # Salvar token no banco
         from sqlalchemy.orm import Session
-        from streamlit_app import Session as DBSession
+        from database import Session as DBSession
 
         session = DBSession()
         try:
-            from streamlit_app import AuthToken
             auth_token = AuthToken(
                 user_id=self.id,
                 token=token,
                 created_at=datetime.now().isoformat(),
-                expires_at=(datetime.now() + timedelta(hours=10)).isoformat()
+                expires_at=int((datetime.now() + timedelta(hours=10)).timestamp())
             )
             session.add(auth_token)
             session.commit()
@@ -58,7 +57,8 @@ class User(Base):
     def validate_token(self, token):
         """Valida um token de autenticação"""
         from sqlalchemy.orm import Session
-        from streamlit_app import Session as DBSession, decode_secure_cookie
+        from database import Session as DBSession
+        from auth import decode_secure_cookie
 
         try:
             # Decodificar cookie
@@ -69,9 +69,6 @@ class User(Base):
             # Verificar token no banco
             session = DBSession()
             try:
-                from streamlit_app import AuthToken
-                from datetime import datetime
-
                 auth_token = session.query(AuthToken).filter_by(
                     user_id=self.id,
                     token=token
@@ -81,8 +78,7 @@ class User(Base):
                     return False
 
                 # Verificar expiração
-                expires_at = datetime.fromisoformat(auth_token.expires_at)
-                if datetime.now() > expires_at:
+                if auth_token.is_expired:
                     session.delete(auth_token)
                     session.commit()
                     return False
@@ -94,23 +90,10 @@ class User(Base):
             return False
 
     def delete_token(self, token):
-        """Remove um token de autenticação"""
-        from sqlalchemy.orm import Session
-        from streamlit_app import Session as DBSession
-
-        session = DBSession()
-        try:
-            from streamlit_app import AuthToken
-            auth_token = session.query(AuthToken).filter_by(
-                user_id=self.id,
-                token=token
-            ).first()
+        """Revoga e remove um token de autenticação"""
+        from auth import delete_auth_token
 
-            if auth_token:
-                session.delete(auth_token)
-                session.commit()
-        finally:
-            session.close()
+        delete_auth_token(self.id, token)
 
 class AuthToken(Base):
     __tablename__ = 'auth_tokens'
@@ -119,18 +102,36 @@ class AuthToken(Base):
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     token = Column(String(64), unique=True, nullable=False)
     created_at = Column(String, nullable=False)
-    expires_at = Column(String, nullable=False)
+    expires_at = Column(Integer, nullable=False)  # segundos desde epoch
 
     user = relationship("User", back_populates="tokens")
 
+    __table_args__ = (
+        # revoke_user_tokens (a validação usa o índice único de `token`) e
+        # limpeza de tokens expirados
+        Index('ix_auth_tokens_user_id', 'user_id'),
+        Index('ix_auth_tokens_expires_at', 'expires_at'),
+    )
+
     def __repr__(self):
         return f"<AuthToken(user_id={self.user_id}, token='{self.token[:8]}...')>"
 
     @property
     def is_expired(self):
         """Verifica se o token está expirado"""
-        from datetime import datetime
-        return datetime.now() > datetime.fromisoformat(self.expires_at)
+        return datetime.now().timestamp() > self.expires_at
+
+class RevokedToken(Base):
+    """Token assinado revogado antes da expiração (logout, mudança de permissão)"""
+    __tablename__ = 'revoked_tokens'
+
+    token_digest = Column(String(64), primary_key=True)  # SHA-256 do token
+    expires_at = Column(Integer, nullable=False)  # segundos desde epoch
+    revoked_at = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index('ix_revoked_tokens_expires_at', 'expires_at'),
+    )
 
 class Service(Base):
     __tablename__ = 'services'
@@ -142,6 +143,10 @@ class Service(Base):
 
     appointments = relationship("Appointment", back_populates="service")
 
+    __table_args__ = (
+        Index('ix_services_active', 'active'),
+    )
+
 class Appointment(Base):
     __tablename__ = 'appointments'
     id = Column(Integer, primary_key=True)
@@ -159,6 +164,79 @@ class Appointment(Base):
     user = relationship("User", back_populates="appointments")
     service = relationship("Service", back_populates="appointments")
 
+    __table_args__ = (
+        # Contagem por data (limite diário) e listagem ordenada por data/hora
+        Index('ix_appointments_date_time', 'date', 'time'),
+        # Histórico do cliente (meus_agendamentos)
+        Index('ix_appointments_user_date_time', 'user_id', 'date', 'time'),
+        # Listagem do admin filtrada por status e totais por status
+        Index('ix_appointments_status_date_time', 'status', 'date', 'time'),
+    )
+
+class DailyLoad(Base):
+    """Agendamentos por dia (exceto rejeitados), mantido por triggers em `appointments`."""
+    __tablename__ = 'daily_load'
+    date = Column(Date, primary_key=True)
+    booked = Column(Integer, nullable=False, default=0)
+
+# Triggers que mantêm `daily_load` em dia. Migrações que recriam a tabela
+# `appointments` (batch do SQLite) precisam recriá-los.
+DAILY_LOAD_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_daily_load_insert AFTER INSERT ON appointments
+    WHEN COALESCE(NEW.status, '') <> 'rejeitado'
+    BEGIN
+        INSERT INTO daily_load (date, booked) VALUES (NEW.date, 1)
+        ON CONFLICT(date) DO UPDATE SET booked = booked + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_daily_load_delete AFTER DELETE ON appointments
+    WHEN COALESCE(OLD.status, '') <> 'rejeitado'
+    BEGIN
+        UPDATE daily_load SET booked = booked - 1 WHERE date = OLD.date;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_daily_load_update AFTER UPDATE OF date, status ON appointments
+    BEGIN
+        UPDATE daily_load SET booked = booked - 1
+        WHERE date = OLD.date AND COALESCE(OLD.status, '') <> 'rejeitado';
+        INSERT INTO daily_load (date, booked)
+        SELECT NEW.date, 1 WHERE COALESCE(NEW.status, '') <> 'rejeitado'
+        ON CONFLICT(date) DO UPDATE SET booked = booked + 1;
+    END
+    """,
+]
+
+for _trigger in DAILY_LOAD_TRIGGERS:
+    event.listen(Appointment.__table__, 'after_create', DDL(_trigger).execute_if(dialect='sqlite'))
+
+class Upload(Base):
+    """Arquivo enviado, guardado pelo hash do conteúdo (ver upload_store.py)."""
+    __tablename__ = 'uploads'
+    digest = Column(String(64), primary_key=True)
+    path = Column(String, nullable=False, unique=True)
+    size = Column(Integer, nullable=False)
+    refcount = Column(Integer, nullable=False, default=0)
+    created_at = Column(Integer, nullable=False)
+
+class Job(Base):
+    """Tarefa em segundo plano executada pelo pool de processos (ver jobs.py)."""
+    __tablename__ = 'jobs'
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(50), nullable=False)
+    payload = Column(Text, nullable=False)  # JSON
+    status = Column(String(20), nullable=False, default='pending')  # pending, running, done, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(Text)
+    created_at = Column(Integer, nullable=False)
+    updated_at = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index('ix_jobs_status_id', 'status', 'id'),
+    )
+
 class Config(Base):
     __tablename__ = 'config'
     weekday = Column(Integer, primary_key=True)
@@ -4,11 +4,12 @@ import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime, timedelta
-import re
 from dotenv import load_dotenv
-from config import settings
+from config import settings, ALERT_EMAIL, SMTP_SERVER, SMTP_PORT, SMTP_USER, SMTP_PASS
+from log_scan import load_cursors, prune_archives, rotate, rotated_files, save_cursors, scan_logs
 
-# Configurar logging
+# Configurar logging (o FileHandler precisa da pasta de logs)
+os.makedirs('logs', exist_ok=True)
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s',
@@ -32,26 +33,23 @@ ERROR_PATTERNS = {
     'ERROR': [r'ERROR', r'Exception'],
     'WARNING': [r'WARNING', r'failed']
 }
-ALERT_EMAIL = settings.ALERT_EMAIL
-SMTP_SERVER = settings.SMTP_SERVER
-SMTP_PORT = settings.SMTP_PORT
-SMTP_USER = settings.SMTP_USER
-SMTP_PASS = settings.SMTP_PASS
 CHECK_INTERVAL = 3600  # Verificar a cada 1 hora
+ROTATE_INTERVAL = timedelta(days=1)
+# Até onde cada log já foi lido (inode e offset), entre uma execução e outra
+CURSOR_FILE = os.path.join(LOG_DIR, 'monitor_cursors.json')
 
 def setup_logging():
     """Configura a estrutura de logs"""
     if not os.path.exists(LOG_DIR):
         os.makedirs(LOG_DIR)
 
-    # Rotação de logs (manter últimos 7 dias)
+    # Rotação diária (cópia comprimida e truncamento, para quem mantém o log
+    # aberto continuar escrevendo nele); rotacionados apagados depois de
+    # LOG_RETENTION_DAYS
     for log_file in LOG_FILES:
         log_path = os.path.join(LOG_DIR, log_file)
-        if os.path.exists(log_path):
-            # Criar backup com timestamp
-            backup_time = datetime.now().strftime('%Y%m%d_%H%M%S')
-            backup_path = os.path.join(LOG_DIR, f'{log_file}.{backup_time}')
-            os.rename(log_path, backup_path)
+        rotate(log_path, ROTATE_INTERVAL)
+        prune_archives(log_path, settings.LOG_RETENTION_DAYS)
 
 def send_alert(level, subject, message):
     """Envia alerta por email com nível de severidade"""
@@ -79,36 +77,36 @@ def send_alert(level, subject, message):
         logging.error(f'Erro ao enviar alerta: {str(e)}')
         raise
 
-def check_logs():
-    """Verifica logs em busca de erros"""
+def check_logs(cursors=None):
+    """
+    Verifica logs em busca de erros, inclusive nos arquivos rotacionados.
+
+    Com `cursors` (ver log_scan), lê só o que foi escrito desde a verificação
+    anterior e atualiza os cursores; sem eles, as últimas 24 horas. Os erros
+    de todos os arquivos vêm em ordem de timestamp.
+    """
     errors_found = {'CRITICAL': [], 'ERROR': [], 'WARNING': []}
+    cutoff_time = datetime.now() - timedelta(hours=24)
 
+    log_paths = []
     for log_file in LOG_FILES:
         log_path = os.path.join(LOG_DIR, log_file)
-        if not os.path.exists(log_path):
+        if not os.path.exists(log_path) and not rotated_files(log_path):
             logging.warning(f'Arquivo de log não encontrado: {log_path}')
             continue
+        log_paths.append(log_path)
 
-        try:
-            # Ler apenas as últimas 24 horas de logs
-            cutoff_time = datetime.now() - timedelta(hours=24)
-
-            with open(log_path, 'r') as f:
-                for line in f:
-                    # Extrair timestamp do log
-                    match = re.match(r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})', line)
-                    if match:
-                        log_time = datetime.strptime(match.group(1), '%Y-%m-%d %H:%M:%S')
-                        if log_time < cutoff_time:
-                            continue
-
-                    # Verificar padrões de erro por nível
-                    for level, patterns in ERROR_PATTERNS.items():
-                        if any(pattern in line for pattern in patterns):
-                            errors_found[level].append(f'{log_file}: {line.strip()}')
+    # Só as linhas novas (ou das últimas 24 horas, na primeira leitura); um
+    # arquivo que não pode ser lido é registrado e pulado por scan_logs
+    patterns = [pattern for level_patterns in ERROR_PATTERNS.values() for pattern in level_patterns]
+    matches = scan_logs(log_paths, cursors if cursors is not None else {}, cutoff_time,
+                        patterns, settings.LOG_SCAN_WORKERS)
 
-        except Exception as e:
-            logging.error(f'Erro ao ler arquivo de log {log_path}: {str(e)}')
+    for match in matches:
+        # Verificar padrões de erro por nível
+        for level, patterns in ERROR_PATTERNS.items():
+            if any(pattern in match.line for pattern in patterns):
+                errors_found[level].append(f'{match.file}: {match.line.strip()}')
 
     return errors_found
 
@@ -116,7 +114,8 @@ def main():
     """Função principal de monitoramento"""
     try:
         setup_logging()
-        errors = check_logs()
+        cursors = load_cursors(CURSOR_FILE)
+        errors = check_logs(cursors)
 
         # Enviar alertas por nível de severidade
         for level, error_list in errors.items():
@@ -125,6 +124,8 @@ def main():
                 message = '\n'.join(error_list)
                 send_alert(level, subject, message)
 
+        # Só avança os cursores depois dos alertas enviados
+        save_cursors(CURSOR_FILE, cursors)
         logging.info('Verificação de logs concluída')
 
     except Exception as e:
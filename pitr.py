@@ -0,0 +1,126 @@
+"""
+Recuperação para um instante (PITR): arquivamento contínuo do banco.
+
+O backup diário (backup.py) deixa até 24 horas de agendamentos sem cópia.
+Aqui, a cada `PITR_INTERVAL` minutos, é feito um snapshot online em etapas
+(sqlite_backup) num repositório de blocos próprio (backup_store), com número
+de sequência. Como os blocos são deduplicados, cada ponto grava só as partes
+do banco que mudaram desde o anterior.
+
+Cada manifesto lista o banco inteiro, então restaurar um instante não exige
+reaplicar a semana: basta achar o último ponto capturado até aquele instante
+(busca binária nos IDs, que são o instante da captura) e remontá-lo. O tempo
+de recuperação não cresce com o histórico arquivado.
+
+Uso:
+    python pitr.py archive                      # novo ponto + retenção
+    python pitr.py list                         # pontos disponíveis
+    python pitr.py restore "2026-10-10 14:35" destino.db
+"""
+import bisect
+import logging
+import os
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from backup_store import BackupStore, snapshot_id_for
+from config import settings
+
+RestoredPoint = namedtuple("RestoredPoint", ["id", "sequence", "captured_at", "path", "duration"])
+
+logger = logging.getLogger(__name__)
+
+
+class PitrArchive:
+    def __init__(self, store):
+        self.store = store
+
+    def last_sequence(self):
+        snapshots = self.store.snapshots()
+        if not snapshots:
+            return 0
+        return self.store.load_manifest(snapshots[-1]).get("sequence", 0)
+
+    def archive(self, db_path, **backup_options):
+        """
+        Captura um novo ponto de recuperação.
+
+        Sem contagem/checksum das tabelas: o ponto precisa ser barato, e a
+        verificação completa fica com o backup diário. Se o banco não mudou
+        desde o último ponto, nenhum ponto novo é criado (ele continua valendo).
+
+        Returns:
+            SnapshotResult
+        """
+        sequence = self.last_sequence() + 1
+        result = self.store.snapshot(db_path, with_stats=False, extra={"sequence": sequence}, **backup_options)
+        if not result.unchanged:
+            logger.info("Ponto de recuperação %s (sequência %s): %s blocos novos",
+                        result.id, sequence, len(result.new_chunks))
+        return result
+
+    def find(self, moment):
+        """ID do último ponto capturado até `moment` (datetime), ou None."""
+        snapshots = self.store.snapshots()
+        index = bisect.bisect_right(snapshots, snapshot_id_for(moment))
+        return snapshots[index - 1] if index else None
+
+    def restore_to(self, moment, destination):
+        """
+        Remonta em `destination` o banco como estava em `moment`.
+
+        Raises:
+            ValueError: nenhum ponto arquivado até esse instante
+            BackupCorrupted: bloco faltando ou arquivo diferente do manifesto
+        """
+        start = time.perf_counter()
+        snapshot_id = self.find(moment)
+        if snapshot_id is None:
+            raise ValueError(f"Nenhum ponto de recuperação até {moment.isoformat()}")
+        manifest = self.store.load_manifest(snapshot_id)
+        self.store.restore(snapshot_id, destination)
+        point = RestoredPoint(snapshot_id, manifest.get("sequence"), manifest.get("captured_at"),
+                              destination, time.perf_counter() - start)
+        logger.info("Banco de %s restaurado em %s (ponto %s, sequência %s, %.2f s)",
+                    moment.isoformat(), destination, snapshot_id, point.sequence, point.duration)
+        return point
+
+    def cleanup(self, retention_days):
+        """Apaga os pontos mais antigos que `retention_days` e os blocos sem referência."""
+        removed = self.store.prune(before=datetime.now() - timedelta(days=retention_days))
+        self.store.gc()
+        return removed
+
+
+def get_archive():
+    """Arquivo contínuo em PITR_DIR"""
+    return PitrArchive(BackupStore(settings.PITR_DIR, chunk_size=settings.BACKUP_CHUNK_SIZE))
+
+
+def main(argv):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    archive = get_archive()
+    command = argv[1] if len(argv) > 1 else "archive"
+
+    if command == "archive":
+        archive.archive(
+            os.getenv('DB_PATH', 'data/database_production.db'),
+            pages=settings.BACKUP_PAGES_PER_STEP,
+            sleep=settings.BACKUP_STEP_SLEEP / 1000
+        )
+        archive.cleanup(settings.PITR_RETENTION_DAYS)
+    elif command == "list":
+        for snapshot_id in archive.store.snapshots():
+            print(snapshot_id)
+    elif command == "restore" and len(argv) == 4:
+        archive.restore_to(datetime.fromisoformat(argv[2]), argv[3])
+    else:
+        print(__doc__)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
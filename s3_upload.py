@@ -0,0 +1,245 @@
+"""
+Envio de arquivos para o S3 em paralelo, com retomada e conferência.
+
+- Arquivos menores que `part_size` vão num `put_object`; vários ao mesmo
+  tempo (`concurrency` threads).
+- Arquivos maiores usam multipart: as partes sobem em paralelo e cada
+  parte concluída é anotada no arquivo de estado. Se o envio cair, a
+  próxima execução reaproveita o mesmo upload e só manda o que falta.
+- A fila de arquivos pendentes também fica no arquivo de estado: o que não
+  subiu numa execução é enviado na próxima.
+
+Cada parte e cada objeto são conferidos: o SHA-256 vai junto (o S3 recusa
+o envio se não bater) e a resposta é comparada com o que foi calculado
+localmente (checksum devolvido pelo S3 ou, na falta dele, o ETag/MD5).
+O SHA-256 do arquivo inteiro fica nos metadados do objeto (`sha256`).
+"""
+import base64
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+
+PART_SIZE = 8 * 1024 * 1024
+MIN_PART_SIZE = 5 * 1024 * 1024  # mínimo do S3 (exceto a última parte)
+CONCURRENCY = 4
+
+logger = logging.getLogger(__name__)
+
+
+class UploadVerificationError(Exception):
+    """O S3 devolveu um checksum diferente do calculado localmente."""
+
+
+def _b64(digest):
+    return base64.b64encode(digest).decode()
+
+
+def _check(key, label, local_md5, local_sha256, response):
+    """Confere a resposta do S3 (checksum SHA-256 se houver, senão o ETag)."""
+    remote_sha256 = response.get("ChecksumSHA256")
+    if remote_sha256:
+        ok = remote_sha256.split("-")[0] == local_sha256
+    else:
+        ok = response["ETag"].strip('"') == local_md5
+    if not ok:
+        raise UploadVerificationError(f"{key}: {label} não confere com o arquivo local")
+
+
+class S3Uploader:
+    def __init__(self, client, bucket, state_path, part_size=PART_SIZE, concurrency=CONCURRENCY):
+        if part_size < MIN_PART_SIZE:
+            raise ValueError(f"part_size deve ser de pelo menos {MIN_PART_SIZE} bytes")
+        self.client = client
+        self.bucket = bucket
+        self.state_path = state_path
+        self.part_size = part_size
+        self.concurrency = concurrency
+        self._lock = threading.Lock()
+        self._state = self._load_state()
+
+    # ---------- Estado ----------
+    def _load_state(self):
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            state = {}
+        state.setdefault("pending", [])
+        state.setdefault("multipart", {})
+        return state
+
+    def _save_state(self):
+        """Grava o estado (chamar com o lock)."""
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._state, f)
+        os.replace(tmp_path, self.state_path)
+
+    def enqueue(self, items):
+        """Anota arquivos `(caminho, chave)` como pendentes de envio."""
+        with self._lock:
+            known = {tuple(item) for item in self._state["pending"]}
+            self._state["pending"].extend([path, key] for path, key in items if (path, key) not in known)
+            self._save_state()
+
+    def pending(self):
+        """Arquivos `(caminho, chave)` ainda não enviados, na ordem em que entraram."""
+        with self._lock:
+            return [tuple(item) for item in self._state["pending"]]
+
+    def _done(self, path, key):
+        with self._lock:
+            self._state["pending"] = [item for item in self._state["pending"] if item != [path, key]]
+            self._state["multipart"].pop(key, None)
+            self._save_state()
+
+    # ---------- Envio ----------
+    def upload_files(self, items):
+        """
+        Envia arquivos `(caminho, chave)` e os tira da lista de pendentes.
+
+        Arquivos que não existem mais localmente são só descartados da lista.
+
+        Returns:
+            dict: arquivos, bytes, segundos e MB/s
+        """
+        start = time.perf_counter()
+        small, large, total = [], [], 0
+        for path, key in items:
+            if not os.path.exists(path):
+                logger.warning("Arquivo pendente não existe mais, descartado: %s", path)
+                self._done(path, key)
+                continue
+            size = os.path.getsize(path)
+            total += size
+            (large if size > self.part_size else small).append((path, key))
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            for future in [pool.submit(self.upload_file, path, key) for path, key in small]:
+                future.result()
+        for path, key in large:
+            self.upload_file(path, key)
+
+        elapsed = time.perf_counter() - start
+        stats = {"files": len(small) + len(large), "bytes": total, "seconds": elapsed,
+                 "mb_per_s": total / 1024 ** 2 / elapsed if elapsed else 0.0}
+        if stats["files"]:
+            logger.info("S3: %s arquivos, %.1f MB em %.1f s (%.1f MB/s)",
+                        stats["files"], total / 1024 ** 2, elapsed, stats["mb_per_s"])
+        return stats
+
+    def upload_file(self, path, key):
+        """Envia um arquivo (multipart se maior que `part_size`) e confere o resultado."""
+        if os.path.getsize(path) > self.part_size:
+            self._upload_multipart(path, key)
+        else:
+            with open(path, "rb") as f:
+                data = f.read()
+            sha256 = hashlib.sha256(data).digest()
+            response = self.client.put_object(
+                Bucket=self.bucket, Key=key, Body=data, ChecksumSHA256=_b64(sha256),
+                Metadata={"sha256": sha256.hex()}
+            )
+            _check(key, "objeto", hashlib.md5(data).hexdigest(), _b64(sha256), response)
+        self._done(path, key)
+
+    def _file_digest(self, path):
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _multipart_state(self, path, key):
+        """Upload em andamento para este arquivo (retomado) ou um novo."""
+        stat = os.stat(path)
+        with self._lock:
+            state = self._state["multipart"].get(key)
+        if state and (state["path"], state["size"], state["mtime"], state["part_size"]) == \
+                (path, stat.st_size, stat.st_mtime, self.part_size):
+            try:
+                remote = {
+                    part["PartNumber"]: part["ETag"]
+                    for page in self.client.get_paginator("list_parts").paginate(
+                        Bucket=self.bucket, Key=key, UploadId=state["upload_id"]
+                    )
+                    for part in page.get("Parts", [])
+                }
+                # Só vale o que o S3 confirma ter recebido
+                state["parts"] = {
+                    number: part for number, part in state["parts"].items()
+                    if remote.get(int(number)) == part["ETag"]
+                }
+                logger.info("Retomando envio de %s: %s partes já enviadas", key, len(state["parts"]))
+                return state
+            except ClientError as e:
+                logger.warning("Upload de %s não pôde ser retomado (%s); recomeçando", key, e)
+        elif state:
+            # O arquivo mudou: descartar as partes do envio antigo
+            try:
+                self.client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=state["upload_id"])
+            except ClientError as e:
+                logger.warning("Não foi possível cancelar o upload antigo de %s: %s", key, e)
+
+        upload = self.client.create_multipart_upload(
+            Bucket=self.bucket, Key=key, ChecksumAlgorithm="SHA256",
+            Metadata={"sha256": self._file_digest(path)}
+        )
+        state = {"upload_id": upload["UploadId"], "path": path, "size": stat.st_size,
+                 "mtime": stat.st_mtime, "part_size": self.part_size, "parts": {}}
+        with self._lock:
+            self._state["multipart"][key] = state
+            self._save_state()
+        return state
+
+    def _upload_multipart(self, path, key):
+        start = time.perf_counter()
+        state = self._multipart_state(path, key)
+        count = -(-state["size"] // self.part_size)
+        missing = [n for n in range(1, count + 1) if str(n) not in state["parts"]]
+        sent = []
+
+        def send(number):
+            with open(path, "rb") as f:
+                f.seek((number - 1) * self.part_size)
+                data = f.read(self.part_size)
+            md5 = hashlib.md5(data).hexdigest()
+            sha256 = _b64(hashlib.sha256(data).digest())
+            response = self.client.upload_part(
+                Bucket=self.bucket, Key=key, UploadId=state["upload_id"], PartNumber=number,
+                Body=data, ChecksumSHA256=sha256
+            )
+            _check(key, f"parte {number}", md5, sha256, response)
+            with self._lock:
+                state["parts"][str(number)] = {"ETag": response["ETag"], "MD5": md5, "ChecksumSHA256": sha256}
+                self._save_state()
+                sent.append(len(data))
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            for future in [pool.submit(send, number) for number in missing]:
+                future.result()
+
+        parts = [state["parts"][str(n)] for n in range(1, count + 1)]
+        response = self.client.complete_multipart_upload(
+            Bucket=self.bucket, Key=key, UploadId=state["upload_id"],
+            MultipartUpload={"Parts": [
+                {"PartNumber": n, "ETag": part["ETag"], "ChecksumSHA256": part["ChecksumSHA256"]}
+                for n, part in enumerate(parts, start=1)
+            ]}
+        )
+        # Objeto multipart: checksum/ETag compostos a partir dos das partes
+        composite_md5 = hashlib.md5(b"".join(bytes.fromhex(p["MD5"]) for p in parts)).hexdigest()
+        composite_sha256 = _b64(hashlib.sha256(
+            b"".join(base64.b64decode(p["ChecksumSHA256"]) for p in parts)
+        ).digest())
+        _check(key, "objeto", f"{composite_md5}-{count}", composite_sha256, response)
+
+        elapsed = time.perf_counter() - start
+        logger.info("S3: %s enviado em %s partes (%s nesta execução), %.1f MB/s",
+                    key, count, len(missing), sum(sent) / 1024 ** 2 / elapsed)
@@ -3,6 +3,7 @@ import time
 import subprocess
 import logging
 from datetime import datetime
+from config import settings
 
 # Configurar logging
 logging.basicConfig(
@@ -23,6 +24,13 @@ def run_backup():
     except subprocess.CalledProcessError as e:
         logging.error(f'Erro ao executar backup: {str(e)}')
 
+def run_pitr_archive():
+    """Captura um ponto de recuperação (ver pitr.py)"""
+    try:
+        subprocess.run(['python', 'pitr.py', 'archive'], check=True)
+    except subprocess.CalledProcessError as e:
+        logging.error(f'Erro ao arquivar ponto de recuperação: {str(e)}')
+
 def run_monitor():
     """Executa o script de monitoramento"""
     try:
@@ -32,14 +40,41 @@ def run_monitor():
     except subprocess.CalledProcessError as e:
         logging.error(f'Erro ao executar monitoramento: {str(e)}')
 
+def run_token_cleanup():
+    """Executa a limpeza de tokens expirados"""
+    try:
+        logging.info('Iniciando limpeza de tokens expirados...')
+        subprocess.run(['python', 'cleanup_tokens.py'], check=True)
+        logging.info('Limpeza de tokens concluída com sucesso')
+    except subprocess.CalledProcessError as e:
+        logging.error(f'Erro ao executar limpeza de tokens: {str(e)}')
+
+def run_upload_cleanup():
+    """Executa a remoção de fotos sem referência"""
+    try:
+        logging.info('Iniciando limpeza de uploads...')
+        subprocess.run(['python', 'cleanup_uploads.py'], check=True)
+        logging.info('Limpeza de uploads concluída com sucesso')
+    except subprocess.CalledProcessError as e:
+        logging.error(f'Erro ao executar limpeza de uploads: {str(e)}')
+
 def main():
     """Função principal do agendador"""
     # Agendar backup diário às 2h da manhã
     schedule.every().day.at("02:00").do(run_backup)
 
+    # Pontos de recuperação entre um backup diário e outro
+    schedule.every(settings.PITR_INTERVAL).minutes.do(run_pitr_archive)
+
     # Agendar monitoramento a cada hora
     schedule.every().hour.do(run_monitor)
 
+    # Limpeza de tokens expirados fora do caminho do login
+    schedule.every(settings.TOKEN_CLEANUP_INTERVAL).minutes.do(run_token_cleanup)
+
+    # Remover fotos sem referência diariamente às 3h
+    schedule.every().day.at("03:00").do(run_upload_cleanup)
+
     logging.info('Agendador iniciado')
 
     while True:
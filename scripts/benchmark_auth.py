@@ -0,0 +1,65 @@
+"""
+Benchmark da validação de sessão: consulta ao banco vs. cookie assinado.
+
+Compara o custo por validação de um cookie no formato antigo (sem cache,
+uma consulta por validação) com o cookie assinado com expiração, que é
+verificado só com HMAC e a lista de revogação.
+
+Uso: python scripts/benchmark_auth.py [validações]
+"""
+import os
+import sys
+import tempfile
+from time import perf_counter
+
+from sqlalchemy.orm import sessionmaker
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+
+import auth
+from auth import RevocationList, TokenCache
+from database import create_db_engine, sqlite_url
+from models import Base, User
+
+
+def measure(label, cookie, n):
+    start = perf_counter()
+    for _ in range(n):
+        assert auth.authenticate(cookie) is not None
+    elapsed = perf_counter() - start
+    print(f"{label:<16} {elapsed / n * 1e6:8.1f} µs/validação")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(sqlite_url(os.path.join(tmp, "bench.db")))
+        Base.metadata.create_all(engine)
+        auth.Session = sessionmaker(bind=engine)
+        auth.revocation_list = RevocationList()
+
+        session = auth.Session()
+        user = User(username="bench", password="x", name="Bench", email="b@b", phone="0", address="-")
+        session.add(user)
+        session.commit()
+        user_id = user.id
+        session.close()
+
+        # Algumas revogações para o filtro não estar vazio
+        for _ in range(100):
+            auth.logout_user(auth.create_auth_token(user_id))
+
+        signed = auth.create_auth_token(user_id)
+        legacy = auth.create_secure_cookie(user_id, auth.decode_secure_cookie(signed)[1])
+
+        # Cache desligado para medir o caminho pelo banco em cada validação
+        auth.token_cache = TokenCache(maxsize=0)
+        measure("banco", legacy, n)
+        measure("assinado", signed, n)
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
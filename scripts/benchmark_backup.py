@@ -0,0 +1,98 @@
+"""
+Benchmark do backup: latência de quem escreve enquanto o backup roda.
+
+Cria um banco grande, deixa uma thread fazendo commits pequenos (como o app)
+e mede a latência desses commits sem backup, com `shutil.copy2`, com a API
+de backup numa etapa só (como o backup.py fazia) e com o backup em etapas.
+
+Uso: python scripts/benchmark_backup.py [tamanho_mb] [journal_mode]
+"""
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+from time import perf_counter, sleep
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+
+from sqlite_backup import DEFAULT_PAGES, DEFAULT_SLEEP, backup_database
+
+
+def build(path, size_mb, mode):
+    conn = sqlite3.connect(path)
+    conn.execute(f"PRAGMA journal_mode={mode}")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("CREATE TABLE blobs (id INTEGER PRIMARY KEY, data BLOB)")
+    conn.execute("CREATE TABLE writes (id INTEGER PRIMARY KEY, at REAL)")
+    batch = 1000
+    for _ in range(size_mb * 1024 * 1024 // (4000 * batch)):
+        conn.executemany("INSERT INTO blobs (data) VALUES (randomblob(4000))", [()] * batch)
+        conn.commit()
+    conn.close()
+
+
+class Writer(threading.Thread):
+    """Um commit pequeno a cada 5 ms, registrando a latência de cada um."""
+
+    def __init__(self, path):
+        super().__init__(daemon=True)
+        self.path = path
+        self.latencies = []
+        self.errors = 0
+        self.stop = threading.Event()
+
+    def run(self):
+        conn = sqlite3.connect(self.path, timeout=5)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        while not self.stop.is_set():
+            start = perf_counter()
+            try:
+                conn.execute("INSERT INTO writes (at) VALUES (?)", (start,))
+                conn.commit()
+                self.latencies.append(perf_counter() - start)
+            except sqlite3.OperationalError:
+                conn.rollback()
+                self.errors += 1
+            sleep(0.005)
+        conn.close()
+
+
+def measure(label, path, action):
+    writer = Writer(path)
+    writer.start()
+    sleep(0.2)
+    start = perf_counter()
+    action()
+    elapsed = perf_counter() - start
+    writer.stop.set()
+    writer.join()
+
+    latencies = sorted(writer.latencies)
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(f"{label:<12} {elapsed:6.1f} s  commits {len(latencies):5d}  p50 {p50:7.2f} ms  "
+          f"p99 {p99:8.2f} ms  máx {latencies[-1] * 1000:8.1f} ms  erros {writer.errors}")
+
+
+def main():
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 2048
+    mode = sys.argv[2] if len(sys.argv) > 2 else "wal"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        build(path, size_mb, mode)
+        dest = os.path.join(tmp, "backup.db")
+        print(f"Banco de {os.path.getsize(path) / 1024 ** 2:.0f} MB, journal_mode={mode}, "
+              f"etapas de {DEFAULT_PAGES} páginas com pausa de {DEFAULT_SLEEP * 1000:.0f} ms")
+
+        measure("sem backup", path, lambda: sleep(3))
+        measure("copy2", path, lambda: shutil.copy2(path, dest))
+        measure("uma etapa", path, lambda: backup_database(path, dest, pages=-1))
+        measure("em etapas", path, lambda: backup_database(path, dest))
+
+
+if __name__ == "__main__":
+    main()
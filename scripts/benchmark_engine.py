@@ -0,0 +1,99 @@
+"""
+Benchmark de leitura e escrita: engine padrão vs. engine do `database.py`.
+
+Simula sessões concorrentes do Streamlit: várias threads fazendo commits
+pequenos (uma escrita por transação) e leituras por chave.
+
+Uso: python scripts/benchmark_engine.py [threads] [operações_por_thread]
+"""
+import os
+import sys
+import tempfile
+import threading
+from datetime import date, time
+from time import perf_counter
+
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+
+from models import Base, User, Service, Appointment
+from database import create_db_engine, sqlite_url
+
+
+def seed(Session):
+    session = Session()
+    session.add(User(username="bench", password="x", name="Bench", email="b@b", phone="0", address="-"))
+    session.add(Service(name="Bench", price=100, active=1))
+    session.commit()
+    session.close()
+
+
+def run_threads(target, threads):
+    errors = []
+
+    def wrapper():
+        try:
+            target()
+        except Exception as e:
+            errors.append(e)
+
+    workers = [threading.Thread(target=wrapper) for _ in range(threads)]
+    start = perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return perf_counter() - start, errors
+
+
+def bench(label, engine, threads, ops):
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    seed(Session)
+
+    def writer():
+        for i in range(ops):
+            session = Session()
+            try:
+                session.add(Appointment(user_id=1, service_id=1, date=date(2024, 1, 1 + i % 28),
+                                        time=time(10, 0), status="novo", price=100))
+                session.commit()
+            finally:
+                session.close()
+
+    def reader():
+        for i in range(ops):
+            session = Session()
+            try:
+                session.query(func.count(Appointment.id)).filter(
+                    Appointment.date == date(2024, 1, 1 + i % 28)
+                ).scalar()
+                session.query(User).filter_by(id=1).first()
+            finally:
+                session.close()
+
+    write_time, write_errors = run_threads(writer, threads)
+    read_time, read_errors = run_threads(reader, threads)
+    total = threads * ops
+    print(f"{label:<10} escrita: {total / write_time:8.0f} commits/s ({len(write_errors)} erros)  "
+          f"leitura: {total / read_time:8.0f} consultas/s ({len(read_errors)} erros)")
+    engine.dispose()
+
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    ops = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    with tempfile.TemporaryDirectory() as tmp:
+        before = os.path.join(tmp, "before.db")
+        after = os.path.join(tmp, "after.db")
+        print(f"{threads} threads x {ops} operações")
+        bench("antes", create_engine(sqlite_url(before)), threads, ops)
+        bench("depois", create_db_engine(sqlite_url(after)), threads, ops)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark do processamento de imagens: na thread do envio vs. pool de processos.
+
+Gera N fotos e cria as variantes de cada uma:
+- serial: `create_variants` dentro do "envio" (como era antes)
+- pool: o envio só grava a tarefa (`JobQueue.enqueue`) e o pool processa
+
+Mostra o tempo que o envio segura a sessão (p50/p99) e o tempo total até
+todas as variantes ficarem prontas.
+
+Uso: python scripts/benchmark_image_jobs.py [imagens] [processos]
+"""
+import os
+import shutil
+import sys
+import tempfile
+from time import perf_counter
+
+from PIL import Image
+from sqlalchemy.orm import sessionmaker
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+
+from database import create_db_engine, sqlite_url
+from images import create_variants
+from jobs import JobQueue
+from models import Base
+
+
+def make_photos(directory, count):
+    os.makedirs(directory)
+    template = os.path.join(directory, "template.jpg")
+    image = Image.radial_gradient("L").resize((3000, 2250)).convert("RGB")
+    image.save(template, "JPEG", quality=90)
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"foto_{i:04d}.jpg")
+        shutil.copyfile(template, path)
+        paths.append(path)
+    os.remove(template)
+    return paths
+
+
+def report(label, latencies, elapsed, count):
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(f"{label:<12} envio p50 {p50:7.1f} ms  p99 {p99:7.1f} ms  "
+          f"total {elapsed:6.1f} s  {count / elapsed:6.1f} imagens/s")
+
+
+def bench_serial(paths):
+    latencies = []
+    start = perf_counter()
+    for path in paths:
+        t0 = perf_counter()
+        create_variants(path)
+        latencies.append(perf_counter() - t0)
+    report("serial", latencies, perf_counter() - start, len(paths))
+
+
+def bench_pool(paths, db_path, workers):
+    engine = create_db_engine(sqlite_url(db_path))
+    Base.metadata.create_all(engine)
+    # Os processos do pool sobem aqui, fora da medição
+    job_queue = JobQueue(sessionmaker(bind=engine), max_workers=workers)
+
+    latencies = []
+    start = perf_counter()
+    for path in paths:
+        t0 = perf_counter()
+        job_queue.enqueue("image_variants", original=path)
+        latencies.append(perf_counter() - t0)
+    job_queue.wait()
+    elapsed = perf_counter() - start
+    report(f"pool x{workers}", latencies, elapsed, len(paths))
+    print(f"{'':<12} tarefas: {job_queue.counts()}")
+    job_queue.shutdown()
+    engine.dispose()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{count} fotos 3000x2250, {os.cpu_count()} CPU(s)")
+        bench_serial(make_photos(os.path.join(tmp, "serial"), count))
+        bench_pool(make_photos(os.path.join(tmp, "pool"), count), os.path.join(tmp, "jobs.db"), workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Benchmark da leitura de logs do monitor (log_scan).
+
+Gera uma semana de log (~1 GB no total): o arquivo atual com o último dia e
+seis rotacionados diários, comprimidos com gzip como faz o monitor. Compara,
+para o monitor parado há 24 horas e há 3 dias (sem cursor):
+- a leitura linha a linha (decodifica e testa os padrões em cada linha) dos
+  mesmos arquivos e trechos;
+- scan_logs num processo e com o pool de processos;
+e, por fim, uma leitura incremental depois de acrescentar ~1 hora de linhas.
+
+Uso: python scripts/benchmark_log_scan.py [tamanho_mb] [processos]
+     (padrão: 1024 MB, um processo por CPU)
+"""
+import gzip
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from time import perf_counter
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+
+from log_scan import BLOCK_SIZE, archive_name, find_cutoff, plan, scan_logs
+
+LINE = "{} - {} - Agendamento {} processado para o usuário {}\n"
+PATTERNS = ["CRITICAL", "Traceback", "ERROR", "Exception", "WARNING", "failed"]
+
+
+def generate(path, size, start, step):
+    """Acrescenta linhas a partir de `start` até escrever `size` bytes; devolve o próximo instante."""
+    moment = start
+    written = 0
+    number = 0
+    with open(path, "a") as f:
+        while written < size:
+            lines = []
+            for _ in range(10000):
+                level = "ERROR" if number % 997 == 0 else "INFO"
+                lines.append(LINE.format(moment.strftime("%Y-%m-%d %H:%M:%S"), level, number, number % 500))
+                if number % 997 == 0:
+                    lines.append("Traceback (most recent call last):\n")
+                moment += step
+                number += 1
+            chunk = "".join(lines)
+            f.write(chunk)
+            written += len(chunk)
+    return moment
+
+
+def archive(path, moment):
+    """Rotaciona `path` como log_scan.rotate, com o nome do instante `moment`."""
+    with open(path, "rb") as src, gzip.open(archive_name(path, moment) + ".gz", "wb", compresslevel=6) as dst:
+        shutil.copyfileobj(src, dst, BLOCK_SIZE)
+    os.truncate(path, 0)
+
+
+def line_by_line(path, cutoff):
+    """Os mesmos arquivos e trechos de scan_logs, lidos linha a linha."""
+    found = 0
+    since = cutoff.strftime("%Y-%m-%d %H:%M:%S")
+    for file_path, start in plan(path, {}, cutoff):
+        compressed = file_path.endswith(".gz")
+        with (gzip.open if compressed else open)(file_path, "rb") as f:
+            if not compressed:
+                f.seek(find_cutoff(f, 0, os.path.getsize(file_path), cutoff))
+            stamp = ""
+            for raw in f:
+                line = raw.decode("utf-8", "replace")
+                if line[:4].isdigit():
+                    stamp = line[:19]
+                if compressed and stamp < since:
+                    continue
+                if any(pattern in line for pattern in PATTERNS):
+                    found += 1
+    return found
+
+
+def timed(label, function, *args):
+    start = perf_counter()
+    result = function(*args)
+    print(f"{label:<40}{perf_counter() - start:8.2f} s  ({result} linhas)")
+
+
+def main():
+    size = int(sys.argv[1]) * 1024 * 1024 if len(sys.argv) > 1 else 1024 * 1024 * 1024
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "app.log")
+        now = datetime.now()
+        day_size = size // 7
+        step = timedelta(days=1) / (day_size // 75)
+        moment = now - timedelta(days=7)
+        for day in range(6):
+            moment = generate(path, day_size, moment, step)
+            archive(path, moment)
+        generate(path, day_size, moment, step)
+        total = sum(os.path.getsize(os.path.join(tmp, f)) for f in os.listdir(tmp))
+        print(f"Logs: {total / 1024 ** 2:.0f} MB em disco (atual: {os.path.getsize(path) / 1024 ** 2:.0f} MB), "
+              f"{os.cpu_count()} CPU(s)")
+
+        for hours in (24, 72):
+            cutoff = now - timedelta(hours=hours)
+            timed(f"Últimas {hours} h, linha a linha:", line_by_line, path, cutoff)
+            timed(f"Últimas {hours} h, scan_logs (1 processo):",
+                  lambda: len(scan_logs([path], {}, cutoff, PATTERNS, 1)))
+            if workers > 1:
+                timed(f"Últimas {hours} h, scan_logs ({workers} processos):",
+                      lambda: len(scan_logs([path], {}, cutoff, PATTERNS, workers)))
+
+        cursors = {}
+        cutoff = now - timedelta(hours=24)
+        scan_logs([path], cursors, cutoff, PATTERNS)
+        generate(path, day_size // 24, now, step)
+        timed("Incremental, +1 hora:", lambda: len(scan_logs([path], cursors, cutoff, PATTERNS)))
+
+
+if __name__ == "__main__":
+    main()
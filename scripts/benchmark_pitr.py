@@ -0,0 +1,103 @@
+"""
+Benchmark da recuperação para um instante (pitr).
+
+Cria um banco com agendamentos e simula uma semana de uso: entre um ponto
+de recuperação e outro entram novos agendamentos e alguns mudam de status.
+Mede o custo de cada ponto, o espaço ocupado pelo arquivo e o tempo para
+restaurar o banco como estava no início, no meio e no fim da semana
+(conferindo o número de agendamentos em cada instante).
+
+Uso: python scripts/benchmark_pitr.py [pontos] [agendamentos_iniciais]
+     (padrão: 168 pontos = uma semana de hora em hora; 2016 = a cada 5 min)
+"""
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+from datetime import datetime
+from time import perf_counter
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+
+from backup_store import BackupStore
+from pitr import PitrArchive
+
+
+def build(path, rows):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""CREATE TABLE appointments (
+        id INTEGER PRIMARY KEY, user_id INTEGER, date TEXT, time TEXT, status TEXT, notes TEXT)""")
+    conn.execute("CREATE INDEX ix_appointments_date ON appointments (date)")
+    add_bookings(conn, rows)
+    conn.close()
+
+
+def add_bookings(conn, count):
+    conn.executemany(
+        "INSERT INTO appointments (user_id, date, time, status, notes) VALUES (?, ?, '10:00', 'pendente', ?)",
+        [(random.randint(1, 5000), f"2026-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}",
+          "Piscina " + "x" * random.randint(20, 200)) for _ in range(count)]
+    )
+    conn.commit()
+
+
+def change_status(conn, count):
+    top = conn.execute("SELECT max(id) FROM appointments").fetchone()[0]
+    conn.executemany("UPDATE appointments SET status = 'confirmado' WHERE id = ?",
+                     [(random.randint(1, top),) for _ in range(count)])
+    conn.commit()
+
+
+def count_rows(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT count(*) FROM appointments").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+
+
+def main():
+    points = int(sys.argv[1]) if len(sys.argv) > 1 else 168
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 200_000
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "app.db")
+        build(db_path, rows)
+        archive = PitrArchive(BackupStore(os.path.join(tmp, "pitr")))
+        conn = sqlite3.connect(db_path)
+
+        history, archive_times = [], []
+        for _ in range(points):
+            add_bookings(conn, random.randint(5, 40))
+            change_status(conn, random.randint(5, 40))
+            start = perf_counter()
+            archive.archive(db_path)
+            archive_times.append(perf_counter() - start)
+            history.append((datetime.now(), count_rows(db_path)))
+        conn.close()
+
+        db_mb = os.path.getsize(db_path) / 1024 ** 2
+        print(f"banco: {db_mb:.1f} MB, {points} pontos")
+        print(f"ponto de recuperação: mediana {statistics.median(archive_times):.2f} s, "
+              f"máx {max(archive_times):.2f} s")
+        print(f"arquivo: {directory_size(archive.store.root) / 1024 ** 2:.1f} MB "
+              f"(cópias completas: {db_mb * points:.0f} MB)")
+
+        for label, index in (("início", 0), ("meio", points // 2), ("fim", points - 1)):
+            moment, expected = history[index]
+            start = perf_counter()
+            point = archive.restore_to(moment, os.path.join(tmp, f"restaurado_{index}.db"))
+            elapsed = perf_counter() - start
+            status = "ok" if count_rows(point.path) == expected else "DIVERGENTE"
+            print(f"restaurar {label} da semana (sequência {point.sequence}): {elapsed:.2f} s [{status}]")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark das reservas concorrentes (appointments.reserve_appointment).
+
+Várias threads reservam ao mesmo tempo em dias com limite e num dia sem
+limite, cada reserva com sua sessão e seu commit. Mede as reservas por
+segundo e confere que nenhum dia com limite passou da capacidade.
+
+Uso: python scripts/benchmark_reservation.py [threads] [reservas] [limite_por_dia]
+"""
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time, timedelta
+from time import perf_counter
+
+from sqlalchemy.orm import sessionmaker
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+
+from appointments import reserve_appointment
+from database import create_db_engine, sqlite_url
+from models import Appointment, Base, Config, Service, User
+
+FIRST_DAY = date(2024, 3, 4)  # segunda-feira
+FREE_WEEKDAY = 6  # domingo sem limite
+
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    bookings = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    limit = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(sqlite_url(os.path.join(tmp, "bench.db")), pool_size=threads, max_overflow=0)
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        session = Session()
+        session.add(User(id=1, username="bench", password="x", name="Bench", email="b@b", phone="0", address="-"))
+        session.add(Service(id=1, name="Bench", price=100, active=1))
+        session.add_all(Config(weekday=weekday, max_appointments=0 if weekday == FREE_WEEKDAY else limit)
+                        for weekday in range(7))
+        session.commit()
+        session.close()
+
+        days = [FIRST_DAY + timedelta(days=i % 14) for i in range(bookings)]
+
+        def book(day):
+            session = Session()
+            try:
+                return reserve_appointment(session, user_id=1, service_id=1, date=day, time=time(9, 0),
+                                           status="novo", price=100)
+            finally:
+                session.close()
+
+        start = perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            results = list(pool.map(book, days))
+        elapsed = perf_counter() - start
+
+        session = Session()
+        overbooked = [day for day in set(days) if day.weekday() != FREE_WEEKDAY
+                      and session.query(Appointment).filter_by(date=day).count() > limit]
+        session.close()
+        engine.dispose()
+
+    created = sum(1 for r in results if r)
+    print(f"{threads} threads, {bookings} tentativas: {bookings / elapsed:.0f} reservas/s, "
+          f"{created} criadas, {bookings - created} recusadas (dia cheio), "
+          f"{len(overbooked)} dias acima do limite")
+    return 1 if overbooked else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
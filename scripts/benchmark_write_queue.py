@@ -0,0 +1,74 @@
+"""
+Benchmark de escritas concorrentes: commit por thread vs. fila de escritas.
+
+Várias threads (como as sessões do Streamlit) criam agendamentos, cada uma
+com um commit próprio ou enviando a escrita para a `WriteQueue`.
+
+Uso: python scripts/benchmark_write_queue.py [threads] [escritas_por_thread]
+"""
+import os
+import sys
+import tempfile
+from datetime import date, time
+from time import perf_counter
+
+from sqlalchemy.orm import sessionmaker
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+
+from appointments import reservation
+from database import create_db_engine, sqlite_url
+from models import Base, Service, User
+from write_queue import WriteQueue, run_write
+
+sys.path.insert(0, os.path.join(root_dir, "scripts"))
+from benchmark_engine import run_threads
+
+
+def bench(label, db_path, threads, ops, use_queue):
+    engine = create_db_engine(sqlite_url(db_path))
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    session = Session()
+    session.add(User(username="bench", password="x", name="Bench", email="b@b", phone="0", address="-"))
+    session.add(Service(name="Bench", price=100, active=1))
+    session.commit()
+    session.close()
+
+    queue = WriteQueue(Session) if use_queue else None
+    latencies = []
+
+    def writer():
+        for i in range(ops):
+            book = reservation(user_id=1, service_id=1, date=date(2024, 1, 1 + i % 28),
+                               time=time(10, 0), status="novo", price=100)
+            start = perf_counter()
+            run_write(book, Session, queue)
+            latencies.append(perf_counter() - start)
+
+    elapsed, errors = run_threads(writer, threads)
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000 if latencies else 0
+    extra = ""
+    if queue is not None:
+        queue.close()
+        metrics = queue.metrics()
+        extra = f"  {metrics['commits']} commits (média {metrics['avg_batch']:.1f} escritas/commit)"
+    print(f"{label:<8} {threads * ops / elapsed:8.0f} escritas/s  p99 {p99:6.1f} ms  "
+          f"{len(errors)} erros{extra}")
+    engine.dispose()
+
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    ops = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{threads} threads x {ops} escritas")
+        bench("direto", os.path.join(tmp, "direct.db"), threads, ops, use_queue=False)
+        bench("fila", os.path.join(tmp, "queue.db"), threads, ops, use_queue=True)
+
+
+if __name__ == "__main__":
+    main()
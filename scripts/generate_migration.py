@@ -3,11 +3,8 @@
 
 import sys
 import os
-import shutil
 import alembic.config
 from alembic import command
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
 from datetime import datetime
 
 # Adicionar diretório raiz ao PYTHONPATH
@@ -17,11 +14,12 @@ sys.path.insert(0, root_dir)
 # Agora podemos importar os módulos do projeto
 from config import settings
 from models import User, Service, Appointment, Base
+from database import Session, pool_gate
+from db_restore import restore_database
+from sqlite_backup import create_backup
 
 # Configurações do banco de dados
 DB_PATH = settings.DB_PATH
-engine = create_engine(f"sqlite:///{DB_PATH}")
-Session = sessionmaker(bind=engine)
 
 def verify_database_integrity():
     """
@@ -73,7 +71,7 @@ def verify_database_integrity():
 
 def backup_db():
     """
-    Cria um backup do banco de dados atual.
+    Cria um backup online do banco de dados atual (ver sqlite_backup).
 
     Returns:
         str: Caminho do arquivo de backup ou None em caso de erro
@@ -82,24 +80,17 @@ def backup_db():
         return None
 
     try:
-        # Criar diretório de backup se não existir
-        backup_dir = os.path.join(os.path.dirname(DB_PATH), "backups")
-        os.makedirs(backup_dir, exist_ok=True)
-
-        # Nome do arquivo de backup com timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_file = os.path.join(backup_dir, f"db_backup_{timestamp}.sqlite")
-
-        # Copiar o arquivo do banco de dados
-        shutil.copy2(DB_PATH, backup_file)
-
         # Manter apenas os 5 backups mais recentes
-        backups = sorted([os.path.join(backup_dir, f) for f in os.listdir(backup_dir)])
-        if len(backups) > 5:
-            for old_backup in backups[:-5]:
-                os.remove(old_backup)
-
-        return backup_file
+        result = create_backup(
+            DB_PATH,
+            os.path.join(os.path.dirname(DB_PATH), "backups"),
+            keep=5,
+            suffix=".sqlite",
+            pages=settings.BACKUP_PAGES_PER_STEP,
+            sleep=settings.BACKUP_STEP_SLEEP / 1000
+        )
+        print(f"Backup criado em {result.duration:.1f}s ({result.pages} páginas)")
+        return result.path
     except Exception as e:
         print(f"Erro ao criar backup: {str(e)}")
         return None
@@ -131,12 +122,12 @@ def safe_run_migrations():
         return True, "Migrações executadas com sucesso"
 
     except Exception as e:
-        # Restaurar backup em caso de erro
-        if engine:
-            engine.dispose()
-
+        # Restaurar backup em caso de erro (preparado ao lado e trocado de uma vez)
         if os.path.exists(backup_file):
-            shutil.copy2(backup_file, DB_PATH)
+            try:
+                restore_database(backup_file, DB_PATH, gate=pool_gate)
+            except Exception as restore_error:
+                return False, f"Erro durante migração, falha ao restaurar backup: {str(restore_error)}"
             return False, f"Erro durante migração, backup restaurado: {str(e)}"
         else:
             return False, f"Erro durante migração, falha ao restaurar backup: {str(e)}"
@@ -0,0 +1,151 @@
+"""
+Backup online do banco SQLite, copiado em etapas.
+
+Usa a API de backup do SQLite (`sqlite3.Connection.backup`) em vez de copiar
+o arquivo: a cópia passa pelo próprio SQLite e é sempre consistente, mesmo
+com o app escrevendo. A cada etapa são copiadas `pages` páginas e a cópia
+pausa `sleep` segundos, então as escritas do app não ficam esperando a
+cópia inteira.
+
+- WAL: a cópia roda dentro de uma transação de leitura, que fixa a versão
+  copiada sem bloquear quem escreve (o WAL guarda as mudanças novas).
+- Journal (DELETE/TRUNCATE...): não dá para segurar a leitura sem travar as
+  escritas, então o SQLite recomeça a cópia quando o banco muda no meio.
+  Depois de `max_restarts` recomeços, o restante é copiado numa etapa só.
+
+O backup é gravado num `.part` e renomeado no fim, já convertido para um
+arquivo único (journal DELETE), pronto para abrir ou restaurar.
+"""
+import logging
+import os
+import sqlite3
+import time
+from collections import namedtuple
+from datetime import datetime
+
+# Páginas por etapa (4 MiB com páginas de 4 KiB) e pausa entre etapas
+DEFAULT_PAGES = 1024
+DEFAULT_SLEEP = 0.005
+
+BackupResult = namedtuple("BackupResult", ["path", "pages", "steps", "restarts", "duration"])
+
+logger = logging.getLogger(__name__)
+
+
+class _Restarted(Exception):
+    """A cópia recomeçou vezes demais; terminar numa etapa só."""
+
+
+def journal_mode(conn):
+    return conn.execute("PRAGMA journal_mode").fetchone()[0].lower()
+
+
+def backup_database(source, destination, pages=DEFAULT_PAGES, sleep=DEFAULT_SLEEP,
+                    progress=None, max_restarts=3, timeout=30):
+    """
+    Copia um banco SQLite em uso para `destination`.
+
+    Args:
+        source: Caminho do banco de origem
+        destination: Caminho do backup (substituído se existir)
+        pages: Páginas copiadas por etapa (-1 = tudo de uma vez)
+        sleep: Pausa entre as etapas (segundos)
+        progress: Função `progress(copiadas, total)` chamada a cada etapa
+        max_restarts: Recomeços aceitos antes de copiar o resto numa etapa
+        timeout: Espera máxima por um lock no banco de origem (segundos)
+
+    Returns:
+        BackupResult
+    """
+    start = time.perf_counter()
+    tmp_path = destination + ".part"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    src = sqlite3.connect(source, timeout=timeout)
+    dst = sqlite3.connect(tmp_path)
+    state = {"steps": 0, "restarts": 0, "remaining": None, "pages": 0}
+    try:
+        wal = journal_mode(src) == "wal"
+        if wal:
+            # Transação de leitura aberta: todas as etapas veem a mesma versão
+            src.execute("BEGIN")
+            src.execute("SELECT count(*) FROM sqlite_master").fetchone()
+
+        def on_step(status, remaining, total):
+            state["steps"] += 1
+            if state["remaining"] is not None and remaining > state["remaining"]:
+                state["restarts"] += 1
+                if state["restarts"] > max_restarts:
+                    raise _Restarted()
+            state["remaining"] = remaining
+            state["pages"] = total
+            if progress:
+                progress(total - remaining, total)
+            if remaining and sleep:
+                time.sleep(sleep)
+
+        try:
+            src.backup(dst, pages=pages, progress=on_step)
+        except _Restarted:
+            logger.warning("Backup recomeçou %s vezes; copiando o restante de uma vez", max_restarts)
+            src.backup(dst, pages=-1)
+            if progress:
+                progress(state["pages"], state["pages"])
+        if wal:
+            src.rollback()
+
+        # Backup em arquivo único, sem -wal/-shm ao lado
+        if journal_mode(dst) == "wal":
+            dst.execute("PRAGMA journal_mode=DELETE")
+    except BaseException:
+        dst.close()
+        src.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    dst.close()
+    src.close()
+    os.replace(tmp_path, destination)
+
+    result = BackupResult(destination, state["pages"], state["steps"], state["restarts"],
+                          time.perf_counter() - start)
+    logger.info(
+        "Backup de %s em %s: %s páginas, %s etapas, %s recomeços, %.2f s",
+        source, destination, result.pages, result.steps, result.restarts, result.duration
+    )
+    return result
+
+
+def create_backup(source, backup_dir, keep=None, prefix="db_backup_", suffix=".db", **options):
+    """
+    Cria um backup com data e hora no nome e remove os mais antigos.
+
+    Args:
+        source: Caminho do banco de origem
+        backup_dir: Pasta dos backups
+        keep: Quantos backups manter (None = todos)
+        prefix, suffix: Formato do nome (`<prefix>AAAAMMDD_HHMMSS<suffix>`)
+        **options: Repassados para `backup_database`
+
+    Returns:
+        BackupResult
+    """
+    os.makedirs(backup_dir, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    result = backup_database(source, os.path.join(backup_dir, f"{prefix}{timestamp}{suffix}"), **options)
+    if keep:
+        prune_backups(backup_dir, keep, prefix)
+    return result
+
+
+def prune_backups(backup_dir, keep, prefix="db_backup_"):
+    """Mantém só os `keep` backups mais recentes (pela data no nome)."""
+    backups = sorted(
+        f for f in os.listdir(backup_dir) if f.startswith(prefix) and not f.endswith(".part")
+    )
+    removed = backups[:-keep] if keep else []
+    for filename in removed:
+        os.remove(os.path.join(backup_dir, filename))
+        logger.info("Backup antigo removido: %s", filename)
+    return removed
@@ -2,27 +2,37 @@ import streamlit as st
 from streamlit_folium import folium_static
 import folium
 import pandas as pd
-import requests
 from datetime import datetime, timedelta
 import os
 import urllib.parse
+from time import perf_counter
 import webbrowser
 from feature_flags import feature_flags
 from config import settings
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
 from models import User, Service, Appointment, Config, Gallery, Base, AuthToken
+from database import engine, Session, pool_gate
+from db_restore import restore_database
 from utils import hash_pwd, check_pwd
+from weather import WeatherCache, WeatherUnavailable
+from write_queue import WriteQueue, run_write
+from images import display_path, has_variants
+from jobs import JobQueue
+from upload_store import UploadStore, UploadTooLarge
+from sqlite_backup import create_backup
+from gallery import list_gallery
+from appointments import (
+    AppointmentFilters, STATUS_OPTIONS, list_appointments, count_by_status,
+    list_user_appointments, availability, day_availability, reservation, status_change,
+    removal
+)
+from auth import (
+    create_auth_token, authenticate, validate_auth_token, logout_user,
+    revoke_user_tokens, revocation_list
+)
 import alembic.config
 from alembic import command
 from alembic.script import ScriptDirectory
 from alembic.runtime.environment import EnvironmentContext
-import shutil
-import secrets
-import json
-import hmac
-import hashlib
-import base64
 import subprocess
 import sys
 import extra_streamlit_components as stx
@@ -37,200 +47,6 @@ def install_dependencies():
 
 install_dependencies()
 
-# ---------- FUNÇÕES DE GERENCIAMENTO DE TOKENS ----------
-def generate_token():
-    """Gera um token aleatório seguro."""
-    return secrets.token_hex(32)
-
-def create_auth_token(user_id, expiry_hours=10):
-    """
-    Cria um novo token de autenticação para o usuário.
-
-    Args:
-        user_id: ID do usuário
-        expiry_hours: Horas até a expiração do token
-
-    Returns:
-        str: Token gerado
-    """
-    session = Session()
-    try:
-        # Limpar tokens expirados
-        cleanup_expired_tokens()
-
-        # Gerar novo token
-        token = generate_token()
-        now = datetime.now()
-        expires_at = now + timedelta(hours=expiry_hours)
-
-        # Salvar no banco de dados
-        auth_token = AuthToken(
-            user_id=user_id,
-            token=token,
-            created_at=now.isoformat(),
-            expires_at=expires_at.isoformat()
-        )
-        session.add(auth_token)
-        session.commit()
-
-        # Criar cookie seguro
-        cookie_value = create_secure_cookie(user_id, token)
-        return cookie_value
-    except Exception as e:
-        session.rollback()
-        raise e
-    finally:
-        session.close()
-
-def validate_auth_token(cookie_value):
-    """
-    Valida um token de autenticação.
-
-    Args:
-        cookie_value: Valor do cookie
-
-    Returns:
-        int or None: ID do usuário se válido, None caso contrário
-    """
-    try:
-        # Decodificar cookie
-        user_id, token = decode_secure_cookie(cookie_value)
-        if not user_id or not token:
-            return None
-
-        # Verificar no banco de dados
-        session = Session()
-        auth_token = session.query(AuthToken).filter_by(
-            user_id=user_id,
-            token=token
-        ).first()
-        session.close()
-
-        if not auth_token:
-            return None
-
-        # Verificar expiração
-        expires_at = datetime.fromisoformat(auth_token.expires_at)
-        if datetime.now() > expires_at:
-            # Token expirado, remover
-            delete_auth_token(user_id, token)
-            return None
-
-        return user_id
-    except Exception:
-        return None
-
-def delete_auth_token(user_id, token):
-    """Remove um token específico do banco de dados."""
-    session = Session()
-    try:
-        session.query(AuthToken).filter_by(
-            user_id=user_id,
-            token=token
-        ).delete()
-        session.commit()
-    except Exception as e:
-        session.rollback()
-        raise e
-    finally:
-        session.close()
-
-def cleanup_expired_tokens():
-    """Remove todos os tokens expirados do banco de dados."""
-    session = Session()
-    try:
-        now = datetime.now().isoformat()
-        session.query(AuthToken).filter(
-            AuthToken.expires_at < now
-        ).delete()
-        session.commit()
-    except Exception as e:
-        session.rollback()
-        raise e
-    finally:
-        session.close()
-
-def logout_user(cookie_value):
-    """
-    Realiza o logout do usuário removendo o token.
-
-    Args:
-        cookie_value: Valor do cookie
-
-    Returns:
-        bool: True se logout bem-sucedido, False caso contrário
-    """
-    try:
-        user_id, token = decode_secure_cookie(cookie_value)
-        if user_id and token:
-            delete_auth_token(user_id, token)
-            return True
-        return False
-    except Exception:
-        return False
-
-def create_secure_cookie(user_id, token, secret_key=None):
-    """
-    Cria um cookie seguro com HMAC para verificação de integridade.
-
-    Args:
-        user_id: ID do usuário
-        token: Token de autenticação
-        secret_key: Chave secreta para assinatura (opcional)
-
-    Returns:
-        str: Valor codificado do cookie
-    """
-    if secret_key is None:
-        secret_key = settings.ADMIN_SECRET
-
-    payload = json.dumps({"user_id": user_id, "token": token})
-    payload_b64 = base64.b64encode(payload.encode()).decode()
-
-    # Criar assinatura HMAC
-    signature = hmac.new(
-        secret_key.encode(),
-        payload_b64.encode(),
-        hashlib.sha256
-    ).hexdigest()
-
-    # Combinar payload e assinatura
-    return f"{payload_b64}.{signature}"
-
-def decode_secure_cookie(cookie_value, secret_key=None):
-    """
-    Decodifica e verifica um cookie seguro.
-
-    Args:
-        cookie_value: Valor do cookie
-        secret_key: Chave secreta para verificação (opcional)
-
-    Returns:
-        tuple: (user_id, token) se válido, (None, None) caso contrário
-    """
-    if secret_key is None:
-        secret_key = settings.ADMIN_SECRET
-
-    try:
-        # Separar payload e assinatura
-        payload_b64, signature = cookie_value.split(".")
-
-        # Verificar assinatura
-        expected_signature = hmac.new(
-            secret_key.encode(),
-            payload_b64.encode(),
-            hashlib.sha256
-        ).hexdigest()
-
-        if not hmac.compare_digest(signature, expected_signature):
-            return None, None
-
-        # Decodificar payload
-        payload = json.loads(base64.b64decode(payload_b64).decode())
-        return payload["user_id"], payload["token"]
-    except Exception:
-        return None, None
-
 # ---------- CONFIGURAÇÕES ----------
 ENVIRONMENT = settings.ENVIRONMENT
 ADMIN_SECRET = settings.ADMIN_SECRET
@@ -238,9 +54,17 @@ DB_PATH = settings.DB_PATH
 WEATHER_API_KEY = settings.WEATHER_API_KEY
 WHATSAPP_LINK = settings.WHATSAPP_LINK
 
-# Inicializar engine e Session
-engine = create_engine(f"sqlite:///{DB_PATH}")
-Session = sessionmaker(bind=engine)
+# Agendamentos por página na listagem do admin
+ADMIN_PAGE_SIZE = 20
+# Agendamentos por página em "Meus Agendamentos"
+CUSTOMER_PAGE_SIZE = 20
+
+# Dias oferecidos no seletor de data do agendamento
+BOOKING_WINDOW_DAYS = 60
+
+# Pares de fotos por página da galeria e validade do cache (segundos)
+GALLERY_PAGE_SIZE = 6
+GALLERY_CACHE_TTL = 600
 
 # Dicionário de tradução do tempo
 WEATHER_TRANSLATIONS = {
@@ -294,8 +118,12 @@ WEATHER_TRANSLATIONS = {
 
 # ---------- FUNÇÕES AUXILIARES ----------
 def create_default_services():
-    """Cria os serviços padrão se não existirem"""
-    session = Session()
+    """
+    Cria os serviços padrão se não existirem.
+
+    Returns:
+        bool: True se algum serviço foi criado
+    """
     default_services = [
         (
             "Pacote Anual",
@@ -318,11 +146,16 @@ def create_default_services():
             80.00
         )
     ]
-    created = False
-    try:
+
+    def add_missing(session):
+        # Uma única consulta para saber quais serviços já existem
+        names = [name for name, _, _ in default_services]
+        existing = {
+            name for (name,) in session.query(Service.name).filter(Service.name.in_(names))
+        }
+        created = False
         for name, description, price in default_services:
-            existing = session.query(Service).filter_by(name=name).first()
-            if not existing:
+            if name not in existing:
                 new_service = Service(
                     name=name,
                     description=description,
@@ -331,25 +164,16 @@ def create_default_services():
                 )
                 session.add(new_service)
                 created = True
+        return created
 
-        session.commit()
-        if created:
-            if 'show_success_services' not in st.session_state:
-                st.session_state['show_success_services'] = True
-            if st.session_state['show_success_services']:
-                st.success("Serviços padrão criados com sucesso!")
-                if st.button("Fechar mensagem", key="close_success_services"):
-                    st.session_state['show_success_services'] = False
-                    st.experimental_rerun()
-    except Exception as e:
-        session.rollback()
-        st.error(f"Erro ao criar serviços padrão: {str(e)}")
-    finally:
-        session.close()
+    return run_db_write(add_missing)
 
-def backup_db():
+def backup_db(progress=None):
     """
-    Cria um backup do banco de dados atual.
+    Cria um backup online do banco de dados atual (ver sqlite_backup).
+
+    Args:
+        progress: Função `progress(copiadas, total)` chamada a cada etapa
 
     Returns:
         str: Caminho do arquivo de backup ou None em caso de erro
@@ -358,24 +182,17 @@ def backup_db():
         return None
 
     try:
-        # Criar diretório de backup se não existir
-        backup_dir = os.path.join(os.path.dirname(DB_PATH), "backups")
-        os.makedirs(backup_dir, exist_ok=True)
-
-        # Nome do arquivo de backup com timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_file = os.path.join(backup_dir, f"db_backup_{timestamp}.sqlite")
-
-        # Copiar o arquivo do banco de dados
-        shutil.copy2(DB_PATH, backup_file)
-
         # Manter apenas os 5 backups mais recentes
-        backups = sorted([os.path.join(backup_dir, f) for f in os.listdir(backup_dir)])
-        if len(backups) > 5:
-            for old_backup in backups[:-5]:
-                os.remove(old_backup)
-
-        return backup_file
+        result = create_backup(
+            DB_PATH,
+            os.path.join(os.path.dirname(DB_PATH), "backups"),
+            keep=5,
+            suffix=".sqlite",
+            pages=settings.BACKUP_PAGES_PER_STEP,
+            sleep=settings.BACKUP_STEP_SLEEP / 1000,
+            progress=progress
+        )
+        return result.path
     except Exception as e:
         print(f"Erro ao criar backup: {str(e)}")
         return None
@@ -400,32 +217,41 @@ def run_alembic_migrations():
             alembic_cfg,
             script,
             fn=lambda rev, _: script.get_revisions(rev)
-        ) as env:
-            env.configure(connection=engine.connect(), target_metadata=Base.metadata)
+        ) as env, engine.connect() as connection:
+            env.configure(connection=connection, target_metadata=Base.metadata)
             context = env.get_context()
             current_rev = context.get_current_revision()
             head_rev = script.get_current_head()
 
-            if current_rev != head_rev:
-                # Há migrações pendentes, criar backup antes de aplicar
-                backup_file = backup_db()
+        # O upgrade abre seu próprio EnvironmentContext, então roda fora do bloco acima
+        if current_rev != head_rev:
+            # Há migrações pendentes, criar backup antes de aplicar
+            backup_file = backup_db()
 
-                # Executar migrações
-                command.upgrade(alembic_cfg, "head")
+            # Executar migrações
+            command.upgrade(alembic_cfg, "head")
 
-                return True, f"Banco de dados atualizado para a revisão {head_rev}"
-            else:
-                return True, "Banco de dados já está na versão mais recente"
+            return True, f"Banco de dados atualizado para a revisão {head_rev}"
+        else:
+            return True, "Banco de dados já está na versão mais recente"
 
     except Exception as e:
         return False, f"Erro ao executar migrações: {str(e)}"
 
-def init_db():
-    """Inicializa o banco de dados"""
-    if not DB_PATH:
-        print("ERRO CRÍTICO: DB_PATH não está definido nas configurações. A inicialização do banco de dados foi abortada.")
-        st.error("Erro crítico: A configuração do caminho do banco de dados (DB_PATH) não foi encontrada. O aplicativo não pode iniciar corretamente.")
-        return
+@st.cache_resource(show_spinner=False)
+def run_startup():
+    """
+    Executa migrações e criação dos serviços padrão uma única vez por processo.
+
+    O resultado fica memorizado pelo Streamlit, então os reruns seguintes não
+    fazem nenhum trabalho de schema. Para reexecutar (ex.: após uma migração
+    manual) use `run_startup.clear()`.
+
+    Returns:
+        dict: success, message, services_created, timings (ms) e started_at
+    """
+    started_at = datetime.now()
+    timings = {}
 
     # Garante que o diretório do banco de dados exista
     db_dir = os.path.dirname(DB_PATH)
@@ -433,21 +259,120 @@ def init_db():
         os.makedirs(db_dir, exist_ok=True)
 
     # Executar migrações Alembic
+    t0 = perf_counter()
     success, message = run_alembic_migrations()
-    if not success:
-        st.warning(message)
+    timings['migrations'] = (perf_counter() - t0) * 1000
 
     # Criar serviços padrão se necessário
-    create_default_services()
+    t0 = perf_counter()
+    services_created = False
+    try:
+        services_created = create_default_services()
+    except Exception as e:
+        success, message = False, f"Erro ao criar serviços padrão: {str(e)}"
+    timings['default_services'] = (perf_counter() - t0) * 1000
+
+    # Carregar a lista de tokens revogados para a validação sem banco
+    t0 = perf_counter()
+    if success:
+        revocation_list.load()
+    timings['revocations'] = (perf_counter() - t0) * 1000
+    timings['total'] = timings['migrations'] + timings['default_services'] + timings['revocations']
+
+    return {
+        'success': success,
+        'message': message,
+        'services_created': services_created,
+        'timings': timings,
+        'started_at': started_at
+    }
 
-def get_weather():
-    # Previsão atual
-    url_current = f"http://api.openweathermap.org/data/2.5/weather?q=Arroio do Sal,BR&units=metric&appid={WEATHER_API_KEY}&lang=pt_br"
-    resp_current = requests.get(url_current).json()
+def init_db():
+    """Inicializa o banco de dados (uma vez por processo, ver run_startup)"""
+    if not DB_PATH:
+        print("ERRO CRÍTICO: DB_PATH não está definido nas configurações. A inicialização do banco de dados foi abortada.")
+        st.error("Erro crítico: A configuração do caminho do banco de dados (DB_PATH) não foi encontrada. O aplicativo não pode iniciar corretamente.")
+        return
+
+    status = run_startup()
+    if not status['success']:
+        st.warning(status['message'])
+        # Não memorizar falhas: tentar novamente no próximo rerun
+        run_startup.clear()
+        return
 
-    # Previsão para 8 dias
-    url_forecast = f"http://api.openweathermap.org/data/2.5/forecast?q=Arroio do Sal,BR&units=metric&appid={WEATHER_API_KEY}&lang=pt_br"
-    resp_forecast = requests.get(url_forecast).json()
+    # Sobe o pool de processos e retoma as tarefas pendentes de antes do reinício
+    get_job_queue()
+
+    if status['services_created']:
+        if 'show_success_services' not in st.session_state:
+            st.session_state['show_success_services'] = True
+        if st.session_state['show_success_services']:
+            st.success("Serviços padrão criados com sucesso!")
+            if st.button("Fechar mensagem", key="close_success_services"):
+                st.session_state['show_success_services'] = False
+                st.experimental_rerun()
+
+@st.cache_resource
+def get_weather_cache():
+    """Cache de previsão compartilhado por todas as sessões do processo."""
+    return WeatherCache(
+        api_key=WEATHER_API_KEY,
+        base_url=settings.WEATHER_API_URL,
+        ttl=settings.WEATHER_CACHE_TTL,
+        timeout=settings.WEATHER_TIMEOUT
+    )
+
+@st.cache_resource(show_spinner=False)
+def get_write_queue():
+    """Fila de escritas do processo (None se desabilitada nas configurações)."""
+    if not settings.WRITE_QUEUE_ENABLED:
+        return None
+    return WriteQueue(
+        Session,
+        max_batch=settings.WRITE_QUEUE_MAX_BATCH,
+        max_wait=settings.WRITE_QUEUE_MAX_WAIT / 1000
+    )
+
+@st.cache_resource(show_spinner=False)
+def get_upload_store():
+    """Armazenamento das fotos enviadas (endereçado pelo conteúdo)."""
+    return UploadStore(settings.UPLOAD_DIR, settings.UPLOAD_MAX_BYTES)
+
+@st.cache_resource(show_spinner=False)
+def get_job_queue():
+    """Pool de processos das tarefas em segundo plano (retoma as pendentes)."""
+    job_queue = JobQueue(
+        Session,
+        max_workers=settings.JOB_WORKERS,
+        max_attempts=settings.JOB_MAX_ATTEMPTS
+    )
+    job_queue.resume()
+    return job_queue
+
+def store_upload(uploaded_file):
+    """
+    Grava uma foto enviada no armazenamento e agenda a geração das variantes.
+
+    Retorna logo após gravar o original; até as variantes ficarem prontas,
+    `display_path` mostra o próprio original.
+    """
+    session = Session()
+    try:
+        path = get_upload_store().put(session, uploaded_file, uploaded_file.name)
+    finally:
+        session.close()
+    if not has_variants(path):
+        get_job_queue().enqueue("image_variants", original=path)
+    return path
+
+def run_db_write(fn):
+    """Executa uma escrita `fn(session)` pela fila, se habilitada, ou direto."""
+    return run_write(fn, Session, get_write_queue())
+
+def get_weather():
+    # Previsão atual e para os próximos dias (cacheadas, buscadas em paralelo)
+    resp_current, resp_forecast = get_weather_cache().get("Arroio do Sal,BR")
 
     # Dados atuais
     current_data = {
@@ -469,21 +394,52 @@ def get_weather():
 
     return current_data, forecast_data
 
+def mostrar_foto(image_path, key):
+    """Miniatura da foto da piscina; o original só é carregado se pedido."""
+    if not image_path or not isinstance(image_path, str) or image_path.strip() == "None":
+        return
+    st.image(display_path(image_path, "thumb"), width=200, caption="Foto da piscina")
+    if st.toggle("Ver original", key=key):
+        st.image(image_path)
+
+@st.cache_data(ttl=GALLERY_CACHE_TTL, show_spinner=False)
+def load_gallery_page(after, page_size):
+    """Página da galeria, compartilhada entre as sessões (limpa ao adicionar fotos)."""
+    session = Session()
+    try:
+        return list_gallery(session, after=after, page_size=page_size)
+    finally:
+        session.close()
+
+def mostrar_galeria():
+    """Galeria em páginas: as primeiras fotos e mais a cada "Carregar mais"."""
+    pages = st.session_state.setdefault('gallery_pages', 1)
+    cursor = None
+    for _ in range(pages):
+        page = load_gallery_page(cursor, GALLERY_PAGE_SIZE)
+        for item in page.items:
+            cols = st.columns(2)
+            cols[0].image(display_path(item.before_path, "webp"), caption=f"{item.caption} (Antes)")
+            cols[1].image(display_path(item.after_path, "webp"), caption=f"{item.caption} (Depois)")
+        cursor = page.next_cursor
+        if cursor is None:
+            return
+
+    def carregar_mais():
+        st.session_state['gallery_pages'] += 1
+    st.button("Carregar mais", key="gallery_more", on_click=carregar_mais)
+
 # ---------- PÁGINAS PÚBLICAS ----------
 def homepage():
     if os.path.exists("logo.png"):
         st.image("logo.png", width=200)
     st.title("Sempre Limpa Piscinas")
 
-    session = Session()
     if feature_flags.is_enabled('GALERIA_FOTOS'):
         st.header("Antes & Depois")
-        gallery = session.query(Gallery).all()
-        for item in gallery:
-            cols = st.columns(2)
-            cols[0].image(item.before_path, caption=f"{item.caption} (Antes)")
-            cols[1].image(item.after_path, caption=f"{item.caption} (Depois)")
+        mostrar_galeria()
 
+    session = Session()
     st.header("Serviços")
     services = session.query(Service).filter_by(active=1).all()
     for srv in services:
@@ -549,7 +505,11 @@ def mapa_tempo():
 
     # Previsão do tempo
     st.subheader("Previsão do Tempo")
-    current, forecast = get_weather()
+    try:
+        current, forecast = get_weather()
+    except WeatherUnavailable:
+        st.warning("Não foi possível obter a previsão do tempo no momento. Tente novamente mais tarde.")
+        return
 
     # Condições atuais
     st.markdown("### 🌡️ Condições Atuais")
@@ -627,6 +587,33 @@ def contato():
     else:
         sistema_antigo_agendamento()
 
+def selecionar_data_disponivel(session, key):
+    """
+    Seletor com as datas dos próximos BOOKING_WINDOW_DAYS dias que ainda têm vaga.
+
+    Dias lotados ficam de fora da lista, em vez de serem recusados após o envio.
+
+    Returns:
+        date or None: data escolhida (None se não houver nenhuma vaga)
+    """
+    dias_semana = ['Seg', 'Ter', 'Qua', 'Qui', 'Sex', 'Sáb', 'Dom']
+    dias = availability(session, datetime.now().date(), days=BOOKING_WINDOW_DAYS)
+    livres = {dia.date: dia for dia in dias if not dia.is_full}
+    lotados = len(dias) - len(livres)
+
+    def rotulo(d):
+        dia = livres[d]
+        vagas = "vagas livres" if dia.remaining is None else f"{dia.remaining} vaga(s)"
+        return f"{d.strftime('%d/%m/%Y')} ({dias_semana[d.weekday()]}) - {vagas}"
+
+    if not livres:
+        st.error(f"Não há datas disponíveis nos próximos {BOOKING_WINDOW_DAYS} dias.")
+        return None
+    data = st.selectbox("Data desejada", options=list(livres), format_func=rotulo, key=key)
+    if lotados:
+        st.caption(f"{lotados} dia(s) lotado(s) nos próximos {BOOKING_WINDOW_DAYS} dias não aparecem na lista.")
+    return data
+
 def novo_sistema_agendamento():
     """Implementação do novo sistema de agendamento"""
     st.info("Novo sistema de agendamento em beta!")
@@ -662,18 +649,12 @@ def novo_sistema_agendamento():
     col1, col2 = st.columns(2)
 
     with col1:
-        date = st.date_input("Data desejada", format="DD/MM/YYYY")
+        date = selecionar_data_disponivel(session, key="novo_ag_data")
 
     with col2:
         time = st.time_input("Horário desejado")
 
-    # Verificar disponibilidade
-    wd = date.weekday()
-    max_appt = session.query(Config).filter_by(weekday=wd).first().max_appointments
-    count = session.query(Appointment).filter_by(date=date.isoformat()).count()
-
-    if max_appt and count >= max_appt:
-        st.error("Dia cheio, escolha outra data.")
+    if date is None:
         return
 
     # Seleção de serviço
@@ -701,26 +682,32 @@ def novo_sistema_agendamento():
         submitted = st.form_submit_button("Confirmar Agendamento")
 
         if submitted:
-            img_path = None
-            if image:
-                os.makedirs("uploads", exist_ok=True)
-                img_path = os.path.join("uploads", image.name)
-                with open(img_path, "wb") as f:
-                    f.write(image.getbuffer())
-
-            new_appointment = Appointment(
-                name=name,
-                contact=contact,
+            # O dia pode ter lotado desde que a página foi carregada
+            if day_availability(session, date).is_full:
+                st.error("Dia cheio, escolha outra data.")
+                return
+
+            try:
+                img_path = store_upload(image) if image else None
+            except UploadTooLarge:
+                st.error(f"A foto passa do limite de {settings.UPLOAD_MAX_BYTES // (1024 * 1024)} MB.")
+                return
+
+            # Checagem de capacidade e INSERT atômicos (sem overbooking)
+            appointment_id = run_db_write(reservation(
                 address=address,
-                date=date.isoformat(),
-                time=time.strftime("%H:%M"),
+                date=date,
+                time=time.replace(second=0, microsecond=0),
                 service_id=service_id,
                 status='novo',
+                price=price,
                 image_path=img_path,
-                user_id=st.session_state['user_id']
-            )
-            session.add(new_appointment)
-            session.commit()
+                user_id=st.session_state['user_id'],
+                created_at=datetime.now().isoformat()
+            ))
+            if appointment_id is None:
+                st.error("Dia cheio, escolha outra data.")
+                return
 
             st.success("Agendamento realizado com sucesso!")
 
@@ -772,27 +759,21 @@ def sistema_antigo_agendamento():
         name = st.text_input("Nome", value=user.name)
         contact = st.text_input("Telefone", value=user.phone)
         address = st.text_input("Endereço da piscina", value=user.address)
-        date = st.date_input("Data desejada", format="DD/MM/YYYY")
+        date = selecionar_data_disponivel(session, key="orcamento_data")
         time = st.time_input("Horário desejado")
         image = st.file_uploader("Foto da piscina (opcional)", type=['png','jpg','jpeg'])
         submitted = st.form_submit_button("Enviar")
 
         if submitted:
-            wd = date.weekday()
-            max_appt = session.query(Config).filter_by(weekday=wd).first().max_appointments
-            count = session.query(Appointment).filter_by(date=date.isoformat()).count()
-
-            if max_appt and count >= max_appt:
+            if date is None or day_availability(session, date).is_full:
                 st.error("Dia cheio, escolha outra data.")
+            elif image and image.size > settings.UPLOAD_MAX_BYTES:
+                st.error(f"A foto passa do limite de {settings.UPLOAD_MAX_BYTES // (1024 * 1024)} MB.")
             else:
-                img_path = None
-                if image:
-                    os.makedirs("uploads", exist_ok=True)
-                    img_path = os.path.join("uploads", image.name)
-                    with open(img_path, "wb") as f:
-                        f.write(image.getbuffer())
-
-                new_appointment = Appointment(
+                img_path = store_upload(image) if image else None
+
+                # Checagem de capacidade e INSERT atômicos (sem overbooking)
+                appointment_id = run_db_write(reservation(
                     user_id=st.session_state['user_id'],
                     service_id=service_id,
                     date=date,
@@ -802,10 +783,11 @@ def sistema_antigo_agendamento():
                     price=price,
                     image_path=img_path,
                     created_at=datetime.now().isoformat()
-                )
-                session.add(new_appointment)
-                st.success("Recebemos seu pedido! Entraremos em contato em breve.")
-            session.commit()
+                ))
+                if appointment_id is None:
+                    st.error("Dia cheio, escolha outra data.")
+                else:
+                    st.success("Recebemos seu pedido! Entraremos em contato em breve.")
             session.close()
 
 def cadastro():
@@ -837,30 +819,38 @@ def cadastro():
                 st.error("A senha deve ter pelo menos 6 caracteres.")
                 return
             session = Session()
-            existing_user = session.query(User).filter(
-                (User.username == username) | (User.email == email)
-            ).first()
+            try:
+                existing_user = session.query(User).filter(
+                    (User.username == username) | (User.email == email)
+                ).first()
+            finally:
+                session.close()
             if existing_user:
                 st.error("Nome de usuário ou email já cadastrado.")
-                session.close()
                 return
             try:
                 password_hash = hash_pwd(password)
                 is_admin = int(admin_code == ADMIN_SECRET)
-                new_user = User(
-                    username=username,
-                    password=password_hash,
-                    name=name,
-                    email=email,
-                    phone=phone,
-                    address=address,
-                    is_admin=is_admin
-                )
-                session.add(new_user)
-                session.commit()
+
+                def add_user(session):
+                    new_user = User(
+                        username=username,
+                        password=password_hash,
+                        name=name,
+                        email=email,
+                        phone=phone,
+                        address=address,
+                        is_admin=is_admin
+                    )
+                    session.add(new_user)
+                    session.flush()
+                    return new_user.id
+                user_id = run_db_write(add_user)
                 if remember_me:
                     try:
-                        cookie_value = create_auth_token(new_user.id)
+                        cookie_value = create_auth_token(
+                            user_id, is_admin=is_admin, username=username
+                        )
                         cookie_manager.set(
                             "auth_token",
                             cookie_value,
@@ -870,10 +860,10 @@ def cadastro():
                         )
                         st.session_state['auth_token'] = cookie_value
                         st.session_state['logged_in'] = True
-                        st.session_state['user_id'] = new_user.id
-                        st.session_state['username'] = new_user.username
-                        st.session_state['is_admin'] = new_user.is_admin
-                        if new_user.is_admin:
+                        st.session_state['user_id'] = user_id
+                        st.session_state['username'] = username
+                        st.session_state['is_admin'] = is_admin
+                        if is_admin:
                             st.session_state['current_page'] = "Agendamentos"
                         else:
                             st.session_state['current_page'] = "Home"
@@ -886,8 +876,6 @@ def cadastro():
                 st.rerun()
             except Exception as e:
                 st.error(f"Erro ao cadastrar: {str(e)}")
-            finally:
-                session.close()
 
 # ---------- FUNÇÕES DE LOGIN ----------
 def login_usuario():
@@ -912,7 +900,7 @@ def login_usuario():
             if user and check_pwd(user.password, password):
                 if remember_me:
                     try:
-                        cookie_value = create_auth_token(user.id)
+                        cookie_value = create_auth_token(user.id, is_admin=user.is_admin, username=user.username)
                         cookie_manager.set(
                             "auth_token",
                             cookie_value,
@@ -963,7 +951,7 @@ def login_admin():
             if admin and check_pwd(admin.password, password):
                 if remember_me:
                     try:
-                        cookie_value = create_auth_token(admin.id)
+                        cookie_value = create_auth_token(admin.id, is_admin=True, username=admin.username)
                         cookie_manager.set(
                             "auth_token",
                             cookie_value,
@@ -1010,20 +998,44 @@ def logout():
 # ---------- AUTENTICAÇÃO & PÁGINAS ADMIN ----------
 def admin_agendamentos():
     st.subheader("Agendamentos")
-    session = Session()
-    agendamentos = (
-        session.query(Appointment, User, Service)
-        .join(User, Appointment.user_id == User.id)
-        .join(Service, Appointment.service_id == Service.id)
-        .order_by(
-            Appointment.date, Appointment.time
-        )
-        .all()
+
+    # Filtros aplicados no banco
+    with st.expander("Filtros", expanded=False):
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            date_from = st.date_input("De", value=None, key="filtro_ag_de")
+        with col2:
+            date_to = st.date_input("Até", value=None, key="filtro_ag_ate")
+        with col3:
+            status_filter = st.selectbox("Status", options=["Todos"] + STATUS_OPTIONS, key="filtro_ag_status")
+        with col4:
+            customer = st.text_input("Cliente (nome, email ou telefone)", key="filtro_ag_cliente")
+    filters = AppointmentFilters(
+        date_from=date_from,
+        date_to=date_to,
+        status=None if status_filter == "Todos" else status_filter,
+        customer=customer.strip() or None
     )
-    usuarios = session.query(User).all()
-    servicos = session.query(Service).filter_by(active=1).all()
+
+    # Paginação por chave: pilha com o cursor de início de cada página visitada
+    if st.session_state.get('admin_ag_filters') != filters:
+        st.session_state['admin_ag_filters'] = filters
+        st.session_state['admin_ag_cursors'] = [None]
+    cursors = st.session_state['admin_ag_cursors']
+
+    session = Session()
+    counts = count_by_status(session, filters)
+    page = list_appointments(session, filters, after=cursors[-1], page_size=ADMIN_PAGE_SIZE)
+    agendamentos = page.rows
     session.close()
 
+    # Totais por status
+    if counts:
+        cols = st.columns(len(counts) + 1)
+        cols[0].metric("Total", sum(counts.values()))
+        for col, (status_name, total) in zip(cols[1:], sorted(counts.items())):
+            col.metric(status_name.capitalize(), total)
+
     # Botão para novo agendamento
     if st.button("Novo Agendamento", key="novo_agendamento_admin"):
         st.session_state['edit_agendamento_id'] = None
@@ -1035,11 +1047,13 @@ def admin_agendamentos():
         agendamento = None
         if st.session_state.get('edit_agendamento_id'):
             agendamento = session.query(Appointment).filter_by(id=st.session_state['edit_agendamento_id']).first()
+        usuarios = session.query(User).order_by(User.name).all()
+        servicos = session.query(Service).filter_by(active=1).all()
         st.markdown("### Formulário de Agendamento")
         with st.form("form_agendamento_admin"):
             user_options = {f"{u.name} ({u.email})": u.id for u in usuarios}
             service_options = {s.name: s.id for s in servicos}
-            status_options = ["novo", "pendente", "confirmado", "feito", "não feito", "rejeitado"]
+            status_options = STATUS_OPTIONS
             user_id = st.selectbox("Cliente", options=list(user_options.keys()), index=list(user_options.values()).index(agendamento.user_id) if agendamento else 0)
             service_id = st.selectbox("Serviço", options=list(service_options.keys()), index=list(service_options.values()).index(agendamento.service_id) if agendamento else 0)
             date = st.date_input("Data", value=agendamento.date if agendamento and agendamento.date else datetime.now().date())
@@ -1051,28 +1065,24 @@ def admin_agendamentos():
             notes = st.text_area("Comentários", value=agendamento.notes if agendamento else "")
             submitted = st.form_submit_button("Salvar")
             if submitted:
-                if agendamento:
-                    agendamento.user_id = user_options[user_id]
-                    agendamento.service_id = service_options[service_id]
-                    agendamento.date = date
-                    agendamento.time = time
-                    agendamento.status = status
-                    agendamento.address = address
-                    agendamento.notes = notes
-                else:
-                    novo = Appointment(
-                        user_id=user_options[user_id],
-                        service_id=service_options[service_id],
-                        date=date,
-                        time=time,
-                        status=status,
-                        address=address,
-                        notes=notes,
-                        created_at=datetime.now().isoformat()
-                    )
-                    session.add(novo)
-                session.commit()
+                fields = dict(
+                    user_id=user_options[user_id],
+                    service_id=service_options[service_id],
+                    date=date,
+                    time=time,
+                    status=status,
+                    address=address,
+                    notes=notes
+                )
+                agendamento_id = agendamento.id if agendamento else None
+
+                def save_appointment(session):
+                    if agendamento_id:
+                        session.query(Appointment).filter_by(id=agendamento_id).update(fields)
+                    else:
+                        session.add(Appointment(created_at=datetime.now().isoformat(), **fields))
                 session.close()
+                run_db_write(save_appointment)
                 st.success("Agendamento salvo com sucesso!")
                 st.session_state['show_agendamento_form'] = False
                 st.session_state['edit_agendamento_id'] = None
@@ -1208,43 +1218,29 @@ def admin_agendamentos():
             </div>
         """, unsafe_allow_html=True)
 
-        # Exibir imagem se existir
-        if appointment.image_path and isinstance(appointment.image_path, str) and appointment.image_path.strip() != "None":
-            st.image(appointment.image_path, width=200, caption="Foto da piscina")
-
         # Botões de ação
         col1, col2, col3, col4, col5 = st.columns([1, 1, 1, 2, 1])
         with col1:
             if appointment.status == 'novo':
                 if st.button("Confirmar", key=f"conf_{appointment.id}"):
-                    session = Session()
-                    appt = session.query(Appointment).filter_by(id=appointment.id).first()
-                    if appt:
-                        appt.status = 'confirmado'
-                        session.commit()
-                    session.close()
+                    run_db_write(status_change(appointment.id, 'confirmado'))
                     st.success("Agendamento confirmado!")
                     st.rerun()
         with col2:
             if appointment.status == 'novo':
                 if st.button("Rejeitar", key=f"rej_{appointment.id}"):
-                    session = Session()
-                    appt = session.query(Appointment).filter_by(id=appointment.id).first()
-                    if appt:
-                        appt.status = 'rejeitado'
-                        session.commit()
-                    session.close()
+                    run_db_write(status_change(appointment.id, 'rejeitado'))
                     st.warning("Agendamento rejeitado!")
                     st.rerun()
         with col3:
             if st.button("🗑️ Deletar", key=f"del_{appointment.id}"):
                 if st.session_state.get('confirm_delete') == appointment.id:
+                    run_db_write(removal(appointment.id))
                     session = Session()
-                    appt = session.query(Appointment).filter_by(id=appointment.id).first()
-                    if appt:
-                        session.delete(appt)
-                        session.commit()
-                    session.close()
+                    try:
+                        get_upload_store().sweep(session)
+                    finally:
+                        session.close()
                     st.error(f"Agendamento #{appointment.id} deletado com sucesso!")
                     st.session_state['confirm_delete'] = None
                     st.rerun()
@@ -1252,14 +1248,26 @@ def admin_agendamentos():
                     st.session_state['confirm_delete'] = appointment.id
                     st.warning(f"Clique novamente em '🗑️ Deletar' para confirmar a exclusão do agendamento #{appointment.id}")
         with col4:
-            if appointment.image_path and isinstance(appointment.image_path, str) and appointment.image_path.strip() != "None":
-                st.image(appointment.image_path, width=200, caption="Foto da piscina")
+            mostrar_foto(appointment.image_path, key=f"foto_admin_{appointment.id}")
         with col5:
             if st.button("Editar", key=f"edit_{appointment.id}"):
                 st.session_state['edit_agendamento_id'] = appointment.id
                 st.session_state['show_agendamento_form'] = True
                 st.rerun()
 
+    # Navegação entre páginas
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        if st.button("← Anterior", key="ag_pagina_anterior", disabled=len(cursors) == 1):
+            cursors.pop()
+            st.rerun()
+    with col_page:
+        st.caption(f"Página {len(cursors)}")
+    with col_next:
+        if st.button("Próxima →", key="ag_pagina_proxima", disabled=page.next_cursor is None):
+            cursors.append(page.next_cursor)
+            st.rerun()
+
 def admin_services():
     st.subheader("Gerenciamento de Serviços")
 
@@ -1343,15 +1351,16 @@ def admin_services():
                     if not name:
                         st.error("O nome do serviço é obrigatório!")
                     else:
-                        service.name = name
-                        service.description = description
-                        service.price = price
-                        service.active = int(active)
-
-                        if selected_service == "Novo Serviço":
-                            session.add(service)
-
-                        session.commit()
+                        service_id = service.id
+
+                        def save_service(session):
+                            target = session.get(Service, service_id) if service_id else Service()
+                            target.name = name
+                            target.description = description
+                            target.price = price
+                            target.active = int(active)
+                            session.add(target)
+                        run_db_write(save_service)
                         st.success("Serviço salvo com sucesso!")
                         st.rerun()
 
@@ -1361,8 +1370,8 @@ def admin_services():
 
             with col3:
                 if selected_service != "Novo Serviço" and st.form_submit_button("Excluir"):
-                    session.delete(service)
-                    session.commit()
+                    service_id = service.id
+                    run_db_write(lambda session: session.delete(session.get(Service, service_id)))
                     st.success("Serviço excluído com sucesso!")
                     st.rerun()
 
@@ -1374,16 +1383,12 @@ def admin_config():
     # Dias da semana em português
     dias_semana = ['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'Domingo']
 
-    # Criar ou atualizar configurações para cada dia
+    # Limites atuais de cada dia (5 se o dia ainda não tiver configuração)
     session = Session()
+    limites = {}
     for dia in range(7):
         config = session.query(Config).filter_by(weekday=dia).first()
 
-        # Se não existir configuração para este dia, criar uma nova
-        if not config:
-            config = Config(weekday=dia, max_appointments=5)
-            session.add(config)
-
         # Interface para edição
         col1, col2 = st.columns([1, 3])
         with col1:
@@ -1392,18 +1397,24 @@ def admin_config():
             novo_limite = st.number_input(
                 "Limite de agendamentos",
                 min_value=0,
-                value=config.max_appointments,
+                value=config.max_appointments if config else 5,
                 key=f"limite_{dia}"
             )
-            config.max_appointments = novo_limite
+            limites[dia] = novo_limite
+    session.close()
 
     # Botão para salvar todas as alterações
     if st.button("Salvar Configurações"):
-        session.commit()
+        def save_limits(session):
+            for weekday, limite in limites.items():
+                config = session.query(Config).filter_by(weekday=weekday).first()
+                if not config:
+                    config = Config(weekday=weekday)
+                    session.add(config)
+                config.max_appointments = limite
+        run_db_write(save_limits)
         st.success("Limites atualizados com sucesso!")
 
-    session.close()
-
 def admin_gallery():
     st.subheader("Galeria Antes & Depois")
     with st.expander("Adicionar Par de Fotos"):
@@ -1412,22 +1423,23 @@ def admin_gallery():
         cap = st.text_input("Legenda")
         if st.button("Adicionar"):
             if before and after and cap:
-                os.makedirs("gallery", exist_ok=True)
-                before_path = os.path.join("gallery", before.name)
-                after_path = os.path.join("gallery", after.name)
-                with open(before_path, "wb") as f:
-                    f.write(before.getbuffer())
-                with open(after_path, "wb") as f:
-                    f.write(after.getbuffer())
-                session = Session()
-                new_gallery = Gallery(
-                    before_path=before_path,
-                    after_path=after_path,
-                    caption=cap
-                )
-                session.add(new_gallery)
-                session.commit()
-                session.close()
+                try:
+                    before_path = store_upload(before)
+                    after_path = store_upload(after)
+                except UploadTooLarge:
+                    st.error(f"As fotos devem ter no máximo {settings.UPLOAD_MAX_BYTES // (1024 * 1024)} MB.")
+                    return
+
+                def add_gallery_item(session):
+                    session.add(Gallery(
+                        before_path=before_path,
+                        after_path=after_path,
+                        caption=cap
+                    ))
+                    UploadStore.acquire(session, before_path)
+                    UploadStore.acquire(session, after_path)
+                run_db_write(add_gallery_item)
+                load_gallery_page.clear()
                 st.success("Fotos adicionadas à galeria!")
             else:
                 st.error("Preencha todos os campos!")
@@ -1452,8 +1464,8 @@ def admin_database():
         alembic_cfg,
         script,
         fn=lambda rev, _: script.get_revisions(rev)
-    ) as env:
-        env.configure(connection=engine.connect(), target_metadata=Base.metadata)
+    ) as env, engine.connect() as connection:
+        env.configure(connection=connection, target_metadata=Base.metadata)
         context = env.get_context()
         current_rev = context.get_current_revision()
 
@@ -1462,6 +1474,38 @@ def admin_database():
     st.info(f"Revisão atual: {current_rev}")
     st.info(f"Revisão mais recente disponível: {head_rev}")
 
+    # Inicialização do processo (migrações + serviços padrão)
+    startup = run_startup()
+    timings = startup['timings']
+    st.caption(
+        f"Inicialização em {startup['started_at'].strftime('%d/%m/%Y %H:%M:%S')}: "
+        f"migrações {timings['migrations']:.0f} ms, "
+        f"serviços padrão {timings['default_services']:.0f} ms, "
+        f"total {timings['total']:.0f} ms"
+    )
+    if st.button("Reexecutar inicialização"):
+        run_startup.clear()
+        st.rerun()
+
+    # Métricas da fila de escritas
+    write_queue = get_write_queue()
+    if write_queue is not None:
+        metrics = write_queue.metrics()
+        st.caption(
+            f"Fila de escritas: {metrics['queue_depth']} pendente(s), "
+            f"{metrics['operations']} escrita(s) em {metrics['commits']} commit(s) "
+            f"(média {metrics['avg_batch']:.1f} por commit), "
+            f"commit médio {metrics['commit_ms_avg']:.1f} ms, máximo {metrics['commit_ms_max']:.1f} ms, "
+            f"{metrics['failures']} falha(s)"
+        )
+
+    # Tarefas em segundo plano (variantes de imagens)
+    job_counts = get_job_queue().counts()
+    st.caption(
+        "Tarefas em segundo plano: " +
+        ", ".join(f"{job_counts.get(status, 0)} {status}" for status in ("pending", "running", "done", "failed"))
+    )
+
     if current_rev != head_rev:
         st.warning("O banco de dados não está na versão mais recente.")
         if st.button("Atualizar para a versão mais recente"):
@@ -1473,6 +1517,7 @@ def admin_database():
                 try:
                     # Executar migrações
                     command.upgrade(alembic_cfg, "head")
+                    run_startup.clear()
                     st.success("Banco de dados atualizado com sucesso!")
                     st.rerun()
                 except Exception as e:
@@ -1502,7 +1547,9 @@ def admin_database():
 
     with col1:
         if st.button("Criar Backup Manual"):
-            backup_file = backup_db()
+            bar = st.progress(0.0, text="Copiando o banco de dados...")
+            backup_file = backup_db(progress=lambda done, total: bar.progress(done / total if total else 1.0))
+            bar.empty()
             if backup_file:
                 st.success(f"Backup criado com sucesso: {os.path.basename(backup_file)}")
 
@@ -1515,23 +1562,28 @@ def admin_database():
             st.subheader("Backups Disponíveis")
             selected_backup = st.selectbox("Selecione um backup para restaurar:", backups)
 
+            # A confirmação fica na sessão: um botão dentro de outro nunca chega a ser clicado
             if st.button("Restaurar Backup Selecionado"):
-                if "confirm_restore" not in st.session_state:
-                    st.session_state["confirm_restore"] = False
-
-                if not st.session_state["confirm_restore"]:
-                    st.warning("⚠️ ATENÇÃO: A restauração substituirá todos os dados atuais. Esta ação não pode ser desfeita.")
-                    if st.button("Confirmar Restauração"):
-                        st.session_state["confirm_restore"] = True
-                        backup_path = os.path.join(backup_dir, selected_backup)
-
-                        # Fechar todas as conexões
-                        if engine:
-                            engine.dispose()
-
-                        # Restaurar o backup
-                        shutil.copy2(backup_path, DB_PATH)
-                        st.success("Backup restaurado com sucesso! O aplicativo será reiniciado.")
+                st.session_state["confirm_restore"] = selected_backup
+
+            if st.session_state.get("confirm_restore") == selected_backup:
+                st.warning("⚠️ ATENÇÃO: A restauração substituirá todos os dados atuais. "
+                           "O banco atual fica guardado ao lado dele com a extensão .previous.")
+                if st.button("Confirmar Restauração"):
+                    del st.session_state["confirm_restore"]
+                    backup_path = os.path.join(backup_dir, selected_backup)
+
+                    try:
+                        # Preparado e conferido ao lado do banco atual, depois trocado de uma vez
+                        # com o pool de conexões pausado (ver db_restore)
+                        restore_database(backup_path, DB_PATH, gate=pool_gate)
+                    except Exception as e:
+                        st.error(f"Erro ao restaurar backup: {str(e)}")
+                    else:
+                        # Esquema e dados podem ter mudado: refazer a inicialização e os caches
+                        run_startup.clear()
+                        st.cache_data.clear()
+                        st.success("Backup restaurado com sucesso!")
                         st.rerun()
 
     # Operações avançadas do Alembic
@@ -1564,6 +1616,7 @@ def admin_database():
                     try:
                         # Executar downgrade
                         command.downgrade(alembic_cfg, target_rev)
+                        run_startup.clear()
                         st.success(f"Banco de dados revertido para a revisão {target_rev}!")
                         st.rerun()
                     except Exception as e:
@@ -1586,16 +1639,16 @@ def detectar_dispositivo():
 def meus_agendamentos():
     st.title("Meus Agendamentos")
 
-    # Obter agendamentos do usuário
+    # Paginação por chave: pilha com o cursor de início de cada página visitada
+    cursors = st.session_state.setdefault(f"meus_ag_cursors_{st.session_state['user_id']}", [None])
+
+    # Obter agendamentos do usuário (serviço e usuário na mesma consulta)
     session = Session()
-    agendamentos = (
-        session.query(Appointment, Service)
-        .join(Service, Appointment.service_id == Service.id)
-        .filter(Appointment.user_id == st.session_state['user_id'])
-        .order_by(Appointment.date.desc(), Appointment.time.desc())
-        .all()
+    page = list_user_appointments(
+        session, st.session_state['user_id'], before=cursors[-1], page_size=CUSTOMER_PAGE_SIZE
     )
     session.close()
+    agendamentos = page.rows
 
     if not agendamentos:
         st.info("Você ainda não tem agendamentos.")
@@ -1669,11 +1722,8 @@ def meus_agendamentos():
         </style>
     """, unsafe_allow_html=True)
 
-    for _, (appointment, service) in enumerate(agendamentos):
-        # Obter dados do usuário relacionado ao agendamento
-        session = Session()
-        user = session.query(User).filter_by(id=appointment.user_id).first()
-        session.close()
+    for appointment in agendamentos:
+        service, user = appointment.service, appointment.user
 
         # Formatar data e hora para padrão brasileiro
         try:
@@ -1722,8 +1772,21 @@ def meus_agendamentos():
         """, unsafe_allow_html=True)
 
         # Exibir imagem se existir
-        if appointment.image_path and isinstance(appointment.image_path, str) and appointment.image_path.strip() != "None":
-            st.image(appointment.image_path, width=200, caption="Foto da piscina")
+        mostrar_foto(appointment.image_path, key=f"foto_{appointment.id}")
+
+    # Navegação entre páginas (histórico longo)
+    if page.next_cursor is not None or len(cursors) > 1:
+        col_prev, col_page, col_next = st.columns([1, 2, 1])
+        with col_prev:
+            if st.button("← Mais recentes", key="meus_ag_anterior", disabled=len(cursors) == 1):
+                cursors.pop()
+                st.rerun()
+        with col_page:
+            st.caption(f"Página {len(cursors)}")
+        with col_next:
+            if st.button("Mais antigos →", key="meus_ag_proxima", disabled=page.next_cursor is None):
+                cursors.append(page.next_cursor)
+                st.rerun()
 
 # Função para checar autenticação por cookie
 def check_authentication():
@@ -1761,7 +1824,7 @@ def admin_usuarios():
                 st.error("Nome de usuário ou email já cadastrado.")
             else:
                 password_hash = hash_pwd(new_password)
-                novo = User(
+                run_db_write(lambda session: session.add(User(
                     username=new_username,
                     password=password_hash,
                     name=new_name,
@@ -1769,9 +1832,7 @@ def admin_usuarios():
                     phone=new_phone,
                     address=new_address,
                     is_admin=new_is_admin
-                )
-                session.add(novo)
-                session.commit()
+                )))
                 st.success("Usuário criado com sucesso!")
                 st.experimental_rerun()
 
@@ -1800,23 +1861,27 @@ def admin_usuarios():
 
     st.markdown(f"**Usuário:** {user.username} | **Admin:** {'Sim' if user.is_admin else 'Não'}")
 
+    def set_admin(is_admin):
+        return lambda session: session.query(User).filter_by(id=user.id).update({"is_admin": is_admin})
+
     col1, col2, col3 = st.columns(3)
     with col1:
         if st.button("Promover a Admin", disabled=user.is_admin):
-            user.is_admin = True
-            session.commit()
+            run_db_write(set_admin(True))
+            revoke_user_tokens(user.id)
             st.success("Usuário promovido a administrador!")
             st.rerun()
     with col2:
         if st.button("Remover Admin", disabled=not user.is_admin):
-            user.is_admin = False
-            session.commit()
+            run_db_write(set_admin(False))
+            revoke_user_tokens(user.id)
             st.success("Permissão de administrador removida!")
             st.rerun()
     with col3:
         if st.button("Excluir Usuário"):
-            session.delete(user)
-            session.commit()
+            revoke_user_tokens(user.id)
+            user_id = user.id
+            run_db_write(lambda session: session.delete(session.get(User, user_id)))
             st.success("Usuário excluído!")
             st.rerun()
 
@@ -1844,21 +1909,17 @@ def main():
     # Verificar token de autenticação
     if 'auth_token' in st.session_state:
         try:
-            user_id = validate_auth_token(st.session_state['auth_token'])
-            if user_id:
-                session = Session()
-                user = session.query(User).filter_by(id=user_id).first()
-                session.close()
-
-                if user:
-                    st.session_state['logged_in'] = True
-                    st.session_state['user_id'] = user.id
-                    st.session_state['username'] = user.username
-                    st.session_state['is_admin'] = user.is_admin
-                    if user.is_admin:
-                        st.session_state['current_page'] = "Agendamentos"
-                    else:
-                        st.session_state['current_page'] = "Home"
+            # Dados do usuário vêm do cache de tokens (sem consulta ao banco)
+            user = authenticate(st.session_state['auth_token'])
+            if user:
+                st.session_state['logged_in'] = True
+                st.session_state['user_id'] = user.user_id
+                st.session_state['username'] = user.username
+                st.session_state['is_admin'] = user.is_admin
+                if user.is_admin:
+                    st.session_state['current_page'] = "Agendamentos"
+                else:
+                    st.session_state['current_page'] = "Home"
         except Exception as e:
             st.error(f"Erro ao validar token: {str(e)}")
             logout()
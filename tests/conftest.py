@@ -1,5 +1,24 @@
 import os
 import sys
 
+import pytest
+
 # Adicionar o diretório raiz ao PYTHONPATH
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
\ No newline at end of file
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT_DIR)
+
+
+@pytest.fixture
+def migrated_db(tmp_path, monkeypatch):
+    """Banco SQLite temporário com todas as migrações Alembic aplicadas"""
+    import alembic.config
+    from alembic import command
+    from config import settings
+
+    db_path = str(tmp_path / "migrated.db")
+    monkeypatch.setattr(settings, "DB_PATH", db_path)
+
+    alembic_cfg = alembic.config.Config(os.path.join(ROOT_DIR, "alembic.ini"))
+    alembic_cfg.set_main_option("script_location", os.path.join(ROOT_DIR, "alembic"))
+    command.upgrade(alembic_cfg, "head")
+    return db_path
@@ -0,0 +1,105 @@
+from datetime import date, time, timedelta
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from appointments import AppointmentFilters, count_by_status, list_appointments
+from database import create_db_engine, sqlite_url
+from models import Appointment, Service, User
+
+STATUSES = ["novo", "confirmado", "rejeitado"]
+
+
+@pytest.fixture
+def db(migrated_db):
+    """Banco migrado com 2 clientes e 90 agendamentos (3 por dia, mesmo horário em alguns)"""
+    engine = create_db_engine(sqlite_url(migrated_db))
+    Session = sessionmaker(bind=engine)
+    session = Session()
+    ana = User(username="ana", password="x", name="Ana Souza", email="ana@example.com", phone="1", address="-")
+    bia = User(username="bia", password="x", name="Beatriz", email="bia@example.com", phone="2", address="-")
+    service = Service(name="Limpeza", price=100, active=1)
+    session.add_all([ana, bia, service])
+    session.flush()
+    for i in range(90):
+        session.add(Appointment(
+            user_id=ana.id if i % 2 else bia.id,
+            service_id=service.id,
+            date=date(2024, 1, 1) + timedelta(days=i // 3),
+            time=time(9 + i % 2, 0),
+            status=STATUSES[i % 3],
+            price=100,
+        ))
+    session.commit()
+    yield engine, session
+    session.close()
+    engine.dispose()
+
+
+def all_pages(session, filters, page_size):
+    rows, cursor, pages = [], None, 0
+    while True:
+        page = list_appointments(session, filters, after=cursor, page_size=page_size)
+        rows.extend(page.rows)
+        pages += 1
+        if page.next_cursor is None:
+            return rows, pages
+        cursor = page.next_cursor
+
+
+def test_keyset_pages_cover_everything_in_order(db):
+    _, session = db
+    rows, pages = all_pages(session, AppointmentFilters(), page_size=7)
+
+    ids = [appointment.id for appointment, _, _ in rows]
+    keys = [(a.date, a.time, a.id) for a, _, _ in rows]
+    assert len(ids) == len(set(ids)) == 90
+    assert keys == sorted(keys)
+    assert pages == 13
+
+
+def test_filters_are_applied_in_sql(db):
+    _, session = db
+    filters = AppointmentFilters(
+        date_from=date(2024, 1, 5), date_to=date(2024, 1, 10), status="novo", customer="souza"
+    )
+    rows, _ = all_pages(session, filters, page_size=4)
+
+    assert rows
+    for appointment, user, _ in rows:
+        assert date(2024, 1, 5) <= appointment.date <= date(2024, 1, 10)
+        assert appointment.status == "novo"
+        assert user.username == "ana"
+
+
+def test_count_by_status_ignores_status_filter(db):
+    _, session = db
+    counts = count_by_status(session, AppointmentFilters(status="novo"))
+    assert counts == {"novo": 30, "confirmado": 30, "rejeitado": 30}
+
+    counts = count_by_status(session, AppointmentFilters(date_from=date(2024, 1, 30)))
+    assert sum(counts.values()) == 3
+
+
+@pytest.mark.parametrize("filters", [
+    AppointmentFilters(),
+    AppointmentFilters(status="confirmado"),
+], ids=["sem filtro", "status"])
+def test_page_query_uses_index(db, filters):
+    """A página segue um índice em ordem, sem ordenar a tabela inteira"""
+    engine, session = db
+    plans = []
+
+    def explain(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            plans.append([row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)])
+
+    first = list_appointments(session, filters, page_size=5)
+    event.listen(engine, "before_cursor_execute", explain)
+    list_appointments(session, filters, after=first.next_cursor, page_size=5)
+    event.remove(engine, "before_cursor_execute", explain)
+
+    plan_text = " | ".join(plans[0])
+    assert "USE TEMP B-TREE" not in plan_text, plan_text
+    assert "ix_appointments_" in plan_text, plan_text
@@ -0,0 +1,184 @@
+import time
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+import auth
+from auth import AuthEntry, BloomFilter, RevocationList, TokenCache
+from database import create_db_engine, sqlite_url
+from models import User, AuthToken
+from utils import hash_pwd
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def auth_db(migrated_db, monkeypatch):
+    """Módulo auth apontando para um banco migrado, com cache limpo"""
+    engine = create_db_engine(sqlite_url(migrated_db))
+    Session = sessionmaker(bind=engine)
+    monkeypatch.setattr(auth, "Session", Session)
+    monkeypatch.setattr(auth, "token_cache", TokenCache())
+    monkeypatch.setattr(auth, "revocation_list", RevocationList(capacity=100))
+
+    session = Session()
+    user = User(username="cliente", password=hash_pwd("secret"), name="Cliente",
+                email="c@example.com", phone="51999999999", address="Rua A")
+    session.add(user)
+    session.commit()
+    user_id = user.id
+    session.close()
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    yield user_id, statements
+    engine.dispose()
+
+
+def test_authenticate_uses_cache(auth_db):
+    """Depois da primeira validação, os reruns não tocam o banco"""
+    user_id, statements = auth_db
+    cookie = auth.create_auth_token(user_id)
+
+    entry = auth.authenticate(cookie)
+    assert entry.user_id == user_id
+    assert entry.username == "cliente"
+    assert entry.is_admin is False
+
+    statements.clear()
+    for _ in range(5):
+        assert auth.validate_auth_token(cookie) == user_id
+    assert statements == []
+
+
+def test_logout_invalidates_cache(auth_db):
+    """Logout remove o token do cache e do banco"""
+    user_id, _ = auth_db
+    cookie = auth.create_auth_token(user_id)
+    assert auth.authenticate(cookie) is not None
+
+    assert auth.logout_user(cookie)
+    assert auth.authenticate(cookie) is None
+
+
+def test_login_is_a_single_insert(auth_db):
+    """Criar token não varre a tabela de tokens expirados"""
+    user_id, statements = auth_db
+    statements.clear()
+    auth.create_auth_token(user_id)
+
+    writes = [s for s in statements if not s.lstrip().upper().startswith("SELECT")]
+    assert len(writes) == 1
+    assert writes[0].lstrip().upper().startswith("INSERT INTO AUTH_TOKENS")
+
+
+def test_cleanup_expired_tokens_in_batches(auth_db):
+    """A limpeza apaga em lotes e preserva tokens válidos"""
+    user_id, statements = auth_db
+    session = auth.Session()
+    now = int(time.time())
+    for i in range(25):
+        session.add(AuthToken(user_id=user_id, token=f"old{i}", created_at="-", expires_at=now - 60))
+    session.add(AuthToken(user_id=user_id, token="valid", created_at="-", expires_at=now + 3600))
+    session.commit()
+
+    statements.clear()
+    assert auth.cleanup_expired_tokens(batch_size=10) == 25
+    deletes = [s for s in statements if s.lstrip().upper().startswith("DELETE FROM AUTH_TOKENS")]
+    assert len(deletes) == 3
+
+    assert [t.token for t in session.query(AuthToken).all()] == ["valid"]
+    session.close()
+
+
+def test_signed_cookie_validated_without_sql(auth_db):
+    """Cookie assinado com expiração é validado só com CPU"""
+    user_id, statements = auth_db
+    cookie = auth.create_auth_token(user_id, is_admin=False, username="cliente")
+    auth.revocation_list.load()
+
+    statements.clear()
+    entry = auth.authenticate(cookie)
+    assert entry.user_id == user_id
+    assert entry.username == "cliente"
+    assert statements == []
+
+
+def test_expired_signed_cookie_rejected(auth_db):
+    user_id, _ = auth_db
+    cookie = auth.create_secure_cookie(user_id, "tok", exp=int(time.time()) - 1,
+                                       is_admin=False, username="cliente")
+    assert auth.authenticate(cookie) is None
+
+
+def test_revocations_survive_restart(auth_db):
+    """Revogações são persistidas e recarregadas por um processo novo"""
+    user_id, _ = auth_db
+    revoked = auth.create_auth_token(user_id)
+    kept = auth.create_auth_token(user_id)
+    assert auth.logout_user(revoked)
+
+    fresh = RevocationList(capacity=100)
+    assert fresh.load() == 1
+    auth.revocation_list = fresh
+    assert auth.authenticate(revoked) is None
+    assert auth.authenticate(kept) is not None
+
+
+def test_revoke_user_tokens(auth_db):
+    """Mudança de permissão invalida todos os cookies do usuário"""
+    user_id, _ = auth_db
+    cookies = [auth.create_auth_token(user_id) for _ in range(3)]
+    auth.revoke_user_tokens(user_id)
+    assert all(auth.authenticate(c) is None for c in cookies)
+
+
+def test_tampered_cookie_rejected(auth_db):
+    user_id, _ = auth_db
+    cookie = auth.create_auth_token(user_id)
+    payload, signature = cookie.split(".")
+    assert auth.authenticate(f"{payload}.{'0' * len(signature)}") is None
+
+
+def test_cache_ttl_capped_at_token_expiry():
+    """A entrada expira no que vier primeiro: TTL do cache ou expires_at do token"""
+    clock = FakeClock()
+    cache = TokenCache(ttl=300, clock=clock)
+    cache.put("a", AuthEntry(1, "a", False, clock.now + 10, "t1"))
+    cache.put("b", AuthEntry(2, "b", False, clock.now + 3600, "t2"))
+
+    clock.now += 11
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+    clock.now += 300
+    assert cache.get("b") is None
+
+
+def test_cache_lru_eviction():
+    cache = TokenCache(maxsize=2)
+    for key in ("a", "b"):
+        cache.put(key, AuthEntry(1, key, False, float("inf"), key))
+    cache.get("a")
+    cache.put("c", AuthEntry(1, "c", False, float("inf"), "c"))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert len(cache) == 2
+
+
+def test_bloom_filter_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    keys = [f"token-{i}" for i in range(1000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+
+    false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+    assert false_positives < 300
@@ -0,0 +1,128 @@
+import os
+import sqlite3
+
+import pytest
+
+from backup_store import BackupCorrupted, BackupStore
+
+
+def make_db(path, rows=3000):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, data TEXT)")
+    conn.executemany("INSERT INTO t (data) VALUES (?)", [(f"linha {i} " * 20,) for i in range(rows)])
+    conn.commit()
+    conn.close()
+    return str(path)
+
+
+def touch_row(path, row_id):
+    conn = sqlite3.connect(path)
+    conn.execute("UPDATE t SET data = 'alterada' WHERE id = ?", (row_id,))
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def store(tmp_path):
+    return BackupStore(str(tmp_path / "backups"), chunk_size=64 * 1024)
+
+
+def test_restore_is_byte_identical(store, tmp_path):
+    source = make_db(tmp_path / "app.db")
+    copy = tmp_path / "copia.db"
+    sqlite3.connect(source).backup(sqlite3.connect(copy))
+
+    snapshot = store.snapshot_file(str(copy))
+    restored = store.restore(snapshot.id, str(tmp_path / "restaurado.db"))
+
+    assert open(restored, "rb").read() == copy.read_bytes()
+    assert snapshot.stored_bytes < snapshot.size / 2  # texto repetido comprime bem
+
+
+def test_incremental_snapshot_stores_only_changed_chunks(store, tmp_path):
+    source = make_db(tmp_path / "app.db")
+    first = store.snapshot(source)
+    assert len(first.new_chunks) == first.chunks
+
+    touch_row(source, 10)
+    second = store.snapshot(source)
+    assert 1 <= len(second.new_chunks) <= 2
+    assert second.chunks == first.chunks
+
+    restored = store.restore(second.id, str(tmp_path / "restaurado.db"))
+    conn = sqlite3.connect(restored)
+    assert conn.execute("SELECT data FROM t WHERE id = 10").fetchone()[0] == "alterada"
+    assert conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+    conn.close()
+
+
+def test_prune_and_gc_remove_unreferenced_chunks(store, tmp_path):
+    source = make_db(tmp_path / "app.db")
+    ids = []
+    for row_id in (1, 1500, 2900):
+        touch_row(source, row_id)
+        ids.append(store.snapshot(source).id)
+
+    assert store.prune(keep=1) == ids[:2]
+    removed = store.gc(grace_seconds=0)
+
+    assert removed
+    assert store.snapshots() == ids[2:]
+    referenced = set(store.load_manifest(ids[2])["chunks"])
+    assert all(store.find_chunk(digest) for digest in referenced)
+    assert store.restore(ids[2], str(tmp_path / "restaurado.db"))
+
+
+def test_gc_grace_keeps_recent_chunks(store, tmp_path):
+    source = make_db(tmp_path / "app.db")
+    snapshot = store.snapshot(source)
+    os.remove(snapshot.manifest_path)
+
+    # Sem manifesto, mas recém-gravados (podem ser de um snapshot em andamento)
+    assert store.gc() == []
+    assert len(store.gc(grace_seconds=0)) == len(snapshot.new_chunks)
+
+
+def test_corrupted_chunk_is_detected(store, tmp_path):
+    source = make_db(tmp_path / "app.db")
+    snapshot = store.snapshot(source)
+    digest = store.load_manifest(snapshot.id)["chunks"][0]
+    os.remove(store.find_chunk(digest))
+
+    with pytest.raises(BackupCorrupted):
+        store.restore(snapshot.id, str(tmp_path / "restaurado.db"))
+    assert not os.path.exists(tmp_path / "restaurado.db.part")
+
+
+def test_unchanged_database_does_not_create_snapshot(store, tmp_path):
+    source = make_db(tmp_path / "app.db")
+    first = store.snapshot(source)
+
+    # Sem escritas: decidido pelo tamanho/mtime, sem copiar o banco
+    second = store.snapshot(source)
+    # Arquivo tocado sem mudar o conteúdo: decidido pela lista de blocos
+    os.utime(source)
+    third = store.snapshot(source)
+
+    assert not first.unchanged
+    assert second.unchanged and third.unchanged
+    assert second.id == third.id == first.id
+    assert store.snapshots() == [first.id]
+    assert len(store.load_manifest(first.id)["unchanged_at"]) == 2
+
+    touch_row(source, 5)
+    fourth = store.snapshot(source)
+    assert not fourth.unchanged
+    assert store.snapshots() == [first.id, fourth.id]
+
+
+def test_snapshot_that_failed_verification_is_not_reused(store, tmp_path):
+    source = make_db(tmp_path / "app.db")
+    first = store.snapshot(source)
+    store.update_manifest(first.id, verification={"ok": False})
+
+    second = store.snapshot(source)
+
+    assert not second.unchanged
+    assert second.id != first.id
@@ -0,0 +1,91 @@
+import sqlite3
+
+import pytest
+
+from backup_store import BackupStore
+from backup_verify import table_stats, verify_snapshot
+
+
+def make_db(path):
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        PRAGMA journal_mode=WAL;
+        CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT);
+        CREATE TABLE appointments (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER REFERENCES users(id),
+            status TEXT
+        );
+    """)
+    conn.executemany("INSERT INTO users (name) VALUES (?)", [(f"Cliente {i}",) for i in range(200)])
+    conn.executemany("INSERT INTO appointments (user_id, status) VALUES (?, 'novo')",
+                     [(i % 200 + 1,) for i in range(2000)])
+    conn.commit()
+    conn.close()
+    return str(path)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return BackupStore(str(tmp_path / "backups"))
+
+
+def test_snapshot_records_table_stats(store, tmp_path):
+    source = make_db(tmp_path / "app.db")
+    snapshot = store.snapshot(source)
+
+    tables = store.load_manifest(snapshot.id)["tables"]
+    assert tables["users"]["rows"] == 200
+    assert tables["appointments"]["rows"] == 2000
+    assert tables == table_stats(source)
+
+
+def test_verification_ok_is_recorded_in_manifest(store, tmp_path):
+    source = make_db(tmp_path / "app.db")
+    snapshot = store.snapshot(source)
+
+    result = verify_snapshot(store, snapshot.id)
+
+    assert result["ok"]
+    assert result["integrity"] == ["ok"]
+    assert result["rows"] == 2200
+    assert store.load_manifest(snapshot.id)["verification"] == result
+    assert [f for f in (tmp_path / "backups").iterdir() if f.name.endswith(".verify.db")] == []
+
+
+def test_table_mismatch_fails_verification(store, tmp_path):
+    source = make_db(tmp_path / "app.db")
+    snapshot = store.snapshot(source)
+    tables = store.load_manifest(snapshot.id)["tables"]
+    tables["appointments"]["rows"] += 1
+    store.update_manifest(snapshot.id, tables=tables)
+
+    result = verify_snapshot(store, snapshot.id)
+
+    assert not result["ok"]
+    assert result["mismatches"] == ["appointments"]
+
+
+def test_foreign_key_violations_fail_verification(store, tmp_path):
+    source = make_db(tmp_path / "app.db")
+    conn = sqlite3.connect(source)
+    conn.execute("INSERT INTO appointments (user_id, status) VALUES (9999, 'novo')")
+    conn.commit()
+    conn.close()
+    snapshot = store.snapshot(source)
+
+    result = verify_snapshot(store, snapshot.id, full=True)
+
+    assert not result["ok"]
+    assert result["foreign_key_violations"] == 1
+    assert result["integrity_check"] == "integrity_check"
+
+
+def test_verified_copy_kept_as_standby(store, tmp_path):
+    source = make_db(tmp_path / "app.db")
+    snapshot = store.snapshot(source)
+    standby = str(tmp_path / "app.db.standby")
+
+    assert verify_snapshot(store, snapshot.id, keep=standby)["ok"]
+
+    assert table_stats(standby) == store.load_manifest(snapshot.id)["tables"]
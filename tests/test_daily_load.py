@@ -0,0 +1,91 @@
+from datetime import date, time, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from appointments import availability, day_availability
+from database import create_db_engine, sqlite_url
+from models import Appointment, Base, Config, DailyLoad, Service, User
+
+DAY = date(2024, 3, 4)  # segunda-feira
+
+
+@pytest.fixture
+def session(migrated_db):
+    engine = create_db_engine(sqlite_url(migrated_db))
+    session = sessionmaker(bind=engine)()
+    seed(session)
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def seed(session):
+    session.add(User(id=1, username="ana", password="x", name="Ana", email="a@a", phone="1", address="-"))
+    session.add(Service(id=1, name="Limpeza", price=100, active=1))
+    session.commit()
+
+
+def booked(session, day):
+    session.expire_all()
+    return session.query(DailyLoad.booked).filter_by(date=day).scalar() or 0
+
+
+def add(session, day, status="novo"):
+    appointment = Appointment(user_id=1, service_id=1, date=day, time=time(9, 0), status=status, price=100)
+    session.add(appointment)
+    session.commit()
+    return appointment
+
+
+def test_triggers_track_insert_status_date_and_delete(session):
+    first = add(session, DAY)
+    add(session, DAY)
+    add(session, DAY, status="rejeitado")
+    assert booked(session, DAY) == 2
+
+    # Rejeitar libera a vaga; voltar para "novo" ocupa de novo
+    first.status = "rejeitado"
+    session.commit()
+    assert booked(session, DAY) == 1
+    first.status = "confirmado"
+    session.commit()
+    assert booked(session, DAY) == 2
+
+    # Mudar a data move a vaga
+    first.date = DAY + timedelta(days=1)
+    session.commit()
+    assert (booked(session, DAY), booked(session, DAY + timedelta(days=1))) == (1, 1)
+
+    session.delete(first)
+    session.commit()
+    assert booked(session, DAY + timedelta(days=1)) == 0
+
+
+def test_create_all_installs_triggers(tmp_path):
+    """Bancos criados com create_all (testes, scripts) também mantêm a contagem"""
+    engine = create_engine(sqlite_url(tmp_path / "app.db"))
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    seed(session)
+    add(session, DAY)
+    assert booked(session, DAY) == 1
+    session.close()
+    engine.dispose()
+
+
+def test_availability_marks_full_days(session):
+    session.add(Config(weekday=DAY.weekday(), max_appointments=2))
+    session.commit()
+    add(session, DAY)
+    add(session, DAY)
+    add(session, DAY + timedelta(days=7))
+
+    days = availability(session, DAY, days=60)
+    assert len(days) == 60
+    assert days[0].is_full and days[0].remaining == 0
+    assert days[7].booked == 1 and not days[7].is_full
+    assert days[1].capacity is None and not days[1].is_full
+
+    assert day_availability(session, DAY).is_full
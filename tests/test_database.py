@@ -0,0 +1,21 @@
+from sqlalchemy import text
+from database import create_db_engine, sqlite_url
+
+
+def test_sqlite_pragmas_applied(tmp_path):
+    """Cada conexão do pool recebe os PRAGMAs configurados"""
+    engine = create_db_engine(sqlite_url(tmp_path / "app.db"))
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA foreign_keys")).scalar() == 1
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+    engine.dispose()
+
+
+def test_pragma_overrides(tmp_path):
+    """PRAGMAs podem ser sobrescritos por engine (ex.: Alembic)"""
+    engine = create_db_engine(sqlite_url(tmp_path / "app.db"), pragmas={"foreign_keys": "OFF"})
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA foreign_keys")).scalar() == 0
+    engine.dispose()
@@ -0,0 +1,97 @@
+import os
+import sqlite3
+import threading
+
+import pytest
+from sqlalchemy import text
+
+from database import PoolGate, create_db_engine, sqlite_url
+from db_restore import RestoreError, prepared_path, restore_database
+
+
+def make_db(path, value, mode="wal"):
+    conn = sqlite3.connect(path)
+    conn.execute(f"PRAGMA journal_mode={mode}")
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, value TEXT)")
+    conn.execute("INSERT INTO t (value) VALUES (?)", (value,))
+    conn.commit()
+    conn.close()
+    return str(path)
+
+
+def read_value(engine):
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT value FROM t")).scalar()
+
+
+def test_restore_swaps_file_and_keeps_previous(tmp_path):
+    live = make_db(tmp_path / "app.db", "atual")
+    backup = make_db(tmp_path / "backup.db", "backup")
+
+    result = restore_database(backup, live)
+
+    conn = sqlite3.connect(live)
+    assert conn.execute("SELECT value FROM t").fetchone()[0] == "backup"
+    conn.close()
+    assert sqlite3.connect(result.previous).execute("SELECT value FROM t").fetchone()[0] == "atual"
+    assert not os.path.exists(prepared_path(live))
+
+
+def test_restore_refused_while_database_is_open(tmp_path):
+    live = make_db(tmp_path / "app.db", "atual")
+    backup = make_db(tmp_path / "backup.db", "backup")
+    other = sqlite3.connect(live)
+    other.execute("SELECT value FROM t").fetchone()
+
+    with pytest.raises(RestoreError):
+        restore_database(backup, live, lock_timeout=0.1)
+
+    assert other.execute("SELECT value FROM t").fetchone()[0] == "atual"
+    other.close()
+    assert not os.path.exists(prepared_path(live))
+
+
+def test_invalid_backup_is_not_swapped_in(tmp_path):
+    live = make_db(tmp_path / "app.db", "atual")
+    backup = str(tmp_path / "backup.db")
+    conn = sqlite3.connect(backup)
+    conn.executescript("""
+        CREATE TABLE users (id INTEGER PRIMARY KEY);
+        CREATE TABLE t (id INTEGER PRIMARY KEY, user_id INTEGER REFERENCES users(id));
+        INSERT INTO t (user_id) VALUES (42);
+    """)
+    conn.close()
+
+    with pytest.raises(RestoreError):
+        restore_database(backup, live)
+    assert sqlite3.connect(live).execute("SELECT value FROM t").fetchone()[0] == "atual"
+
+
+def test_gate_quiesces_pool_and_reopens(tmp_path):
+    live = make_db(tmp_path / "app.db", "atual")
+    backup = make_db(tmp_path / "backup.db", "backup")
+    engine = create_db_engine(sqlite_url(live))
+    gate = PoolGate(engine)
+    assert read_value(engine) == "atual"  # conexão ociosa no pool
+
+    # Uma conexão emprestada durante o pedido de restauração: a troca espera por ela
+    borrowed = engine.connect()
+    threading.Timer(0.2, borrowed.close).start()
+    restore_database(backup, live, gate=gate, timeout=5)
+
+    assert read_value(engine) == "backup"
+    engine.dispose()
+
+
+def test_connections_to_replaced_file_are_discarded(tmp_path):
+    """Troca feita por outro processo: o pool não continua no arquivo antigo"""
+    live = make_db(tmp_path / "app.db", "atual", mode="delete")
+    backup = make_db(tmp_path / "backup.db", "backup", mode="delete")
+    engine = create_db_engine(sqlite_url(live), pragmas={"journal_mode": "DELETE"})
+    PoolGate(engine)
+    assert read_value(engine) == "atual"
+
+    restore_database(backup, live)
+
+    assert read_value(engine) == "backup"
+    engine.dispose()
@@ -0,0 +1,90 @@
+import pytest
+from PIL import Image
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+from streamlit.testing.v1 import AppTest
+
+from database import create_db_engine, sqlite_url
+from gallery import list_gallery
+from models import Gallery
+
+
+def render_gallery():
+    import streamlit_app
+
+    streamlit_app.mostrar_galeria()
+
+
+def count_images(node):
+    own = 1 if getattr(node, "type", None) == "image" else 0
+    return own + sum(count_images(child) for child in getattr(node, "children", {}).values())
+
+
+@pytest.fixture
+def gallery(migrated_db, tmp_path):
+    """Banco migrado com 15 pares de fotos"""
+    engine = create_db_engine(sqlite_url(migrated_db))
+    Session = sessionmaker(bind=engine)
+
+    photo = str(tmp_path / "foto.png")
+    Image.new("RGB", (8, 8)).save(photo)
+    session = Session()
+    session.add_all([Gallery(before_path=photo, after_path=photo, caption=f"Piscina {i}") for i in range(15)])
+    session.commit()
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    yield Session, statements
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def app_gallery(gallery, monkeypatch):
+    """A galeria do app (streamlit_app) lendo o banco de `gallery`"""
+    import streamlit_app
+    Session, statements = gallery
+    monkeypatch.setattr(streamlit_app, "Session", Session)
+    streamlit_app.load_gallery_page.clear()
+    yield streamlit_app, statements
+    streamlit_app.load_gallery_page.clear()
+
+
+def test_pages_cover_gallery_in_order(gallery):
+    Session, _ = gallery
+    session = Session()
+    captions, cursor = [], None
+    while True:
+        page = list_gallery(session, after=cursor, page_size=4)
+        captions.extend(item.caption for item in page.items)
+        if page.next_cursor is None:
+            break
+        cursor = page.next_cursor
+
+    session.close()
+    assert captions == [f"Piscina {i}" for i in range(15)]
+
+
+def test_load_more_and_cache(app_gallery):
+    streamlit_app, statements = app_gallery
+    page_size = streamlit_app.GALLERY_PAGE_SIZE
+
+    at = AppTest.from_function(render_gallery, default_timeout=30).run()
+    assert not at.exception
+    assert count_images(at._tree) == 2 * page_size
+    assert len(statements) == 1
+
+    at.button(key="gallery_more").click().run()
+    assert count_images(at._tree) == 4 * page_size
+
+    # Outra sessão usa as páginas do cache, sem consultar o banco
+    statements.clear()
+    at = AppTest.from_function(render_gallery, default_timeout=30).run()
+    assert count_images(at._tree) == 2 * page_size
+    assert statements == []
+
+    # Última página: sem botão "Carregar mais"
+    at.button(key="gallery_more").click().run()
+    at.button(key="gallery_more").click().run()
+    assert count_images(at._tree) == 2 * 15
+    assert len(at.button) == 0
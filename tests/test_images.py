@@ -0,0 +1,64 @@
+import os
+
+from PIL import Image
+
+from images import VARIANTS, backfill_variants, create_variants, display_path, variant_path
+
+
+def make_photo(path, size=(4000, 3000), orientation=None, mode="RGB"):
+    image = Image.new(mode, size, (200, 30, 30) if mode == "RGB" else (200, 30, 30, 128))
+    exif = Image.Exif()
+    if orientation:
+        exif[0x0112] = orientation
+    if mode == "RGB":
+        image.save(path, "JPEG", exif=exif)
+    else:
+        image.save(path, "PNG")
+    return str(path)
+
+
+def test_variants_sizes_and_formats(tmp_path):
+    original = make_photo(tmp_path / "piscina.jpg")
+    paths = create_variants(original)
+
+    for variant, (size, image_format, _, _) in VARIANTS.items():
+        with Image.open(paths[variant]) as image:
+            assert max(image.size) == size
+            assert image.format == image_format
+    assert os.path.getsize(paths["thumb"]) < os.path.getsize(original)
+
+
+def test_exif_orientation_applied(tmp_path):
+    """Foto de celular em pé (orientação 6) gera variantes em pé"""
+    original = make_photo(tmp_path / "celular.jpg", orientation=6)
+    with Image.open(create_variants(original)["thumb"]) as thumb:
+        assert thumb.size == (240, 320)
+
+
+def test_transparent_png(tmp_path):
+    original = make_photo(tmp_path / "logo.png", size=(800, 600), mode="RGBA")
+    with Image.open(create_variants(original)["thumb"]) as thumb:
+        assert thumb.mode == "RGB"
+
+
+def test_backfill_is_resumable(tmp_path):
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    originals = [make_photo(uploads / f"foto{i}.jpg", size=(600, 400)) for i in range(3)]
+    (uploads / "notas.txt").write_text("não é imagem")
+    (uploads / "quebrada.jpg").write_bytes(b"nao e jpeg")
+
+    assert backfill_variants([str(uploads)], limit=1)["created"] == 1
+    stats = backfill_variants([str(uploads)])
+    assert (stats["created"], stats["skipped"], stats["failed"]) == (2, 1, 1)
+    assert all(os.path.exists(variant_path(o, "webp")) for o in originals)
+    assert not list((uploads / "variants").glob("*.tmp"))
+
+    assert backfill_variants([str(uploads)])["created"] == 0
+
+
+def test_display_path_falls_back_to_original(tmp_path):
+    original = make_photo(tmp_path / "antiga.jpg", size=(600, 400))
+    assert display_path(original) == original
+    create_variants(original)
+    assert display_path(original) == variant_path(original, "thumb")
@@ -0,0 +1,61 @@
+import pytest
+from sqlalchemy import text
+from database import create_db_engine, sqlite_url
+
+# Consultas quentes do aplicativo e o índice que cada uma deve usar
+HOT_QUERIES = [
+    (
+        "limite diário",
+        "SELECT count(*) FROM appointments WHERE date = :date",
+        {"date": "2024-01-01"},
+        "ix_appointments_date_time",
+    ),
+    (
+        "meus agendamentos",
+        "SELECT appointments.id, services.name FROM appointments "
+        "JOIN services ON appointments.service_id = services.id "
+        "WHERE appointments.user_id = :user_id "
+        "ORDER BY appointments.date DESC, appointments.time DESC",
+        {"user_id": 1},
+        "ix_appointments_user_date_time",
+    ),
+    (
+        "validar token",
+        "SELECT * FROM auth_tokens WHERE user_id = :user_id AND token = :token",
+        {"user_id": 1, "token": "abc"},
+        "sqlite_autoindex_auth_tokens_1",
+    ),
+    (
+        "revogar tokens do usuário",
+        "SELECT token FROM auth_tokens WHERE user_id = :user_id",
+        {"user_id": 1},
+        "ix_auth_tokens_user_id",
+    ),
+    (
+        "limpar tokens expirados",
+        "DELETE FROM auth_tokens WHERE expires_at < :now",
+        {"now": 1704067200},
+        "ix_auth_tokens_expires_at",
+    ),
+    (
+        "serviços ativos",
+        "SELECT * FROM services WHERE active = 1",
+        {},
+        "ix_services_active",
+    ),
+]
+
+
+@pytest.mark.parametrize("name, sql, params, index", HOT_QUERIES, ids=[q[0] for q in HOT_QUERIES])
+def test_hot_queries_use_index(migrated_db, name, sql, params, index):
+    """Cada consulta quente usa um índice da migração (sem full scan nem ordenação temporária)"""
+    engine = create_db_engine(sqlite_url(migrated_db))
+    with engine.connect() as conn:
+        plan = [row[-1] for row in conn.execute(text("EXPLAIN QUERY PLAN " + sql), params)]
+    engine.dispose()
+
+    plan_text = " | ".join(plan)
+    indexes = (index,) if isinstance(index, str) else index
+    assert any(idx in step for step in plan for idx in indexes), plan_text
+    assert not any(step.startswith("SCAN") and "USING" not in step for step in plan), plan_text
+    assert "USE TEMP B-TREE" not in plan_text, plan_text
@@ -0,0 +1,86 @@
+import json
+import os
+import time
+
+import pytest
+from PIL import Image
+from sqlalchemy.orm import sessionmaker
+
+from database import create_db_engine, sqlite_url
+from images import variant_path
+from jobs import JobQueue
+from models import Job
+
+
+@pytest.fixture
+def Session(migrated_db):
+    engine = create_db_engine(sqlite_url(migrated_db))
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def job_queue(Session):
+    job_queue = JobQueue(Session, max_workers=1, max_attempts=2)
+    yield job_queue
+    job_queue.shutdown()
+
+
+def make_photo(path):
+    Image.new("RGB", (2000, 1500), (20, 120, 200)).save(path, "JPEG")
+    return str(path)
+
+
+def job_row(Session, job_id):
+    session = Session()
+    try:
+        return session.get(Job, job_id)
+    finally:
+        session.close()
+
+
+def test_enqueue_returns_before_variants_and_completes(Session, job_queue, tmp_path):
+    original = make_photo(tmp_path / "piscina.jpg")
+    job_id = job_queue.enqueue("image_variants", original=original)
+
+    assert job_queue.wait(timeout=60)
+    job = job_row(Session, job_id)
+    assert (job.status, job.attempts, job.error) == ("done", 1, None)
+    assert os.path.exists(variant_path(original, "thumb"))
+
+
+def test_failure_is_retried_then_recorded(Session, job_queue, tmp_path):
+    broken = tmp_path / "quebrada.jpg"
+    broken.write_bytes(b"nao e uma imagem")
+    job_id = job_queue.enqueue("image_variants", original=str(broken))
+
+    assert job_queue.wait(timeout=60)
+    job = job_row(Session, job_id)
+    assert job.status == "failed"
+    assert job.attempts == 2
+    assert "quebrada.jpg" in job.error
+
+
+def test_resume_picks_up_interrupted_jobs(Session, job_queue, tmp_path):
+    """Tarefas 'running' de um processo que morreu são executadas de novo"""
+    original = make_photo(tmp_path / "antiga.jpg")
+    now = int(time.time())
+    session = Session()
+    session.add_all([
+        Job(kind="image_variants", payload=json.dumps({"original": original}),
+            status="running", attempts=1, created_at=now, updated_at=now),
+        Job(kind="image_variants", payload=json.dumps({"original": original}),
+            status="done", attempts=1, created_at=now, updated_at=now),
+    ])
+    session.commit()
+    session.close()
+
+    assert job_queue.resume() == 1
+    assert job_queue.wait(timeout=60)
+    assert job_queue.counts() == {"done": 2}
+    assert os.path.exists(variant_path(original, "webp"))
+
+
+def test_unknown_kind_is_rejected(job_queue):
+    with pytest.raises(ValueError):
+        job_queue.enqueue("desconhecida")
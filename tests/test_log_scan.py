@@ -0,0 +1,167 @@
+import gzip
+import os
+from datetime import datetime, timedelta
+
+import log_scan
+from log_scan import archive_name, find_cutoff, line_time, prune_archives, rotate, rotated_files, scan_logs
+
+NOW = datetime.now().replace(microsecond=0)
+CUTOFF = NOW - timedelta(hours=24)
+
+
+def stamp(moment):
+    return moment.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def write(path, lines, mode="a"):
+    with open(path, mode) as f:
+        f.writelines(line + "\n" for line in lines)
+
+
+def scan(paths, cursors, cutoff=CUTOFF, workers=1):
+    return [match.line for match in scan_logs([str(p) for p in paths], cursors, cutoff, ["ERROR"], workers)]
+
+
+def test_first_read_starts_at_cutoff(tmp_path):
+    log = tmp_path / "app.log"
+    lines = []
+    for hours in range(48, 0, -1):
+        moment = NOW - timedelta(hours=hours, minutes=30)
+        lines.append(f"{stamp(moment)} - ERROR - falha {hours}")
+        lines.append("ERROR: Traceback (most recent call last):")  # linha sem timestamp
+    write(log, lines)
+
+    new = scan([log], {})
+
+    assert new[0] == f"{stamp(NOW - timedelta(hours=23, minutes=30))} - ERROR - falha 23"
+    assert len(new) == 2 * 23
+
+
+def test_only_new_complete_lines_are_read(tmp_path):
+    log = tmp_path / "app.log"
+    write(log, [f"{stamp(NOW)} - ERROR - um"])
+    cursors = {}
+    assert len(scan([log], cursors)) == 1
+
+    with open(log, "a") as f:
+        f.write(f"{stamp(NOW)} - INFO - ok\n{stamp(NOW)} - ERROR - dois\n{stamp(NOW)} - ERROR - tr")
+    assert scan([log], cursors) == [f"{stamp(NOW)} - ERROR - dois"]
+
+    with open(log, "a") as f:
+        f.write("es\n")
+    assert scan([log], cursors) == [f"{stamp(NOW)} - ERROR - tres"]
+    assert scan([log], cursors) == []
+
+
+def test_rotation_keeps_open_writers_on_the_live_log(tmp_path):
+    log = tmp_path / "app.log"
+    cursors = {}
+    with open(log, "a") as writer:  # o app mantém o log aberto em modo append
+        writer.write(f"{stamp(NOW)} - ERROR - antes\n")
+        writer.flush()
+        scan([log], cursors)
+
+        writer.write(f"{stamp(NOW)} - ERROR - antes da rotação\n")
+        writer.flush()
+        rotated = rotate(str(log), timedelta(0))
+        writer.write(f"{stamp(NOW)} - ERROR - depois da rotação\n")
+        writer.flush()
+
+    assert rotated.endswith(".gz") and log.read_text() == f"{stamp(NOW)} - ERROR - depois da rotação\n"
+    assert scan([log], cursors) == [f"{stamp(NOW)} - ERROR - antes da rotação",
+                                    f"{stamp(NOW)} - ERROR - depois da rotação"]
+    assert scan([log], cursors) == []
+
+
+def test_unreadable_file_does_not_hide_others(tmp_path):
+    app, monitor = tmp_path / "app.log", tmp_path / "monitor.log"
+    with open(archive_name(str(app), NOW - timedelta(hours=1)) + ".gz", "wb") as f:
+        f.write(b"corrompido")
+    write(app, [f"{stamp(NOW)} - ERROR - app"])
+    write(monitor, [f"{stamp(NOW)} - ERROR - monitor"])
+
+    assert scan([app, monitor], {}) == [f"{stamp(NOW)} - ERROR - app", f"{stamp(NOW)} - ERROR - monitor"]
+
+
+def test_truncated_file_is_read_from_start(tmp_path):
+    log = tmp_path / "app.log"
+    write(log, [f"{stamp(NOW)} - INFO - linha longa " + "x" * 200])
+    cursors = {}
+    scan([log], cursors)
+
+    write(log, [f"{stamp(NOW)} - ERROR - novo"], mode="w")
+
+    assert scan([log], cursors) == [f"{stamp(NOW)} - ERROR - novo"]
+
+
+def test_stale_cursor_reads_archives_since_cutoff(tmp_path):
+    log = tmp_path / "app.log"
+    write(log, [f"{stamp(NOW - timedelta(days=3))} - ERROR - lido"])
+    cursors = {}
+    scan([log], cursors, cutoff=NOW - timedelta(days=4))
+    cursors["app.log"]["saved_at"] = (NOW - timedelta(days=3)).isoformat()
+
+    # Rotacionado há 2 dias (fora do limite) e há 12 horas (comprimido)
+    write(log, [f"{stamp(NOW - timedelta(days=2, hours=1))} - ERROR - antigo"])
+    os.rename(log, archive_name(str(log), NOW - timedelta(days=2)))
+    old = archive_name(str(log), NOW - timedelta(hours=12)) + ".gz"
+    with gzip.open(old, "wt") as f:
+        f.write(f"{stamp(NOW - timedelta(hours=25))} - ERROR - fora do limite\n"
+                f"{stamp(NOW - timedelta(hours=13))} - ERROR - no arquivo comprimido\n"
+                "ERROR: continuação\n")
+    write(log, [f"{stamp(NOW)} - ERROR - recente"])
+
+    assert scan([log], cursors) == [f"{stamp(NOW - timedelta(hours=13))} - ERROR - no arquivo comprimido",
+                                    "ERROR: continuação",
+                                    f"{stamp(NOW)} - ERROR - recente"]
+
+
+def test_logs_are_merged_by_timestamp(tmp_path, monkeypatch):
+    monkeypatch.setattr(log_scan, "MMAP_MIN_BYTES", 0)
+    monkeypatch.setattr(log_scan, "PARALLEL_MIN_BYTES", 0)
+    app, monitor = tmp_path / "app.log", tmp_path / "monitor.log"
+    write(app, [f"{stamp(NOW - timedelta(minutes=m))} - ERROR - app {m}" for m in (50, 30, 10)])
+    write(monitor, [f"{stamp(NOW - timedelta(minutes=m))} - ERROR - monitor {m}" for m in (40, 20)])
+    cursors = {}
+
+    matches = scan_logs([str(app), str(monitor)], cursors, CUTOFF, ["ERROR"], workers=2)
+
+    assert [(m.file, m.line.split(" - ")[-1]) for m in matches] == [
+        ("app.log", "app 50"), ("monitor.log", "monitor 40"), ("app.log", "app 30"),
+        ("monitor.log", "monitor 20"), ("app.log", "app 10")]
+    assert cursors["app.log"]["offset"] == os.path.getsize(app)
+
+
+def test_prune_removes_archives_past_retention(tmp_path):
+    log = str(tmp_path / "app.log")
+    old = archive_name(log, NOW - timedelta(days=8)) + ".gz"
+    recent = archive_name(log, NOW - timedelta(days=2))
+    for path in (old, recent, log + ".20240101_000000"):
+        open(path, "w").close()
+
+    assert prune_archives(log, retention_days=7) == [log + ".20240101_000000", old]
+    assert [archive.path for archive in rotated_files(log)] == [recent]
+
+
+def test_find_cutoff_matches_linear_scan(tmp_path):
+    log = tmp_path / "app.log"
+    lines = []
+    for minute in range(3000):
+        moment = NOW - timedelta(hours=48) + timedelta(minutes=minute)
+        lines.append(f"{stamp(moment)} - INFO - {'x' * (minute % 50)}")
+        if minute % 7 == 0:
+            lines.append("    continuação sem timestamp")
+    write(log, lines)
+    data = log.read_bytes()
+
+    for cutoff in (NOW - timedelta(hours=60), NOW - timedelta(hours=30), NOW, NOW + timedelta(hours=1)):
+        expected = len(data)
+        offset = 0
+        for line in data.split(b"\n")[:-1]:
+            moment = line_time(line)
+            if moment is not None and moment >= cutoff:
+                expected = offset
+                break
+            offset += len(line) + 1
+        with open(log, "rb") as f:
+            assert find_cutoff(f, 0, len(data), cutoff) == expected
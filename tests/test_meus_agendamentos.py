@@ -0,0 +1,78 @@
+from datetime import date, time, timedelta
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+from streamlit.testing.v1 import AppTest
+
+import streamlit_app
+from appointments import list_user_appointments
+from database import create_db_engine, sqlite_url
+from models import Appointment, Service, User
+
+
+def render_page():
+    import streamlit as st
+    import streamlit_app
+
+    st.session_state['user_id'] = st.session_state.get('user_id', 1)
+    streamlit_app.meus_agendamentos()
+
+
+@pytest.fixture
+def history(migrated_db, monkeypatch):
+    """Banco migrado com um cliente e uma função para criar N agendamentos"""
+    engine = create_db_engine(sqlite_url(migrated_db))
+    Session = sessionmaker(bind=engine)
+    monkeypatch.setattr(streamlit_app, "Session", Session)
+
+    session = Session()
+    user = User(username="ana", password="x", name="Ana", email="a@a", phone="51", address="-")
+    service = Service(name="Limpeza", price=100, active=1)
+    session.add_all([user, service])
+    session.commit()
+
+    def add(n):
+        for i in range(n):
+            session.add(Appointment(user_id=user.id, service_id=service.id,
+                                    date=date(2024, 1, 1) + timedelta(days=i), time=time(9, 0),
+                                    status="novo", price=100))
+        session.commit()
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    yield user.id, session, add, statements
+    session.close()
+    engine.dispose()
+
+
+def test_page_query_count_is_constant(history):
+    """A página faz o mesmo número de consultas com 3 ou 60 agendamentos"""
+    _, _, add, statements = history
+    counts = []
+    for n in (3, 57):
+        add(n)
+        statements.clear()
+        at = AppTest.from_function(render_page, default_timeout=30).run()
+        assert not at.exception
+        counts.append(len(statements))
+
+    assert counts[0] == counts[1]
+    assert counts[1] <= 2
+
+
+def test_history_pages_newest_first(history):
+    user_id, session, add, _ = history
+    add(45)
+
+    seen, cursor = [], None
+    while True:
+        page = list_user_appointments(session, user_id, before=cursor, page_size=20)
+        seen.extend(page.rows)
+        if page.next_cursor is None:
+            break
+        cursor = page.next_cursor
+
+    assert [a.date for a in seen] == sorted((a.date for a in seen), reverse=True)
+    assert len({a.id for a in seen}) == 45
+    assert seen[0].service.name == "Limpeza"
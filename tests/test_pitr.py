@@ -0,0 +1,101 @@
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from backup_store import BackupStore
+from pitr import PitrArchive
+
+
+def make_db(path):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE appointments (id INTEGER PRIMARY KEY, client TEXT)")
+    conn.commit()
+    conn.close()
+    return str(path)
+
+
+def book(path, client):
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO appointments (client) VALUES (?)", (client,))
+    conn.commit()
+    conn.close()
+
+
+def clients(path):
+    conn = sqlite3.connect(path)
+    try:
+        return [row[0] for row in conn.execute("SELECT client FROM appointments ORDER BY id")]
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return PitrArchive(BackupStore(str(tmp_path / "pitr")))
+
+
+def test_restore_to_timestamp(archive, tmp_path):
+    source = make_db(tmp_path / "app.db")
+    moments = []
+    for client in ("Ana", "Bruno", "Carla"):
+        book(source, client)
+        archive.archive(source)
+        moments.append(datetime.now())
+
+    point = archive.restore_to(moments[1], str(tmp_path / "restaurado.db"))
+
+    assert point.sequence == 2
+    assert clients(point.path) == ["Ana", "Bruno"]
+    assert clients(archive.restore_to(datetime.now(), str(tmp_path / "ultimo.db")).path) == ["Ana", "Bruno", "Carla"]
+    with pytest.raises(ValueError):
+        archive.restore_to(moments[0] - timedelta(days=1), str(tmp_path / "antes.db"))
+
+
+def test_sequence_and_incremental_points(tmp_path):
+    archive = PitrArchive(BackupStore(str(tmp_path / "pitr"), chunk_size=4096))
+    source = make_db(tmp_path / "app.db")
+    for i in range(2000):
+        book(source, f"Cliente {i}")
+    first = archive.archive(source)
+    book(source, "Ana")
+    second = archive.archive(source)
+
+    assert [archive.store.load_manifest(s)["sequence"] for s in (first.id, second.id)] == [1, 2]
+    assert second.chunks > 10
+    assert len(second.new_chunks) <= 3
+
+
+def test_cleanup_keeps_latest_point(archive, tmp_path):
+    source = make_db(tmp_path / "app.db")
+    archive.archive(source)
+    book(source, "Ana")
+    archive.archive(source)
+
+    removed = archive.cleanup(retention_days=0)
+
+    assert len(removed) == 1
+    assert len(archive.store.snapshots()) == 1
+
+
+def test_cleanup_keeps_point_covering_retention_start(archive, tmp_path):
+    source = make_db(tmp_path / "app.db")
+    book(source, "Ana")
+    archive.archive(source)
+    book(source, "Bruno")
+    archive.archive(source)
+    for _ in range(3):
+        assert archive.archive(source).unchanged  # período sem mudanças
+    time.sleep(0.05)
+    cutoff = datetime.now()
+    time.sleep(0.05)
+    book(source, "Carla")
+    archive.archive(source)
+
+    removed = archive.cleanup(retention_days=(datetime.now() - cutoff).total_seconds() / 86400)
+
+    assert len(removed) == 1
+    point = archive.restore_to(cutoff + timedelta(milliseconds=1), str(tmp_path / "restaurado.db"))
+    assert clients(point.path) == ["Ana", "Bruno"]
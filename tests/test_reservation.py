@@ -0,0 +1,63 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from appointments import reserve_appointment
+from database import create_db_engine, sqlite_url
+from models import Appointment, Config, DailyLoad, Service, User
+
+DAY = date(2024, 3, 4)  # segunda-feira
+FREE_DAY = date(2024, 3, 5)  # terça-feira, sem limite
+
+
+@pytest.fixture
+def Session(migrated_db):
+    engine = create_db_engine(sqlite_url(migrated_db), pool_size=16, max_overflow=0)
+    Session = sessionmaker(bind=engine)
+    session = Session()
+    session.add(User(id=1, username="ana", password="x", name="Ana", email="a@a", phone="1", address="-"))
+    session.add(Service(id=1, name="Limpeza", price=100, active=1))
+    session.add(Config(weekday=DAY.weekday(), max_appointments=5))
+    session.add(Config(weekday=FREE_DAY.weekday(), max_appointments=0))
+    session.commit()
+    session.close()
+    yield Session
+    engine.dispose()
+
+
+def book(Session, day):
+    session = Session()
+    try:
+        return reserve_appointment(session, user_id=1, service_id=1, date=day, time=time(9, 0),
+                                   status="novo", price=100)
+    finally:
+        session.close()
+
+
+def test_reservation_respects_capacity(Session):
+    ids = [book(Session, DAY) for _ in range(7)]
+    assert all(ids[:5]) and ids[5:] == [None, None]
+
+    session = Session()
+    appointment = session.get(Appointment, ids[0])
+    assert (appointment.date, appointment.time, appointment.status) == (DAY, time(9, 0), "novo")
+    session.close()
+
+
+def test_concurrent_reservations_never_overbook(Session):
+    """Centenas de reservas simultâneas: o limite do dia é respeitado"""
+    days = [DAY, FREE_DAY] * 150
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(lambda day: book(Session, day), days))
+
+    booked = [r for r, day in zip(results, days) if r and day == DAY]
+    free = [r for r, day in zip(results, days) if r and day == FREE_DAY]
+    assert len(booked) == 5
+    assert len(free) == 150
+
+    session = Session()
+    assert session.query(Appointment).filter_by(date=DAY).count() == 5
+    assert session.get(DailyLoad, DAY).booked == 5
+    session.close()
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from s3_upload import MIN_PART_SIZE, S3Uploader, UploadVerificationError
+
+BUCKET = "semprelimpa-backups"
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    for name, value in {"AWS_ACCESS_KEY_ID": "teste", "AWS_SECRET_ACCESS_KEY": "teste",
+                        "AWS_DEFAULT_REGION": "us-east-1"}.items():
+        monkeypatch.setenv(name, value)
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+class FlakyClient:
+    """Cliente que falha ao enviar uma parte específica (queda no meio do envio)."""
+
+    def __init__(self, client, fail_part):
+        self._client = client
+        self.fail_part = fail_part
+        self.parts_sent = []
+
+    def upload_part(self, **kwargs):
+        if kwargs["PartNumber"] == self.fail_part:
+            raise ConnectionError("conexão perdida")
+        self.parts_sent.append(kwargs["PartNumber"])
+        return self._client.upload_part(**kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def write_file(path, size):
+    data = os.urandom(size)
+    path.write_bytes(data)
+    return str(path), data
+
+
+def test_small_files_in_parallel_with_checksum_metadata(s3, tmp_path):
+    uploader = S3Uploader(s3, BUCKET, str(tmp_path / "estado.json"), concurrency=4)
+    items = []
+    for i in range(10):
+        path, _ = write_file(tmp_path / f"bloco{i}", 1000 + i)
+        items.append((path, f"db_backups/chunks/bloco{i}"))
+    uploader.enqueue(items)
+
+    stats = uploader.upload_files(uploader.pending())
+
+    assert stats["files"] == 10
+    assert uploader.pending() == []
+    head = s3.head_object(Bucket=BUCKET, Key="db_backups/chunks/bloco3")
+    assert head["Metadata"]["sha256"] == hashlib.sha256(open(items[3][0], "rb").read()).hexdigest()
+
+
+def test_multipart_resumes_after_failure(s3, tmp_path):
+    path, data = write_file(tmp_path / "grande.db", 3 * MIN_PART_SIZE + 123)
+    state_path = str(tmp_path / "estado.json")
+    key = "db_backups/grande.db"
+
+    flaky = FlakyClient(s3, fail_part=3)
+    uploader = S3Uploader(flaky, BUCKET, state_path, part_size=MIN_PART_SIZE, concurrency=1)
+    uploader.enqueue([(path, key)])
+    with pytest.raises(ConnectionError):
+        uploader.upload_files(uploader.pending())
+    # As outras partes seguem e ficam anotadas
+    assert flaky.parts_sent == [1, 2, 4]
+    with open(state_path) as f:
+        assert sorted(json.load(f)["multipart"][key]["parts"]) == ["1", "2", "4"]
+
+    # Nova execução: só as partes que faltam, no mesmo upload
+    retry = FlakyClient(s3, fail_part=None)
+    uploader = S3Uploader(retry, BUCKET, state_path, part_size=MIN_PART_SIZE, concurrency=2)
+    assert uploader.pending() == [(path, key)]
+    uploader.upload_files(uploader.pending())
+
+    assert retry.parts_sent == [3]
+    assert uploader.pending() == []
+    assert s3.get_object(Bucket=BUCKET, Key=key)["Body"].read() == data
+    assert s3.list_multipart_uploads(Bucket=BUCKET).get("Uploads", []) == []
+
+
+def test_changed_file_restarts_upload(s3, tmp_path):
+    path, _ = write_file(tmp_path / "grande.db", 2 * MIN_PART_SIZE + 1)
+    state_path = str(tmp_path / "estado.json")
+    uploader = S3Uploader(FlakyClient(s3, fail_part=2), BUCKET, state_path, part_size=MIN_PART_SIZE, concurrency=1)
+    with pytest.raises(ConnectionError):
+        uploader.upload_file(path, "grande.db")
+
+    path, data = write_file(tmp_path / "grande.db", 2 * MIN_PART_SIZE + 7)
+    S3Uploader(s3, BUCKET, state_path, part_size=MIN_PART_SIZE).upload_file(path, "grande.db")
+
+    assert s3.get_object(Bucket=BUCKET, Key="grande.db")["Body"].read() == data
+    assert s3.list_multipart_uploads(Bucket=BUCKET).get("Uploads", []) == []
+
+
+def test_checksum_mismatch_is_rejected(s3, tmp_path):
+    class WrongETag(FlakyClient):
+        def put_object(self, **kwargs):
+            response = self._client.put_object(**kwargs)
+            return dict(response, ETag='"00000000000000000000000000000000"')
+
+    path, _ = write_file(tmp_path / "bloco", 100)
+    uploader = S3Uploader(WrongETag(s3, fail_part=None), BUCKET, str(tmp_path / "estado.json"))
+    uploader.enqueue([(path, "bloco")])
+
+    with pytest.raises(UploadVerificationError):
+        uploader.upload_files(uploader.pending())
+    assert uploader.pending() == [(path, "bloco")]
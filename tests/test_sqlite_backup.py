@@ -0,0 +1,93 @@
+import os
+import sqlite3
+import threading
+
+import pytest
+
+from sqlite_backup import backup_database, create_backup, prune_backups
+
+
+def make_db(path, mode="wal", rows=2000):
+    conn = sqlite3.connect(path)
+    conn.execute(f"PRAGMA journal_mode={mode}")
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, data BLOB)")
+    conn.executemany("INSERT INTO t (data) VALUES (randomblob(4000))", [()] * rows)
+    conn.commit()
+    conn.close()
+    return str(path)
+
+
+def writer(path, stop):
+    conn = sqlite3.connect(path, timeout=10)
+    while not stop.is_set():
+        conn.execute("INSERT INTO t (data) VALUES (randomblob(100))")
+        conn.commit()
+    conn.close()
+
+
+def test_wal_backup_in_steps_during_writes(tmp_path):
+    """Com WAL, a cópia em etapas não recomeça e sai consistente com escritas concorrentes"""
+    source = make_db(tmp_path / "app.db")
+    progress = []
+    stop = threading.Event()
+    thread = threading.Thread(target=writer, args=(source, stop))
+    thread.start()
+    try:
+        result = backup_database(source, str(tmp_path / "bkp.db"), pages=100, sleep=0.001,
+                                 progress=lambda done, total: progress.append((done, total)))
+    finally:
+        stop.set()
+        thread.join()
+
+    assert result.steps > 10
+    assert result.restarts == 0
+    assert progress[-1][0] == progress[-1][1] == result.pages
+
+    conn = sqlite3.connect(result.path)
+    assert conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+    assert conn.execute("SELECT count(*) FROM t").fetchone()[0] >= 2000
+    conn.close()
+    assert not os.path.exists(result.path + "-wal")
+    assert not os.path.exists(result.path + ".part")
+
+
+def test_journal_mode_restarts_then_finishes(tmp_path):
+    """Sem WAL, depois de muitos recomeços o restante é copiado de uma vez"""
+    source = make_db(tmp_path / "app.db", mode="delete")
+    stop = threading.Event()
+    thread = threading.Thread(target=writer, args=(source, stop))
+    thread.start()
+    try:
+        result = backup_database(source, str(tmp_path / "bkp.db"), pages=50, sleep=0.01, max_restarts=1)
+    finally:
+        stop.set()
+        thread.join()
+
+    conn = sqlite3.connect(result.path)
+    assert conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+    conn.close()
+
+
+def test_failed_backup_leaves_no_partial_file(tmp_path):
+    source = make_db(tmp_path / "app.db")
+
+    def fail(done, total):
+        raise RuntimeError("disco cheio")
+
+    with pytest.raises(RuntimeError):
+        backup_database(source, str(tmp_path / "bkp.db"), pages=10, progress=fail)
+    assert not [f for f in os.listdir(tmp_path) if f.startswith("bkp.db")]
+
+
+def test_create_backup_keeps_newest(tmp_path):
+    source = make_db(tmp_path / "app.db", rows=10)
+    backup_dir = tmp_path / "backups"
+    backup_dir.mkdir()
+    for stamp in ("20240101_000000", "20240102_000000", "20240103_000000"):
+        (backup_dir / f"db_backup_{stamp}.db").write_bytes(b"")
+
+    result = create_backup(source, str(backup_dir), keep=2)
+
+    assert sorted(os.listdir(backup_dir)) == ["db_backup_20240103_000000.db", os.path.basename(result.path)]
+    assert prune_backups(str(backup_dir), keep=1) == ["db_backup_20240103_000000.db"]
@@ -0,0 +1,105 @@
+import io
+import os
+from datetime import date, time
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from appointments import removal, reservation
+from database import create_db_engine, sqlite_url
+from models import Service, Upload, User
+from upload_store import UploadStore, UploadTooLarge
+from write_queue import run_write
+
+
+class FakeUpload(io.BytesIO):
+    """Imita o UploadedFile do Streamlit e registra o maior bloco lido"""
+
+    def __init__(self, data, name="foto.jpg", declared_size=None):
+        super().__init__(data)
+        self.name = name
+        self.size = len(data) if declared_size is None else declared_size
+        self.largest_read = 0
+
+    def read(self, size=-1):
+        chunk = super().read(size)
+        self.largest_read = max(self.largest_read, len(chunk))
+        return chunk
+
+
+@pytest.fixture
+def store(migrated_db, tmp_path):
+    engine = create_db_engine(sqlite_url(migrated_db))
+    Session = sessionmaker(bind=engine)
+    session = Session()
+    session.add(User(id=1, username="ana", password="x", name="Ana", email="a@a", phone="1", address="-"))
+    session.add(Service(id=1, name="Limpeza", price=100, active=1))
+    session.commit()
+    yield UploadStore(str(tmp_path / "uploads"), max_bytes=1024 * 1024, chunk_size=64 * 1024), Session, session
+    session.close()
+    engine.dispose()
+
+
+def test_same_content_is_stored_once(store):
+    upload_store, _, session = store
+    data = os.urandom(300 * 1024)
+    first = FakeUpload(data, name="a.JPG")
+    path = upload_store.put(session, first, first.name)
+    assert upload_store.put(session, FakeUpload(data, name="b.jpg"), "b.jpg") == path
+    assert path.endswith(".jpg")
+    assert first.largest_read <= 64 * 1024
+
+    other = upload_store.put(session, FakeUpload(os.urandom(10), name="a.JPG"), "a.JPG")
+    assert other != path
+    assert session.query(Upload).count() == 2
+    files = [f for _, _, fs in os.walk(upload_store.root) for f in fs]
+    assert len(files) == 2
+
+
+def test_same_content_with_other_extension_shares_file_and_refcount(store):
+    upload_store, _, session = store
+    data = os.urandom(1024)
+    path = upload_store.put(session, FakeUpload(data, name="a.jpg"), "a.jpg")
+    assert upload_store.put(session, FakeUpload(data, name="b.JPEG"), "b.JPEG") == path
+
+    UploadStore.acquire(session, path)
+    UploadStore.acquire(session, path)
+    session.commit()
+
+    assert session.query(Upload).one().refcount == 2
+    assert [f for _, _, fs in os.walk(upload_store.root) for f in fs] == [os.path.basename(path)]
+
+
+@pytest.mark.parametrize("declared", [None, 10], ids=["tamanho declarado", "tamanho real"])
+def test_size_limit(store, declared):
+    upload_store, _, session = store
+    data = b"x" * (upload_store.max_bytes + 1)
+    fileobj = FakeUpload(data, declared_size=declared)
+    with pytest.raises(UploadTooLarge):
+        upload_store.put(session, fileobj, fileobj.name)
+
+    if declared is None:
+        assert fileobj.largest_read == 0  # recusado antes de ler
+    assert not [f for _, _, fs in os.walk(upload_store.root) for f in fs]
+    assert session.query(Upload).count() == 0
+
+
+def test_refcount_follows_appointments(store):
+    upload_store, Session, session = store
+    path = upload_store.put(session, FakeUpload(b"foto"), "foto.jpg")
+
+    def book():
+        return run_write(reservation(user_id=1, service_id=1, date=date(2024, 3, 4), time=time(9, 0),
+                                     status="novo", price=100, image_path=path), Session)
+
+    first, second = book(), book()
+    session.expire_all()
+    assert session.get(Upload, os.path.basename(path)[:64]).refcount == 2
+
+    run_write(removal(first), Session)
+    assert upload_store.sweep(session, grace_seconds=0) == 0
+    assert os.path.exists(path)
+
+    run_write(removal(second), Session)
+    assert upload_store.sweep(session, grace_seconds=0) == 1
+    assert not os.path.exists(path)
@@ -0,0 +1,155 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from weather import WeatherCache, WeatherUnavailable, CircuitBreaker
+
+
+class StubWeatherAPI:
+    """Servidor HTTP local que imita os endpoints do OpenWeatherMap."""
+
+    def __init__(self):
+        self.hits = {"weather": 0, "forecast": 0}
+        self.delay = 0.0
+        self.status = 200
+        self.temp = 20
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                endpoint = self.path.split("?")[0].rsplit("/", 1)[-1]
+                stub.hits[endpoint] += 1
+                time.sleep(stub.delay)
+                if endpoint == "weather":
+                    body = {"weather": [{"description": "clear sky"}], "main": {"temp": stub.temp}}
+                else:
+                    body = {"list": [{"dt": 0, "weather": [{"description": "clear sky"}], "main": {"temp": stub.temp}}]}
+                payload = json.dumps(body).encode()
+                self.send_response(stub.status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/data/2.5"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def api():
+    stub = StubWeatherAPI()
+    yield stub
+    stub.close()
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_cache_hit_within_ttl(api):
+    """Dentro do TTL a API não é chamada de novo"""
+    cache = WeatherCache("key", base_url=api.url, ttl=60)
+    current, forecast = cache.get("Arroio do Sal,BR")
+    cache.get("Arroio do Sal,BR")
+
+    assert current["main"]["temp"] == 20
+    assert len(forecast["list"]) == 1
+    assert api.hits == {"weather": 1, "forecast": 1}
+    cache.close()
+
+
+def test_endpoints_fetched_concurrently(api):
+    """Os dois endpoints são buscados em paralelo"""
+    api.delay = 0.3
+    cache = WeatherCache("key", base_url=api.url, timeout=2)
+    start = time.monotonic()
+    cache.get("Arroio do Sal,BR")
+    assert time.monotonic() - start < 0.55
+    cache.close()
+
+
+def test_stale_while_revalidate(api):
+    """Depois do TTL o snapshot antigo é servido e atualizado em segundo plano"""
+    clock = FakeClock()
+    cache = WeatherCache("key", base_url=api.url, ttl=60, clock=clock)
+    cache.get("Arroio do Sal,BR")
+
+    api.temp = 25
+    clock.now += 61
+    current, _ = cache.get("Arroio do Sal,BR")
+    assert current["main"]["temp"] == 20
+
+    assert wait_for(lambda: cache.get("Arroio do Sal,BR")[0]["main"]["temp"] == 25)
+    cache.close()
+
+
+def test_timeout_without_snapshot_raises(api):
+    """Sem snapshot e com a API travada, a busca respeita o timeout"""
+    api.delay = 1.0
+    cache = WeatherCache("key", base_url=api.url, timeout=0.2)
+    start = time.monotonic()
+    with pytest.raises(WeatherUnavailable):
+        cache.get("Arroio do Sal,BR")
+    assert time.monotonic() - start < 0.8
+    cache.close()
+
+
+def test_circuit_breaker_serves_last_snapshot(api):
+    """Com a API falhando o último snapshot válido continua sendo servido"""
+    clock = FakeClock()
+    cache = WeatherCache("key", base_url=api.url, ttl=60, failure_threshold=2,
+                         reset_timeout=300, clock=clock)
+    cache.get("Arroio do Sal,BR")
+
+    api.status = 500
+    for _ in range(2):
+        clock.now += 61
+        current, _ = cache.get("Arroio do Sal,BR")
+        assert current["main"]["temp"] == 20
+        assert wait_for(lambda: not cache._refreshing)
+
+    assert cache.breaker.is_open
+    hits = dict(api.hits)
+    clock.now += 61
+    assert cache.get("Arroio do Sal,BR")[0]["main"]["temp"] == 20
+    assert wait_for(lambda: not cache._refreshing)
+    assert api.hits == hits
+    cache.close()
+
+
+def test_circuit_breaker_half_open():
+    """Depois do reset_timeout uma tentativa é liberada"""
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    assert not breaker.allow()
+    clock.now += 10
+    assert breaker.allow()
+    breaker.record_success()
+    assert not breaker.is_open
@@ -0,0 +1,91 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from appointments import reservation
+from database import create_db_engine, sqlite_url
+from models import Appointment, Config, Service, User
+from write_queue import WriteQueue, run_write
+
+DAY = date(2024, 3, 4)
+
+
+@pytest.fixture
+def Session(migrated_db):
+    engine = create_db_engine(sqlite_url(migrated_db))
+    Session = sessionmaker(bind=engine)
+    session = Session()
+    session.add(User(id=1, username="ana", password="x", name="Ana", email="a@a", phone="1", address="-"))
+    session.add(Service(id=1, name="Limpeza", price=100, active=1))
+    session.add(Config(weekday=DAY.weekday(), max_appointments=5))
+    session.commit()
+    session.close()
+    yield Session
+    engine.dispose()
+
+
+def add_service(name):
+    def write(session):
+        service = Service(name=name, price=1, active=1)
+        session.add(service)
+        session.flush()
+        return service.id
+    return write
+
+
+def fail(session):
+    raise ValueError("falhou")
+
+
+def count(Session, model):
+    session = Session()
+    try:
+        return session.query(model).count()
+    finally:
+        session.close()
+
+
+def test_group_commit_returns_results(Session):
+    queue = WriteQueue(Session, max_batch=100, max_wait=0.05)
+    futures = [queue.submit(add_service(f"s{i}")) for i in range(50)]
+    ids = [f.result(timeout=10) for f in futures]
+    queue.close()
+
+    assert len(set(ids)) == 50
+    assert count(Session, Service) == 51
+    metrics = queue.metrics()
+    assert metrics["operations"] == 50
+    assert metrics["commits"] < 50
+    assert metrics["queue_depth"] == 0
+
+
+def test_failed_write_only_fails_its_future(Session):
+    queue = WriteQueue(Session, max_batch=10, max_wait=0.05)
+    futures = [queue.submit(add_service("a")), queue.submit(fail), queue.submit(add_service("b"))]
+
+    assert futures[0].result(timeout=10)
+    with pytest.raises(ValueError):
+        futures[1].result(timeout=10)
+    assert futures[2].result(timeout=10)
+    queue.close()
+
+    assert count(Session, Service) == 3
+    assert queue.metrics()["failures"] == 1
+
+
+def test_reservations_through_queue_respect_capacity(Session):
+    queue = WriteQueue(Session)
+    book = reservation(user_id=1, service_id=1, date=DAY, time=time(9, 0), status="novo", price=100)
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(lambda _: run_write(book, Session, queue, timeout=10), range(100)))
+    queue.close()
+
+    assert len([r for r in results if r]) == 5
+    assert count(Session, Appointment) == 5
+
+
+def test_run_write_without_queue(Session):
+    assert run_write(add_service("direto"), Session)
+    assert count(Session, Service) == 2
@@ -0,0 +1,148 @@
+"""
+Armazenamento das fotos enviadas, endereçado pelo conteúdo.
+
+Cada arquivo é copiado em blocos para um temporário enquanto o SHA-256 é
+calculado, e depois movido para `<raiz>/<ab>/<sha256>.<ext>`. Fotos iguais
+(mesmo conteúdo) ocupam um único arquivo, e nomes iguais enviados por
+clientes diferentes não se sobrescrevem mais. A extensão é a do primeiro
+envio: o mesmo conteúdo enviado depois com outra extensão recebe o caminho
+já registrado, para que cada conteúdo tenha um só arquivo e um só contador.
+
+A tabela `uploads` conta quantos registros (agendamentos, galeria) apontam
+para cada arquivo. `acquire` e `release` rodam dentro da escrita que cria ou
+remove o registro; `sweep` apaga os arquivos que ficaram sem referência.
+"""
+import hashlib
+import os
+import tempfile
+import time
+
+from sqlalchemy import update
+from sqlalchemy.dialects.sqlite import insert
+
+from images import VARIANTS, variant_path
+from models import Upload
+
+CHUNK_SIZE = 1024 * 1024
+
+# Arquivos recém-gravados ainda sem referência não são apagados antes disso,
+# para não disputar com um envio em andamento
+SWEEP_GRACE_SECONDS = 3600
+
+
+class UploadTooLarge(Exception):
+    """Arquivo maior que o limite configurado."""
+
+
+class UploadStore:
+    def __init__(self, root, max_bytes, chunk_size=CHUNK_SIZE):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+
+    def path_for(self, digest, extension):
+        return os.path.join(self.root, digest[:2], f"{digest}{extension}")
+
+    def put(self, session, fileobj, filename):
+        """
+        Grava um arquivo enviado e registra na tabela `uploads` (sem referência).
+
+        O tamanho informado pelo upload é checado antes de ler qualquer
+        byte, e a cópia em blocos para assim que o limite é ultrapassado.
+
+        Args:
+            session: Sessão do banco de dados (é commitada)
+            fileobj: Arquivo enviado (ex.: `st.file_uploader`)
+            filename: Nome original (só a extensão é usada)
+
+        Returns:
+            str: Caminho estável do arquivo
+
+        Raises:
+            UploadTooLarge: se o arquivo passar de `max_bytes`
+        """
+        declared = getattr(fileobj, "size", None)
+        if declared is not None and declared > self.max_bytes:
+            raise UploadTooLarge(f"Arquivo com {declared} bytes (limite {self.max_bytes})")
+
+        extension = os.path.splitext(filename)[1].lower()
+        os.makedirs(self.root, exist_ok=True)
+        if hasattr(fileobj, "seek"):
+            fileobj.seek(0)
+
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                for chunk in iter(lambda: fileobj.read(self.chunk_size), b""):
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise UploadTooLarge(f"Arquivo maior que o limite de {self.max_bytes} bytes")
+                    digest.update(chunk)
+                    tmp.write(chunk)
+
+            # Conteúdo já registrado (talvez com outra extensão): mesmo caminho
+            registered = session.query(Upload.path).filter_by(digest=digest.hexdigest()).scalar()
+            path = registered or self.path_for(digest.hexdigest(), extension)
+            created = not os.path.exists(path)
+            if created:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+            else:
+                # Conteúdo já armazenado: deduplicado
+                os.remove(tmp_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        # Renovar created_at protege o arquivo do sweep até a referência ser criada
+        now = int(time.time())
+        session.execute(
+            insert(Upload)
+            .values(digest=digest.hexdigest(), path=path, size=size, refcount=0, created_at=now)
+            .on_conflict_do_update(index_elements=["digest"], set_={"created_at": now})
+        )
+        registered = session.query(Upload.path).filter_by(digest=digest.hexdigest()).scalar()
+        session.commit()
+        if registered != path:
+            # Um envio simultâneo do mesmo conteúdo, com outra extensão, registrou antes
+            if created:
+                os.remove(path)
+            path = registered
+        return path
+
+    @staticmethod
+    def acquire(session, path):
+        """Conta mais uma referência ao arquivo (sem commit)."""
+        if path:
+            session.execute(update(Upload).where(Upload.path == path).values(refcount=Upload.refcount + 1))
+
+    @staticmethod
+    def release(session, path):
+        """Remove uma referência ao arquivo (sem commit; ver sweep)."""
+        if path:
+            session.execute(
+                update(Upload)
+                .where(Upload.path == path, Upload.refcount > 0)
+                .values(refcount=Upload.refcount - 1)
+            )
+
+    def sweep(self, session, grace_seconds=SWEEP_GRACE_SECONDS):
+        """
+        Apaga os arquivos (e variantes) sem nenhuma referência.
+
+        Returns:
+            int: Quantidade de arquivos apagados
+        """
+        cutoff = int(time.time()) - grace_seconds
+        orphans = session.query(Upload).filter(Upload.refcount <= 0, Upload.created_at <= cutoff).all()
+        for upload in orphans:
+            for path in [upload.path] + [variant_path(upload.path, v) for v in VARIANTS]:
+                if os.path.exists(path):
+                    os.remove(path)
+            session.delete(upload)
+        session.commit()
+        return len(orphans)
+
@@ -0,0 +1,181 @@
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class WeatherUnavailable(Exception):
+    """Nenhum dado de previsão disponível (API fora do ar e sem snapshot em cache)."""
+
+
+class CircuitBreaker:
+    """
+    Disjuntor simples para chamadas externas.
+
+    Depois de `failure_threshold` falhas seguidas o circuito abre e nenhuma
+    chamada é feita por `reset_timeout` segundos. Passado esse tempo uma única
+    tentativa é liberada (meio-aberto); sucesso fecha o circuito, falha reabre.
+    """
+
+    def __init__(self, failure_threshold=3, reset_timeout=60.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._failures = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        with self._lock:
+            return self._opened_at is not None and self._clock() - self._opened_at < self.reset_timeout
+
+    def allow(self):
+        """Indica se uma chamada pode ser feita agora."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._clock() - self._opened_at >= self.reset_timeout:
+                # Meio-aberto: libera uma tentativa e rearma o relógio
+                self._opened_at = self._clock()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+
+
+class WeatherCache:
+    """
+    Cache de previsão do tempo compartilhado entre sessões.
+
+    - Entradas por cidade com TTL; dentro do TTL nenhuma chamada é feita.
+    - Depois do TTL o snapshot antigo é servido imediatamente e a atualização
+      roda em segundo plano (stale-while-revalidate).
+    - Os endpoints "weather" e "forecast" são buscados em paralelo usando uma
+      única `requests.Session` com pool de conexões keep-alive.
+    - Cada busca tem timeout rígido; falhas seguidas abrem o disjuntor e o
+      último snapshot válido continua sendo servido.
+    """
+
+    def __init__(self, api_key, base_url="http://api.openweathermap.org/data/2.5",
+                 ttl=600, timeout=5.0, failure_threshold=3, reset_timeout=60.0,
+                 clock=time.monotonic):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.ttl = ttl
+        self.timeout = timeout
+        self._clock = clock
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout, clock=clock)
+
+        self._http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=4)
+        self._http.mount("http://", adapter)
+        self._http.mount("https://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="weather")
+
+        # cidade -> (dados, instante da busca)
+        self._entries = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._fetch_locks = {}
+
+    def get(self, city):
+        """
+        Retorna `(current, forecast)` em JSON para a cidade.
+
+        Raises:
+            WeatherUnavailable: se não há snapshot e a API não respondeu
+        """
+        entry = self._entries.get(city)
+        if entry is not None:
+            data, fetched_at = entry
+            if self._clock() - fetched_at >= self.ttl:
+                self._refresh_in_background(city)
+            return data
+
+        # Primeira busca: só uma thread por cidade vai à API, as outras esperam
+        with self._lock:
+            fetch_lock = self._fetch_locks.setdefault(city, threading.Lock())
+        with fetch_lock:
+            entry = self._entries.get(city)
+            if entry is not None:
+                return entry[0]
+            data = self._fetch(city)
+            if data is None:
+                raise WeatherUnavailable(f"Previsão indisponível para {city}")
+            return data
+
+    def invalidate(self, city=None):
+        """Remove uma cidade (ou todas) do cache."""
+        with self._lock:
+            if city is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(city, None)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self._http.close()
+
+    def _refresh_in_background(self, city):
+        with self._lock:
+            if city in self._refreshing:
+                return
+            self._refreshing.add(city)
+
+        def run():
+            try:
+                self._fetch(city)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(city)
+
+        threading.Thread(target=run, name=f"weather-refresh-{city}", daemon=True).start()
+
+    def _fetch(self, city):
+        """Busca os dois endpoints em paralelo; retorna None em caso de falha."""
+        if not self.breaker.allow():
+            logger.warning("Circuito da API de tempo aberto, servindo último snapshot")
+            return None
+
+        params = {"q": city, "units": "metric", "appid": self.api_key, "lang": "pt_br"}
+        futures = [
+            self._executor.submit(self._get_json, f"{self.base_url}/{endpoint}", params)
+            for endpoint in ("weather", "forecast")
+        ]
+        done, not_done = wait(futures, timeout=self.timeout, return_when=FIRST_EXCEPTION)
+        try:
+            if not_done:
+                raise TimeoutError(f"API de tempo não respondeu em {self.timeout}s")
+            current, forecast = (f.result() for f in futures)
+        except Exception as e:
+            for f in not_done:
+                f.cancel()
+            self.breaker.record_failure()
+            logger.warning(f"Erro ao buscar previsão do tempo: {str(e)}")
+            return None
+
+        self.breaker.record_success()
+        data = (current, forecast)
+        with self._lock:
+            self._entries[city] = (data, self._clock())
+        return data
+
+    def _get_json(self, url, params):
+        resp = self._http.get(url, params=params, timeout=self.timeout)
+        resp.raise_for_status()
+        return resp.json()
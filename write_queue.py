@@ -0,0 +1,180 @@
+"""
+Fila de escritas com uma única thread escritora e commit em grupo.
+
+Cada escrita é uma função `fn(session)` que altera o banco sem fazer commit.
+A thread escritora junta as operações que chegam em sequência (até
+`max_batch`, esperando no máximo `max_wait` segundos) e faz um único commit
+para o grupo, então as threads do Streamlit não disputam o lock de escrita
+do SQLite. Quem envia recebe um `Future` com o retorno da função.
+
+A fila é opcional (settings.WRITE_QUEUE_ENABLED): `run_write` faz a escrita
+direto numa sessão própria quando nenhuma fila é informada.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from sqlalchemy.exc import OperationalError
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+def _is_locked(error):
+    return isinstance(error, OperationalError) and "locked" in str(error)
+
+
+def commit_with_retry(session, fn, retries=5):
+    """
+    Executa `fn(session)` e faz commit, tentando de novo se o banco estiver bloqueado.
+
+    Returns:
+        Retorno de `fn`
+    """
+    for attempt in range(retries + 1):
+        try:
+            result = fn(session)
+            session.commit()
+            return result
+        except Exception as e:
+            session.rollback()
+            if not _is_locked(e) or attempt == retries:
+                raise
+            time.sleep(0.05 * 2 ** attempt)
+
+
+def run_write(fn, session_factory, write_queue=None, timeout=None):
+    """
+    Executa uma escrita pela fila, se houver, ou direto numa sessão própria.
+
+    Args:
+        fn: Função `fn(session)` que faz a escrita (sem commit)
+        session_factory: Fábrica de sessões usada sem fila
+        write_queue: WriteQueue ativa (opcional)
+        timeout: Tempo máximo de espera pelo resultado na fila (segundos)
+
+    Returns:
+        Retorno de `fn`
+    """
+    if write_queue is not None:
+        return write_queue.submit(fn).result(timeout)
+
+    session = session_factory()
+    try:
+        return commit_with_retry(session, fn)
+    finally:
+        session.close()
+
+
+class WriteQueue:
+    """Thread escritora única com commit em grupo."""
+
+    def __init__(self, session_factory, max_batch=32, max_wait=0.005, retries=5):
+        self._session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.retries = retries
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._stats = {"operations": 0, "commits": 0, "failures": 0,
+                       "commit_ms_total": 0.0, "commit_ms_max": 0.0, "commit_ms_last": 0.0}
+        self._thread = threading.Thread(target=self._run, name="write-queue", daemon=True)
+        self._thread.start()
+
+    def submit(self, fn):
+        """Enfileira `fn(session)` e retorna um Future com o resultado."""
+        if not self._thread.is_alive():
+            raise RuntimeError("Fila de escritas encerrada")
+        future = Future()
+        self._queue.put((fn, future))
+        return future
+
+    def metrics(self):
+        """Profundidade da fila, commits e latência de commit (ms)."""
+        with self._lock:
+            stats = dict(self._stats)
+        commits = stats["commits"]
+        stats["queue_depth"] = self._queue.qsize()
+        stats["avg_batch"] = stats["operations"] / commits if commits else 0.0
+        stats["commit_ms_avg"] = stats["commit_ms_total"] / commits if commits else 0.0
+        return stats
+
+    def close(self, timeout=None):
+        """Processa o que já foi enfileirado e encerra a thread escritora."""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+
+    def _next_batch(self):
+        item = self._queue.get()
+        if item is _STOP:
+            return None
+        batch = [item]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            batch = [(fn, future) for fn, future in batch if future.set_running_or_notify_cancel()]
+            if batch:
+                self._commit_batch(batch)
+
+    def _commit_batch(self, batch):
+        session = self._session_factory()
+        start = time.perf_counter()
+        try:
+            results = commit_with_retry(
+                session, lambda s: [fn(s) for fn, _ in batch], self.retries
+            )
+        except Exception:
+            # Alguma operação falhou: o grupo foi desfeito, repetir uma a uma
+            # para que só a operação com erro receba a exceção
+            self._commit_individually(batch)
+            return
+        finally:
+            session.close()
+
+        self._record(len(batch), start)
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def _commit_individually(self, batch):
+        for fn, future in batch:
+            session = self._session_factory()
+            start = time.perf_counter()
+            try:
+                result = commit_with_retry(session, fn, self.retries)
+            except Exception as e:
+                with self._lock:
+                    self._stats["failures"] += 1
+                logger.warning("Escrita da fila falhou: %s", e)
+                future.set_exception(e)
+                continue
+            finally:
+                session.close()
+            self._record(1, start)
+            future.set_result(result)
+
+    def _record(self, operations, start):
+        elapsed = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self._stats["operations"] += operations
+            self._stats["commits"] += 1
+            self._stats["commit_ms_total"] += elapsed
+            self._stats["commit_ms_last"] = elapsed
+            self._stats["commit_ms_max"] = max(self._stats["commit_ms_max"], elapsed)